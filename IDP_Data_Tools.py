@@ -11,6 +11,7 @@ st.markdown(
     """
     This page hosts the streamlit based data tools used by the data team of India Data Portal.
     - Codebook Critic
+    - Codebook Catalog
     - Dataset ID Generator (SKU)
     - Dataset QA
     
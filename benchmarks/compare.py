@@ -0,0 +1,39 @@
+import argparse
+import json
+from pathlib import Path
+
+
+def compare(base: dict, head: dict, threshold=0.1):
+    """Rows of (name, base median, head median, time ratio, memory ratio, flag) for benchmarks in both runs."""
+    base_results = {r["name"]: r for r in base["results"]}
+    rows = []
+    for r in head["results"]:
+        b = base_results.get(r["name"])
+        if b is None:
+            continue
+        ratio = r["median"] / b["median"] if b["median"] else float("nan")
+        memory = r["peak_memory_mb"] / b["peak_memory_mb"] if b["peak_memory_mb"] else float("nan")
+        flag = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else ""
+        rows.append((r["name"], b["median"], r["median"], ratio, memory, flag))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares two benchmark result files.")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative change in median time that is reported as faster/slower")
+    args = parser.parse_args()
+    base = json.loads(Path(args.base).read_text())
+    head = json.loads(Path(args.head).read_text())
+    if base["size"] != head["size"]:
+        print(f"warning: comparing size '{base['size']}' with size '{head['size']}'")
+    print(f"base {base['commit'][:10]}  head {head['commit'][:10]}")
+    print(f"{'benchmark':<32}{'base (s)':>10}{'head (s)':>10}{'time':>8}{'memory':>8}")
+    for name, b, h, ratio, memory, flag in compare(base, head, args.threshold):
+        print(f"{name:<32}{b:>10.3f}{h:>10.3f}{ratio:>7.2f}x{memory:>7.2f}x  {flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Measures how long each page takes to run in a fresh interpreter (on top of importing
+# streamlit, which every page pays anyway) and which heavy modules it loads, and checks
+# the times against per-page budgets.
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+
+heavy_modules = ["pandas", "pandera", "polars", "openpyxl", "rapidfuzz", "pyarrow"]
+
+# seconds over the streamlit baseline, roughly twice the time measured on a warm disk
+budgets = {
+    "IDP_Data_Tools.py": 0.25,
+    "pages/Codebook_Catalog.py": 1.0,
+    "pages/Codebook_Creator.py": 0.5,
+    "pages/Codebook_Critic.py": 0.1,
+    "pages/Dataset_ID_Creator.py": 0.1,
+    "pages/Dataset_QA.py": 0.8,
+    "pages/Quallity_Checks.py": 0.25,
+}
+
+script = """
+import json, logging, runpy, sys, time
+start = time.perf_counter()
+import streamlit
+baseline = time.perf_counter() - start
+logging.disable(logging.CRITICAL)
+start = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name="__main__")
+seconds = time.perf_counter() - start
+print(json.dumps({"baseline": baseline, "seconds": seconds,
+                  "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules]}))
+"""
+
+
+def measure(page: str, repeat=3):
+    """Best of `repeat` fresh interpreter runs of a page."""
+    env = {**os.environ, "PYTHONPATH": str(root), "DISABLE_PANDERA_IMPORT_WARNING": "True"}
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", script, page, json.dumps(heavy_modules)],
+            cwd=root, capture_output=True, text=True, env=env)
+        if out.returncode != 0:
+            raise Exception(f"{page} failed:\n{out.stderr}")
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(runs, key=lambda r: r["seconds"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the import time of every page against its budget.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("pages", nargs="*", default=list(budgets))
+    args = parser.parse_args()
+    results, over = [], []
+    for page in args.pages:
+        result = {"page": page, "budget": budgets.get(page), **measure(page, args.repeat)}
+        if result["budget"] is not None and result["seconds"] > result["budget"]:
+            over.append(page)
+        results.append(result)
+    print(json.dumps(results, indent=2))
+    if over:
+        print(f"Over budget: {', '.join(over)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+import polars as pl
+from benchmarks import synthetic
+from lib.qa import clean, ingest, lgd, optimize
+from lib.qa.codes import all_code_issues
+from lib.qa.dates import normalize_dates
+from lib.qa.dependencies import dependency_violations
+from lib.qa.export import export_formats, export_bytes
+from lib.qa.formulas import parse_formulas, check_formulas
+from lib.qa.missingness import missingness
+from lib.qa.numeric import numeric_tally
+from lib.qa.panel import completeness
+from lib.qa.partition import write_partitioned
+from lib.qa.precision import profile_precision
+from lib.qa.profile import profile_columns, duplicate_count, summary_statistics
+from lib.qa.redundancy import redundant_columns
+from lib.qa.report import column_info
+from lib.qa.rules import Rule, check_rules
+from lib.qa.units import plan_conversions, convert_units
+
+root = Path(__file__).resolve().parent.parent
+
+
+def to_polars(df: pd.DataFrame) -> pl.DataFrame:
+    """A synthetic (pandas) frame as the polars frame the QA engine takes."""
+    return pl.from_pandas(df)
+
+
+sizes = {
+    "small": {"years": 2, "rows": 10_000, "columns": 50, "variables": 200},
+    "medium": {"years": 10, "rows": 100_000, "columns": 200, "variables": 1000},
+    "large": {"years": 20, "rows": 1_000_000, "columns": 500, "variables": 5000},
+}
+
+# name -> setup function. A setup function takes the size parameters and returns a
+# zero argument callable; only the callable is timed and memory-measured.
+benchmarks = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        benchmarks[name] = setup
+        return setup
+    return register
+
+
+@benchmark("profile.dqa_info")
+def profile_dqa_info(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+    return lambda: [column_info(p) for p in profile_columns(df).values()]
+
+
+@benchmark("profile.process_column")
+def profile_process_column(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+
+    def run():
+        data = df
+        for col in ["state_code", "district_code"]:
+            data = clean.pad_codes(data, col)
+        profile_columns(data)
+        for level in lgd.detected_levels(data):
+            lgd.level_mismatches(data, level)
+    return run
+
+
+@benchmark("profile.describe_wide")
+def profile_describe_wide(size):
+    df = to_polars(synthetic.wide_table(rows=size["rows"], columns=size["columns"]))
+    return lambda: (summary_statistics(df), df.null_count(), df.select(pl.all().n_unique()))
+
+
+@benchmark("precision.profile")
+def precision_profile(size):
+    df = to_polars(synthetic.wide_table(rows=size["rows"], columns=size["columns"]))
+    return lambda: profile_precision(df)
+
+
+@benchmark("numeric.tally")
+def numeric_text_tally(size):
+    df = to_polars(synthetic.wide_table(rows=size["rows"], columns=size["columns"]))
+    df = df.with_columns(pl.col(pl.FLOAT_DTYPES).cast(pl.Utf8))
+    return lambda: numeric_tally(df)
+
+
+@benchmark("dates.normalize")
+def dates_normalize(size):
+    dates = pl.Series("date", synthetic.date_column(n=size["rows"]).tolist())
+    return lambda: normalize_dates(dates)
+
+
+@benchmark("codes.validate")
+def codes_validate(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+    return lambda: all_code_issues(clean.pad_codes(clean.pad_codes(df, "state_code"), "district_code"))
+
+
+@benchmark("dependencies.violations")
+def dependencies_violations(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+    return lambda: dependency_violations(df)
+
+
+@benchmark("rules.evaluate")
+def rules_evaluate(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+    indicators = [c for c, dtype in df.schema.items() if dtype == pl.Float64]
+    rules = [
+        Rule("no negative values", "non_negative", {"columns": indicators}),
+        Rule("below a million", "range", {"columns": indicators, "min": 0, "max": 1e6}),
+        Rule("first below second", "compare", {"column": indicators[0], "op": "<=", "other": indicators[1]}),
+        Rule("first two add up", "sum", {"columns": indicators[:2], "equals": indicators[2], "tolerance": 1}),
+        Rule("one row per district and date", "unique", {"columns": ["district_code", "date"]}),
+        Rule("districts add up to states", "rollup", {
+            "column": indicators[0], "by": ["state_code", "date"], "total": {"column": "district_code", "equals": "1"}}),
+    ]
+    return lambda: check_rules(df.lazy(), rules)
+
+
+@benchmark("formulas.check")
+def formulas_check(size):
+    df = to_polars(synthetic.wide_table(rows=size["rows"], columns=size["columns"]))
+    indicators = [c for c in df.columns if c.startswith("indicator_")]
+    df = df.with_columns(
+        (pl.col(indicators[0]) + pl.col(indicators[1])).alias("total"),
+        (pl.col(indicators[0]) / pl.col(indicators[1]) * 100).round(2).alias("share"),
+    )
+    variables = [{"name": c} for c in indicators] + [
+        {"name": "total", "formula": f"{indicators[0]} + {indicators[1]}"},
+        {"name": "share", "formula": f"round({indicators[0]} / {indicators[1]} * 100, 2)"},
+        {"name": "total_share", "formula": "share / total"},
+    ]
+    formulas, _ = parse_formulas(variables)
+    return lambda: check_formulas(df, formulas)
+
+
+@benchmark("units.convert")
+def units_convert(size):
+    df = to_polars(synthetic.wide_table(rows=size["rows"], columns=size["columns"]))
+    indicators = [c for c in df.columns if c.startswith("indicator_")]
+    df = df.with_columns(pl.Series("unit", ["Rs Lakh", "Rs Crore", "Rs"] * (df.height // 3) + ["Rs"] * (df.height % 3)))
+    variables = [{"name": c, "measurement_unit": "Lakh Hectare"} for c in indicators[1:]] + [
+        {"name": indicators[0], "unit_varies": True}]
+    conversions, _ = plan_conversions(df, variables)
+    return lambda: convert_units(df, conversions)
+
+
+@benchmark("redundancy.columns")
+def redundancy_columns(size):
+    df = to_polars(synthetic.wide_table(rows=size["rows"], columns=size["columns"]))
+    df = df.with_columns(
+        (pl.col("indicator_0") / 100).alias("indicator_0_crore"),
+        (pl.col("indicator_1") + pl.col("indicator_2")).alias("total"),
+    )
+    return lambda: redundant_columns(df)
+
+
+@benchmark("missingness.analyze")
+def missingness_analyze(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+    return lambda: missingness(df)
+
+
+@benchmark("panel.completeness")
+def panel_completeness(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+    return lambda: completeness(df)
+
+
+@benchmark("lgd.reconcile_state_names")
+def lgd_reconcile_state_names(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+    return lambda: lgd.replace_level_names(df, "state")
+
+
+@benchmark("dedup.count_and_drop")
+def dedup_count_and_drop(size):
+    df = to_polars(synthetic.district_panel(years=size["years"], duplicates=0.05))
+    return lambda: (duplicate_count(df), clean.drop_duplicates(df))
+
+
+def export_benchmark(fmt):
+    def setup(size):
+        df = to_polars(synthetic.district_panel(years=size["years"]))
+        return lambda: export_bytes(df, fmt)
+    return setup
+
+
+for fmt, (ext, _) in export_formats.items():
+    benchmark(f"export.{ext}")(export_benchmark(fmt))
+
+
+@benchmark("export.partitioned")
+def export_partitioned(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+
+    def run():
+        with tempfile.TemporaryDirectory() as path:
+            write_partitioned(df, path)
+    return run
+
+
+def ingest_benchmark(fmt):
+    def setup(size):
+        df = to_polars(synthetic.district_panel(years=size["years"]))
+        path = Path(tempfile.mkdtemp()) / f"panel.{export_formats[fmt][0]}"
+        if fmt == "Arrow IPC":
+            # uncompressed: compressed IPC files can't be memory mapped
+            df.write_ipc(path, compression="uncompressed")
+        else:
+            path.write_bytes(export_bytes(df, fmt))
+        return lambda: ingest.read(path)
+    return setup
+
+
+for fmt in ["CSV", "Parquet (zstd)", "Arrow IPC"]:
+    benchmark(f"ingest.{export_formats[fmt][0]}")(ingest_benchmark(fmt))
+
+
+@benchmark("ingest.csv_optimized")
+def ingest_csv_optimized(size):
+    df = to_polars(synthetic.district_panel(years=size["years"]))
+    path = Path(tempfile.mkdtemp()) / "panel.csv"
+    path.write_bytes(export_bytes(df, "CSV"))
+    return lambda: optimize.read_optimized(path)
+
+
+@benchmark("codebook.export")
+def codebook_export(size):
+    from lib.bipp.codebook.export import to_excel_codebook
+    cb = synthetic.codebook(variables=size["variables"])
+    return lambda: to_excel_codebook(cb)
+
+
+@benchmark("codebook.parse")
+def codebook_parse(size):
+    from lib.bipp.codebook.export import to_excel_codebook
+    from lib.bipp.codebook.parse import parse_codebook
+    excel = to_excel_codebook(synthetic.codebook(variables=size["variables"])).getvalue()
+    return lambda: parse_codebook(pd.ExcelFile(io.BytesIO(excel)))
+
+
+@benchmark("codebook.critique")
+def codebook_critique(size):
+    from lib.bipp.codebook.export import to_excel_codebook
+    from lib.critic import critique_codebook
+    excel = to_excel_codebook(synthetic.codebook(variables=size["variables"]))
+    raw = pd.read_excel(excel, sheet_name="codebook", header=None)
+    return lambda: critique_codebook(raw.copy(), test_results=list())
+
+
+@benchmark("codebook.find_titles_row")
+def codebook_find_titles_row(size):
+    from lib.bipp.codebook.export import to_excel_codebook
+    from lib.bipp.codebook.parse import find_titles_row_in_codebook
+    excel = to_excel_codebook(synthetic.codebook(variables=size["variables"]))
+    raw = pd.read_excel(excel, sheet_name="codebook", header=None)
+    return lambda: find_titles_row_in_codebook(raw)
+
+
+def measure(run, repeat: int):
+    """Wall times of `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+    }
+
+
+def _status(field: str) -> int:
+    """A memory field of /proc/self/status (e.g. VmRSS), in bytes."""
+    line = next(line for line in Path("/proc/self/status").read_text().splitlines() if line.startswith(field + ":"))
+    return int(line.split()[1]) * 1024
+
+
+def run_peak_memory(run) -> float:
+    """
+    The peak resident memory of one run over the memory before it, in MB, so the buffers of
+    polars and Arrow count. The high water mark is reset before the run (Linux); without /proc
+    only Python allocations are traced.
+    """
+    if not Path("/proc/self/status").exists():
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak / 2 ** 20
+    baseline = _status("VmRSS")
+    try:
+        # resets VmHWM to the current resident memory
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+    run()
+    return max(_status("VmHWM") - baseline, 0) / 2 ** 20
+
+
+def peak_memory(name: str, size: str) -> float:
+    """The peak memory of one run of a benchmark in a fresh interpreter, where no earlier run left memory behind."""
+    out = subprocess.run([sys.executable, "-m", "benchmarks.run", "--size", size, "--peak-memory-of", name],
+                         cwd=root, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise Exception(f"{name} failed:\n{out.stderr}")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def git_info():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD"), "dirty": git("status", "--porcelain", "--untracked-files=no") != ""}
+
+
+def versions():
+    out = {"python": platform.python_version()}
+    for name in ["pandas", "polars", "numpy", "pyarrow", "openpyxl"]:
+        try:
+            out[name] = __import__(name).__version__
+        except ImportError:
+            out[name] = None
+    return out
+
+
+def run_benchmarks(size="small", repeat=3, only=None):
+    results = []
+    for name, setup in benchmarks.items():
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        print(f"{name} ...", file=sys.stderr, end=" ", flush=True)
+        result = {"name": name, **measure(setup(sizes[size]), repeat), "peak_memory_mb": peak_memory(name, size)}
+        print(f"{result['median']:.3f}s, {result['peak_memory_mb']:.1f} MB", file=sys.stderr)
+        results.append(result)
+    return {
+        **git_info(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "platform": platform.platform(),
+        "versions": versions(),
+        "size": size,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the benchmarks and writes the results as json.")
+    parser.add_argument("--size", choices=sizes.keys(), default="small")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="benchmark name prefixes to run")
+    parser.add_argument("--output", default="-", help="json file to write, '-' for stdout")
+    parser.add_argument("--peak-memory-of", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.peak_memory_of:
+        print(run_peak_memory(benchmarks[args.peak_memory_of](sizes[args.size])))
+        return
+    report = json.dumps(run_benchmarks(args.size, args.repeat, args.only), indent=2)
+    if args.output == "-":
+        print(report)
+    else:
+        Path(args.output).write_text(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# Seeded generators of India-shaped synthetic datasets and codebooks used by the
+# benchmarks. The same arguments always produce the same data.
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+root = Path(__file__).resolve().parent.parent
+
+date_formats = ["%d-%m-%Y", "%Y-%m-%d", "%b-%Y", "%d/%m/%Y", "%m/%d/%Y", "%Y", "%d-%b-%Y"]
+indicator_words = ["population", "literacy", "rainfall", "yield", "area", "hospitals", "schools",
+                   "households", "enrolment", "expenditure", "income", "vaccinated", "workers"]
+
+
+def lgd_tables():
+    """The bundled state and district LGD directories."""
+    states = pd.read_csv(root / "state_lgd.csv", encoding="utf-8-sig")
+    districts = pd.read_csv(root / "district_lgd.csv", encoding="utf-8-sig")
+    return states, districts
+
+
+def lgd_districts(seed=0):
+    """Bundled LGD districts, each assigned to a (random but seeded) bundled state."""
+    rng = np.random.default_rng(seed)
+    states, districts = lgd_tables()
+    idx = rng.integers(0, len(states), len(districts))
+    return pd.DataFrame({
+        "state_code": states["state_lgd_code"].to_numpy()[idx],
+        "state_name": states["state_name"].to_numpy()[idx],
+        "district_code": districts["district_lgd_code"].to_numpy(),
+        "district_name": districts["district_name"].to_numpy(),
+    })
+
+
+def dirty_names(names: pd.Series, rng: np.random.Generator, fraction=0.2):
+    """Randomly lower/upper cases, pads, abbreviates '&' and drops letters from a fraction of names."""
+    names = names.astype(str).to_numpy(dtype=object).copy()
+    dirty = np.flatnonzero(rng.random(len(names)) < fraction)
+    kinds = rng.integers(0, 5, len(dirty))
+    for i, kind in zip(dirty, kinds):
+        name = names[i]
+        if kind == 0:
+            names[i] = name.lower()
+        elif kind == 1:
+            names[i] = name.upper()
+        elif kind == 2:
+            names[i] = f"  {name} "
+        elif kind == 3:
+            names[i] = name.replace(" And ", " & ")
+        elif len(name) > 3:
+            j = rng.integers(1, len(name) - 1)
+            names[i] = name[:j] + name[j + 1:]
+    return names
+
+
+def format_dates(dates: pd.Series, rng: np.random.Generator):
+    """Formats each date with a random one of the date formats the QA pages accept."""
+    dates = pd.Series(dates).reset_index(drop=True)
+    formats = rng.integers(0, len(date_formats), len(dates))
+    out = np.empty(len(dates), dtype=object)
+    for k, fmt in enumerate(date_formats):
+        mask = formats == k
+        out[mask] = dates[mask].dt.strftime(fmt).to_numpy()
+    return out
+
+
+def mixed_dates(n: int, rng: np.random.Generator, start="2001-01-01", end="2023-12-31"):
+    days = pd.date_range(start, end, freq="D")
+    return format_dates(days[rng.integers(0, len(days), n)], rng)
+
+
+def district_panel(years=20, months=12, indicators=5, missing=0.02, duplicates=0.01, seed=0):
+    """
+    A district x year x month panel with LGD codes, dirty names, mixed date formats, a few
+    missing cells, dropped region-periods and duplicated rows.
+    """
+    rng = np.random.default_rng(seed)
+    regions = lgd_districts(seed)
+    periods = pd.date_range("2001-01-01", periods=years * months, freq=f"{12 // months}MS")
+    grid = regions.merge(pd.DataFrame({"date": periods}), how="cross")
+    # drop a few region-periods so the panel isn't complete
+    grid = grid[rng.random(len(grid)) > missing].reset_index(drop=True)
+    n = len(grid)
+    df = pd.DataFrame({
+        "state_code": grid["state_code"],
+        "state_name": dirty_names(grid["state_name"], rng),
+        "district_code": grid["district_code"],
+        "district_name": dirty_names(grid["district_name"], rng),
+        "year": grid["date"].dt.year,
+        "date": format_dates(grid["date"], rng),
+    })
+    for k in range(indicators):
+        values = rng.gamma(2.0, 1000.0, n).round(rng.integers(0, 5))
+        values[rng.random(n) < missing] = np.nan
+        df[f"{indicator_words[k % len(indicator_words)]}_{k}"] = values
+    dup = df.sample(frac=duplicates, random_state=seed)
+    return pd.concat([df, dup], ignore_index=True)
+
+
+def village_panel(villages=100_000, years=3, seed=0):
+    """Village x year rows with six digit village codes nested in bundled districts."""
+    rng = np.random.default_rng(seed)
+    regions = lgd_districts(seed)
+    parent = rng.integers(0, len(regions), villages)
+    df = regions.iloc[parent].reset_index(drop=True)
+    df["village_code"] = np.arange(100000, 100000 + villages)
+    df["village_name"] = [f"Village {i}" for i in range(villages)]
+    df = df.loc[df.index.repeat(years)].reset_index(drop=True)
+    df["year"] = np.tile(np.arange(2021 - years, 2021), villages)
+    df["households"] = rng.integers(10, 2000, len(df))
+    return df
+
+
+def date_column(n=100_000, seed=0):
+    return pd.Series(mixed_dates(n, np.random.default_rng(seed)), name="date")
+
+
+def wide_table(rows=10_000, columns=500, missing=0.05, seed=0):
+    """A wide indicator table keyed by district with `columns` float columns."""
+    rng = np.random.default_rng(seed)
+    regions = lgd_districts(seed)
+    idx = rng.integers(0, len(regions), rows)
+    values = rng.normal(100, 25, (rows, columns))
+    values[rng.random((rows, columns)) < missing] = np.nan
+    df = pd.DataFrame(values, columns=[f"indicator_{k}" for k in range(columns)])
+    df.insert(0, "district_code", regions["district_code"].to_numpy()[idx])
+    df.insert(0, "state_code", regions["state_code"].to_numpy()[idx])
+    return df
+
+
+def codebook(variables=2000, seed=0):
+    """A json codebook (as returned by `parse_codebook`) with `variables` variables."""
+    rng = np.random.default_rng(seed)
+    names = [f"{indicator_words[k % len(indicator_words)]}_{k}" for k in range(variables)]
+    return {
+        "variables": [
+            {
+                "name": name,
+                "description": name.replace("_", " ").title(),
+                "data_type": "NUMERIC",
+                "measurement_unit": str(rng.choice(["Number", "Lakh", "Hectare", "Percentage"])),
+                "formula": None,
+                "category": None,
+                "unit_conversion": None,
+                "dependent_variable": None,
+                "is_derived": False,
+                "unit_varies": False,
+                "visual_exclude": False,
+            }
+            for name in names
+        ],
+        "metadata": {
+            "domains": ["Health"],
+            "dataset_name": "Synthetic Dataset",
+            "granularity_level": "District",
+            "frequency": "Monthly",
+            "source_name": "Synthetic Source",
+            "source_link": "https://example.org",
+            "data_retrieval_date": "01-01-2024",
+            "data_last_updated": "01-01-2024",
+            "data_extraction_page": "https://example.org/data",
+            "about": "Synthetic district level indicators.",
+            "methodology": "Generated.",
+            "resource": "synthetic_resource",
+            "data_insights": "None.",
+            "tags": ["synthetic", "benchmark"],
+            "similar_datasets": [],
+            "package_description": "Synthetic package.",
+        },
+        "additional_information": {
+            "years_covered": "2001-2020",
+            "notes": "Synthetic notes.",
+            "no_of_states": 36,
+            "no_of_districts": 784,
+            "no_of_tehsils": 0,
+            "no_of_villages": 0,
+            "no_of_gps": 0,
+            "no_of_indicators": variables,
+        },
+    }
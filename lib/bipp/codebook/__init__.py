@@ -1,3 +1,16 @@
-from lib.bipp.codebook.parse import *
-from lib.bipp.codebook.export import *
-from lib.bipp.codebook.schema.codebook import Codebook
\ No newline at end of file
+from importlib import import_module
+
+# parse and export pull in pandas and pandera, so they are only imported when one of
+# their names is first used, e.g. `from lib.bipp.codebook import parse_codebook`.
+_lazy_modules = ["lib.bipp.codebook.parse", "lib.bipp.codebook.export"]
+
+
+def __getattr__(name):
+    if name == "Codebook":
+        from lib.bipp.codebook.schema.codebook import Codebook
+        return Codebook
+    for module_name in _lazy_modules:
+        module = import_module(module_name)
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+# Codebooks are keyed by their ckan resource name. Each row also stores a hash
+# of the full codebook so re-ingesting an unchanged codebook is a no-op.
+schema = """
+CREATE TABLE IF NOT EXISTS codebooks (
+    id INTEGER PRIMARY KEY,
+    resource TEXT NOT NULL UNIQUE,
+    dataset_name TEXT,
+    granularity_level TEXT COLLATE NOCASE,
+    frequency TEXT COLLATE NOCASE,
+    source_name TEXT,
+    about TEXT,
+    tags TEXT,
+    years_covered TEXT,
+    content_hash TEXT NOT NULL,
+    source_path TEXT,
+    codebook TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS codebooks_granularity ON codebooks(granularity_level);
+CREATE INDEX IF NOT EXISTS codebooks_frequency ON codebooks(frequency);
+
+CREATE TABLE IF NOT EXISTS codebook_domains (
+    domain TEXT NOT NULL COLLATE NOCASE,
+    codebook_id INTEGER NOT NULL REFERENCES codebooks(id) ON DELETE CASCADE,
+    PRIMARY KEY (domain, codebook_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS codebook_tags (
+    tag TEXT NOT NULL COLLATE NOCASE,
+    codebook_id INTEGER NOT NULL REFERENCES codebooks(id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, codebook_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS variables (
+    id INTEGER PRIMARY KEY,
+    codebook_id INTEGER NOT NULL REFERENCES codebooks(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    description TEXT,
+    data_type TEXT,
+    measurement_unit TEXT,
+    is_derived INTEGER
+);
+CREATE INDEX IF NOT EXISTS variables_name ON variables(name, codebook_id);
+CREATE INDEX IF NOT EXISTS variables_codebook ON variables(codebook_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS variables_fts USING fts5(
+    name, description, content='variables', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS variables_ai AFTER INSERT ON variables BEGIN
+    INSERT INTO variables_fts(rowid, name, description)
+    VALUES (new.id, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS variables_ad AFTER DELETE ON variables BEGIN
+    INSERT INTO variables_fts(variables_fts, rowid, name, description)
+    VALUES ('delete', old.id, old.name, old.description);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS codebooks_fts USING fts5(
+    dataset_name, about, tags, content='codebooks', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS codebooks_ai AFTER INSERT ON codebooks BEGIN
+    INSERT INTO codebooks_fts(rowid, dataset_name, about, tags)
+    VALUES (new.id, new.dataset_name, new.about, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS codebooks_ad AFTER DELETE ON codebooks BEGIN
+    INSERT INTO codebooks_fts(codebooks_fts, rowid, dataset_name, about, tags)
+    VALUES ('delete', old.id, old.dataset_name, old.about, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS codebooks_au AFTER UPDATE ON codebooks BEGIN
+    INSERT INTO codebooks_fts(codebooks_fts, rowid, dataset_name, about, tags)
+    VALUES ('delete', old.id, old.dataset_name, old.about, old.tags);
+    INSERT INTO codebooks_fts(rowid, dataset_name, about, tags)
+    VALUES (new.id, new.dataset_name, new.about, new.tags);
+END;
+"""
+
+summary_columns = ["resource", "dataset_name",
+                   "granularity_level", "frequency", "source_name", "tags"]
+
+
+def open_catalog(path="catalog.db", **kwargs):
+    """Opens (and creates if needed) a codebook catalog stored in a SQLite file."""
+    conn = sqlite3.connect(path, **kwargs)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(schema)
+    return conn
+
+
+def codebook_hash(cb: dict):
+    """Returns a stable hash of a json codebook."""
+    encoded = json.dumps(cb, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _clean_list(values):
+    return sorted({v.strip() for v in values or [] if v and v.strip()})
+
+
+def upsert_codebook(conn: sqlite3.Connection, cb: dict, source_path: Optional[str] = None):
+    """
+    Inserts or replaces a json codebook (as returned by `parse_codebook`) in the catalog.
+    Returns False if the catalog already holds an identical codebook for the resource.
+    """
+    meta = cb["metadata"]
+    addi = cb.get("additional_information") or {}
+    content_hash = codebook_hash(cb)
+    existing = conn.execute(
+        "SELECT id, content_hash FROM codebooks WHERE resource = ?", (meta["resource"],)).fetchone()
+    if existing is not None and existing["content_hash"] == content_hash:
+        return False
+
+    tags = _clean_list(meta.get("tags"))
+    row = (
+        meta["resource"], meta.get("dataset_name"), meta.get("granularity_level"),
+        meta.get("frequency"), meta.get("source_name"), meta.get("about"),
+        ", ".join(tags), addi.get("years_covered"), content_hash, source_path,
+        json.dumps(cb, default=str),
+    )
+    codebook_id = conn.execute("""
+        INSERT INTO codebooks (resource, dataset_name, granularity_level, frequency, source_name,
+                               about, tags, years_covered, content_hash, source_path, codebook)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(resource) DO UPDATE SET
+            dataset_name = excluded.dataset_name,
+            granularity_level = excluded.granularity_level,
+            frequency = excluded.frequency,
+            source_name = excluded.source_name,
+            about = excluded.about,
+            tags = excluded.tags,
+            years_covered = excluded.years_covered,
+            content_hash = excluded.content_hash,
+            source_path = excluded.source_path,
+            codebook = excluded.codebook
+        RETURNING id
+    """, row).fetchone()[0]
+
+    if existing is not None:
+        for table in ["codebook_domains", "codebook_tags", "variables"]:
+            conn.execute(
+                f"DELETE FROM {table} WHERE codebook_id = ?", (codebook_id,))
+
+    conn.executemany("INSERT INTO codebook_domains (domain, codebook_id) VALUES (?, ?)",
+                     [(d, codebook_id) for d in _clean_list(meta.get("domains"))])
+    conn.executemany("INSERT INTO codebook_tags (tag, codebook_id) VALUES (?, ?)",
+                     [(t, codebook_id) for t in tags])
+    conn.executemany("""
+        INSERT INTO variables (codebook_id, name, description, data_type, measurement_unit, is_derived)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [
+        (codebook_id, v["name"], v.get("description"), v.get("data_type"),
+         v.get("measurement_unit"), int(bool(v.get("is_derived"))))
+        for v in cb["variables"]
+    ])
+    return True
+
+
+def ingest_codebooks(conn: sqlite3.Connection, codebooks: Iterable[dict]):
+    """Upserts many json codebooks in a single transaction. Returns the number of changed codebooks."""
+    with conn:
+        return sum(upsert_codebook(conn, cb) for cb in codebooks)
+
+
+def ingest_directory(conn: sqlite3.Connection, path, pattern="*.xlsx"):
+    """
+    Parses and upserts every Excel codebook in a directory, and adds them to the similarity
+    index stored in the same database.
+    Returns the number of changed codebooks and a mapping of files that couldn't be parsed to their errors.
+    """
+    import pandas as pd
+    from lib.bipp.codebook.parse import parse_codebook
+    from lib.bipp.codebook.similar import create_similarity_index, add_codebooks
+
+    changed = 0
+    errors = {}
+    codebooks = []
+    with conn:
+        for file in sorted(Path(path).glob(pattern)):
+            try:
+                cb = parse_codebook(pd.ExcelFile(file))
+            except Exception as e:
+                errors[str(file)] = e
+                continue
+            changed += upsert_codebook(conn, cb, source_path=str(file))
+            codebooks.append(cb)
+    create_similarity_index(conn)
+    add_codebooks(conn, codebooks)
+    return changed, errors
+
+
+def remove_codebook(conn: sqlite3.Connection, resource: str):
+    """Removes a resource (and its variables, domains and tags) from the catalog."""
+    with conn:
+        return conn.execute("DELETE FROM codebooks WHERE resource = ?", (resource,)).rowcount > 0
+
+
+def get_codebook(conn: sqlite3.Connection, resource: str):
+    """Returns the json codebook stored for a resource, or None."""
+    row = conn.execute(
+        "SELECT codebook FROM codebooks WHERE resource = ?", (resource,)).fetchone()
+    return None if row is None else json.loads(row["codebook"])
+
+
+def find_datasets(conn: sqlite3.Connection, variable: Optional[str] = None, domain: Optional[str] = None,
+                  granularity: Optional[str] = None, frequency: Optional[str] = None,
+                  tag: Optional[str] = None, limit=100):
+    """
+    Finds codebooks matching all of the given filters. Every filter is an exact
+    (case-insensitive for domain, granularity, frequency and tag) indexed lookup.
+    """
+    clauses, params = [], []
+    if variable:
+        clauses.append(
+            "EXISTS (SELECT 1 FROM variables v WHERE v.name = ? AND v.codebook_id = c.id)")
+        params.append(variable.strip().lower())
+    if domain:
+        clauses.append(
+            "EXISTS (SELECT 1 FROM codebook_domains d WHERE d.domain = ? AND d.codebook_id = c.id)")
+        params.append(domain.strip())
+    if tag:
+        clauses.append(
+            "EXISTS (SELECT 1 FROM codebook_tags t WHERE t.tag = ? AND t.codebook_id = c.id)")
+        params.append(tag.strip())
+    if granularity:
+        clauses.append("c.granularity_level = ?")
+        params.append(granularity.strip())
+    if frequency:
+        clauses.append("c.frequency = ?")
+        params.append(frequency.strip())
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(f"""
+        SELECT {', '.join('c.' + col for col in summary_columns)}
+        FROM codebooks c {where}
+        ORDER BY c.resource
+        LIMIT ?
+    """, (*params, limit)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def _fts_query(text: str):
+    """Turns free text into an fts5 query where every word must match (as a prefix)."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text.lower()))
+
+
+def search_variables(conn: sqlite3.Connection, text: str, limit=100):
+    """Full text search over variable names and descriptions of all codebooks."""
+    query = _fts_query(text)
+    if query == "":
+        return []
+    rows = conn.execute("""
+        SELECT c.resource, c.dataset_name, v.name, v.description, v.data_type, v.measurement_unit
+        FROM variables_fts f
+        JOIN variables v ON v.id = f.rowid
+        JOIN codebooks c ON c.id = v.codebook_id
+        WHERE variables_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ?
+    """, (query, limit)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def search_datasets(conn: sqlite3.Connection, text: str, limit=100):
+    """Full text search over dataset names, descriptions and tags."""
+    query = _fts_query(text)
+    if query == "":
+        return []
+    rows = conn.execute(f"""
+        SELECT {', '.join('c.' + col for col in summary_columns)}
+        FROM codebooks_fts f
+        JOIN codebooks c ON c.id = f.rowid
+        WHERE codebooks_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ?
+    """, (query, limit)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def list_values(conn: sqlite3.Connection, field: str) -> List[str]:
+    """Distinct values of a catalog facet: 'domain', 'tag', 'granularity_level' or 'frequency'."""
+    queries = {
+        "domain": "SELECT DISTINCT domain FROM codebook_domains ORDER BY 1",
+        "tag": "SELECT DISTINCT tag FROM codebook_tags ORDER BY 1",
+        "granularity_level": "SELECT DISTINCT granularity_level FROM codebooks ORDER BY 1",
+        "frequency": "SELECT DISTINCT frequency FROM codebooks ORDER BY 1",
+    }
+    return [r[0] for r in conn.execute(queries[field]).fetchall() if r[0] is not None]
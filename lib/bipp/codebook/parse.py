@@ -1,7 +1,7 @@
 # %%
 from functools import partial
 import pandas as pd
-from rapidfuzz.process import extractOne
+from lib.critic import get_similar, get_similar_or_itself
 from lib.bipp.codebook.schema.variables import CodebookSchemaV0, codebook_columns_v0
 from lib.bipp.codebook.schema.variables import Variable, cast_codebook
 from lib.bipp.codebook.schema.metadata import MetadataSchemaV0, metadata_fields_v0
@@ -10,19 +10,6 @@ from lib.bipp.codebook.schema.additional_info import additional_information_fiel
 from lib.bipp.codebook.schema.additional_info import AdditionalInformation
 import numpy as np
 from typing import Literal
-# %%
-
-
-def get_similar(name: str, candidates, score_cutoff=90, **kwargs):
-    result = extractOne(name, candidates, score_cutoff=score_cutoff, **kwargs)
-    return None if result is None else result[0]
-
-# %%
-
-
-def get_similar_or_itself(name: str, candidates, **kwargs):
-    match = get_similar(name, candidates, **kwargs)
-    return name if match is None else match
 
 
 # %%
@@ -0,0 +1,141 @@
+import hashlib
+import re
+import sqlite3
+from typing import Iterable, List, Set
+import numpy as np
+from lib.bipp.codebook.schema.types import alphanumeric_name
+
+# MinHash signatures are split into BANDS bands of ROWS rows each. Two codebooks
+# become candidates when any band matches exactly, which for 32 x 4 happens with
+# ~50% probability at a jaccard similarity of ~0.42 and ~99% at ~0.75.
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+_mersenne_prime = np.uint64((1 << 61) - 1)
+_max_hash = np.uint64((1 << 32) - 1)
+# fixed seed so signatures stay comparable across processes and restarts
+_generator = np.random.RandomState(1)
+_a = _generator.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_b = _generator.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+schema = """
+CREATE TABLE IF NOT EXISTS minhashes (
+    key TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    key TEXT NOT NULL REFERENCES minhashes(key) ON DELETE CASCADE,
+    PRIMARY KEY (band, bucket, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lsh_buckets_key ON lsh_buckets(key);
+"""
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", str(text or "").lower())
+
+
+def shingles(text, k=3):
+    """Word k-shingles of a text."""
+    words = _words(text)
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i+k]) for i in range(len(words) - k + 1)}
+
+
+def codebook_tokens(cb: dict) -> Set[str]:
+    """
+    Features used to compare codebooks: normalized variable names, words of variable
+    descriptions and word shingles of the dataset's 'about' text.
+    """
+    tokens = set()
+    for v in cb["variables"]:
+        tokens.add("name:" + alphanumeric_name(str(v["name"])))
+        tokens.update("desc:" + w for w in _words(v.get("description")))
+    tokens.update("about:" + s for s in shingles(cb["metadata"].get("about")))
+    return tokens
+
+
+def minhash(tokens: Iterable[str]):
+    """Computes a MinHash signature (uint32 array of NUM_PERM values) of a set of tokens."""
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little")
+         for t in tokens),
+        dtype=np.uint64,
+    )
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _max_hash, dtype=np.uint32)
+    permuted = (np.outer(hashes, _a) + _b) % _mersenne_prime & _max_hash
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def jaccard(signature: np.ndarray, others: np.ndarray):
+    """Estimated jaccard similarity between a signature and each row of `others`."""
+    return (others == signature).mean(axis=-1)
+
+
+def _buckets(signature: np.ndarray):
+    bands = signature.reshape(BANDS, ROWS)
+    return [
+        (band, int.from_bytes(hashlib.blake2b(
+            bands[band].tobytes(), digest_size=8).digest(), "little", signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def create_similarity_index(conn: sqlite3.Connection):
+    """Creates the MinHash LSH tables in a database if they don't exist yet."""
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(schema)
+
+
+def open_similarity_index(path="catalog.db", **kwargs):
+    """Opens (and creates if needed) a MinHash LSH index stored in a SQLite file."""
+    conn = sqlite3.connect(path, **kwargs)
+    create_similarity_index(conn)
+    return conn
+
+
+def add_signature(conn: sqlite3.Connection, key: str, signature: np.ndarray):
+    conn.execute("DELETE FROM minhashes WHERE key = ?", (key,))
+    conn.execute("INSERT INTO minhashes (key, signature) VALUES (?, ?)",
+                 (key, signature.astype(np.uint32).tobytes()))
+    conn.executemany("INSERT INTO lsh_buckets (band, bucket, key) VALUES (?, ?, ?)",
+                     [(band, bucket, key) for band, bucket in _buckets(signature)])
+
+
+def add_codebooks(conn: sqlite3.Connection, codebooks: Iterable[dict]):
+    """Adds (or replaces) json codebooks in the index, keyed by their resource name."""
+    with conn:
+        for cb in codebooks:
+            add_signature(conn, cb["metadata"]["resource"],
+                          minhash(codebook_tokens(cb)))
+
+
+def query_signature(conn: sqlite3.Connection, signature: np.ndarray, top_n=5, min_similarity=0.2, exclude=()):
+    """Returns up to `top_n` (key, similarity) pairs of indexed signatures sharing a band with `signature`."""
+    buckets = _buckets(signature)
+    values = ", ".join("(?, ?)" for _ in buckets)
+    rows = conn.execute(f"""
+        SELECT DISTINCT m.key, m.signature
+        FROM lsh_buckets b JOIN minhashes m ON m.key = b.key
+        WHERE (b.band, b.bucket) IN (VALUES {values})
+    """, [v for bucket in buckets for v in bucket]).fetchall()
+    rows = [r for r in rows if r[0] not in exclude]
+    if len(rows) == 0:
+        return []
+    keys = [r[0] for r in rows]
+    signatures = np.frombuffer(b"".join(r[1] for r in rows),
+                               dtype=np.uint32).reshape(len(rows), NUM_PERM)
+    scores = jaccard(signature, signatures)
+    order = np.argsort(-scores, kind="stable")[:top_n]
+    return [(keys[i], float(scores[i])) for i in order if scores[i] >= min_similarity]
+
+
+def similar_datasets(conn: sqlite3.Connection, cb: dict, top_n=5, min_similarity=0.2) -> List[tuple]:
+    """Suggests similar indexed datasets for a json codebook as (resource, similarity) pairs."""
+    return query_signature(conn, minhash(codebook_tokens(cb)), top_n=top_n, min_similarity=min_similarity,
+                           exclude={cb["metadata"].get("resource")})
@@ -2,7 +2,7 @@
 import pandas as pd
 from typing import List
 from rapidfuzz.process import extractOne
-from functools import partial
+from functools import partial, lru_cache
 from enum import Enum, auto
 from collections import namedtuple
 from typing import List
@@ -47,11 +47,21 @@ def has_required_sheets(wb: pd.ExcelFile, **kwargs):
 # %%
 
 
-def get_similar(name: str, candidates, score_cutoff=90, **kwargs):
-    result = extractOne(name, candidates, score_cutoff=score_cutoff, **kwargs)
+@lru_cache(maxsize=2 ** 16)
+def _get_similar(name: str, candidates: tuple, score_cutoff):
+    result = extractOne(name, candidates, score_cutoff=score_cutoff)
     return None if result is None else result[0]
 
 
+def get_similar(name: str, candidates, score_cutoff=90, **kwargs):
+    # the same titles and field names come up in every codebook, so matches
+    # are memoized for the lifetime of the process
+    if kwargs or not isinstance(name, str):
+        result = extractOne(name, candidates, score_cutoff=score_cutoff, **kwargs)
+        return None if result is None else result[0]
+    return _get_similar(name, tuple(candidates), score_cutoff)
+
+
 def get_similar_or_itself(name: str, candidates, **kwargs):
     match = get_similar(name, candidates, **kwargs)
     return name if match is None else match
@@ -222,6 +232,23 @@ def critique_metadata(df: pd.DataFrame, test_results: List[TestResult] = list())
 # %%
 
 
+def critique_formulas(codebook: pd.DataFrame, test_results: List[TestResult] = list()):
+    """
+    Checks that formulas only use arithmetic on variables of the codebook and don't refer to
+    each other in a cycle.
+    """
+    from lib.qa.formulas import parse_formulas
+    variables = codebook.rename(columns={"variable name": "name"})[["name", "formula"]]
+    formulas, errors = parse_formulas(variables.dropna(subset=["name"]).to_dict(orient="records"))
+    for name, error in errors.items():
+        test_results.append(
+            TestResult(TestResultType.ERROR, f"Formula of '{name}': {error}."))
+    if formulas and not errors:
+        test_results.append(
+            TestResult(TestResultType.SUCCESS, "All formulas are valid."))
+    return test_results
+
+
 def critique_codebook(df: pd.DataFrame, test_results: List[TestResult] = list()):
     titles_row_idx = find_titles_row_in_codebook(df)
     if titles_row_idx != 1:
@@ -270,7 +297,8 @@ def critique_codebook(df: pd.DataFrame, test_results: List[TestResult] = list())
                 TestResult(TestResultType.ERROR, f"""All variable names should be unique. Duplicates: '{"', '".join(set(duplicates))}'""")
             )
 
-    
+    if "variable name" in codebook.columns and "formula" in codebook.columns:
+        test_results = critique_formulas(codebook, test_results=test_results)
 
     if "variable description" in codebook.columns and not all_rows_have_values(codebook["variable description"]):
         test_results.append(
@@ -0,0 +1,14 @@
+import polars as pl
+
+# Streamlit serializes every frame it is given into the page, so only bounded slices
+# are handed to it; polars slices share the buffers of the frame they come from.
+display_rows = 1000
+
+
+def head(df: pl.DataFrame, n=display_rows) -> pl.DataFrame:
+    return df.head(n)
+
+
+def sample(df: pl.DataFrame, n=5, seed=0) -> pl.DataFrame:
+    """`n` random rows (all of them for smaller frames), gathered without converting the frame."""
+    return df.sample(n=min(n, df.height), seed=seed)
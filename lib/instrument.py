@@ -0,0 +1,93 @@
+import json
+import os
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from typing import List
+
+# Set IDP_INSTRUMENTATION=off to turn every span into a no-op, and
+# IDP_TRACE_ALLOCATIONS=on to also record peak python allocations per span
+# (tracemalloc slows down allocation heavy code, so it is opt-in).
+enabled = os.environ.get("IDP_INSTRUMENTATION", "on").lower() not in ("0", "off", "false", "no")
+trace_allocations = os.environ.get("IDP_TRACE_ALLOCATIONS", "off").lower() in ("1", "on", "true", "yes")
+
+SpanResult = namedtuple("SpanResult", [
+    "name", "parent", "depth", "wall_time", "cpu_time", "rss_change_mb", "peak_alloc_mb"])
+page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb():
+    """Current resident set size of the process, None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * page_size / 2 ** 20
+    except OSError:
+        return None
+
+
+class Timings:
+    """Records nested spans of a single page run."""
+
+    def __init__(self, enabled=enabled, trace_allocations=trace_allocations):
+        self.enabled = enabled
+        self.trace_allocations = enabled and trace_allocations
+        self.results: List[SpanResult] = []
+        self._stack = []
+
+    @contextmanager
+    def _span(self, name: str):
+        parent = self._stack[-1] if self._stack else None
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if parent is not None:
+                parent["alloc"] = max(parent["alloc"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = {"name": name, "alloc": 0}
+        self._stack.append(frame)
+        # keep spans in the order they started, though inner spans finish first
+        index = len(self.results)
+        self.results.append(None)
+        rss = rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            # the resident memory a span leaves allocated (the process peak is shared by all the
+            # spans and sessions of a long running server, so it says nothing about one span)
+            rss = None if rss is None else rss_mb() - rss
+            self._stack.pop()
+            alloc = None
+            if self.trace_allocations:
+                alloc = max(frame["alloc"], tracemalloc.get_traced_memory()[1])
+                if parent is not None:
+                    parent["alloc"] = max(parent["alloc"], alloc)
+                tracemalloc.reset_peak()
+                alloc = alloc / 2 ** 20
+            self.results[index] = SpanResult(
+                name, parent["name"] if parent else None, len(self._stack),
+                wall, cpu, rss, alloc)
+
+    def span(self, name: str):
+        """Context manager recording wall time, cpu time and the change of resident memory of its body."""
+        return self._span(name) if self.enabled else nullcontext()
+
+    def to_records(self):
+        return [r._asdict() for r in self.results if r is not None]
+
+    def to_json(self):
+        return json.dumps(self.to_records(), indent=2)
+
+
+def show_timings(timings: Timings):
+    """Renders the recorded spans as a collapsible table in a streamlit page."""
+    if not timings.enabled or not timings.to_records():
+        return
+    import streamlit as st
+    import pandas as pd
+    with st.expander("Timings"):
+        df = pd.DataFrame(timings.to_records())
+        df["name"] = ["  " * d + n for d, n in zip(df["depth"], df["name"])]
+        st.dataframe(df.drop(columns=["parent", "depth"]), hide_index=True)
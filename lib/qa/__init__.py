@@ -0,0 +1,24 @@
+# The dataset QA engine shared by the QA pages. Every check works on polars frames
+# (pandas and Arrow data are converted with pl.from_pandas/pl.from_arrow at the edges):
+#   profile - per column statistics in a single pass
+#   dates   - date normalization over the accepted date formats
+#   lgd     - reconciliation of region names against the LGD directories
+#   clean   - column cleaning operations (padding, casing, rounding, casts)
+#   report  - the text DQA report
+#   export  - in memory downloads of the cleaned dataset
+#   partition - hive partitioned parquet output with a manifest
+#   ingest  - reading datasets from server files
+#   optimize - dtypes using less memory (categoricals, downcast numbers)
+#   precision - decimal places, float artifacts and scientific notation of numbers
+#   codes   - validation of zero padded LGD codes
+#   hierarchy - memory mapped LGD hierarchy below districts, for lookups and rollups
+#   dependencies - codes with several names, names with several codes or parents
+#   panel   - missing region/period cells of panels
+#   frequency - the frequency of a dataset inferred from its periods
+#   numeric - numbers written as text (1,23,456, 12.5%, (123), NA, ...)
+#   rules   - declarative cross column rules checked in a single query
+#   formulas - derived columns compared with their codebook formulas
+#   units   - conversion of codebook units (lakh, crore, quintal, ...) to base units
+#   redundancy - duplicated, rescaled and summed columns, as proposed formulas
+#   missingness - columns missing together and null rates per region/period, with bitmaps
+#   views   - the streamlit ui of the QA pages
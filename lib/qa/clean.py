@@ -0,0 +1,92 @@
+import polars as pl
+from lib.qa.dates import normalize_dates
+from lib.qa.profile import is_float, is_string
+
+# LGD code columns and the width their codes are zero padded to
+code_widths = {
+    "state_code": 2, "district_code": 3, "sub_district_code": 4,
+    "block_code": 4, "village_code": 6, "gp_code": 6,
+}
+dtypes = ["No Change", "int", "float", "str", "date"]
+
+
+def code_text(col: str, dtype) -> pl.Expr:
+    """Codes as trimmed strings, with the '.0' of codes read as floats (7.0 or '7.0') dropped."""
+    codes = pl.col(col)
+    if is_float(dtype):
+        codes = codes.cast(pl.Int64, strict=False)
+    codes = codes.cast(pl.Utf8)
+    if is_string(dtype):
+        codes = codes.str.strip().str.replace(r"^(\d+)\.0*$", "$1")
+    return codes
+
+
+def padded_codes(col: str, dtype, width: int) -> pl.Expr:
+    """Numeric codes zero padded to `width`; anything else (e.g. 'NA') is left as it is."""
+    codes = code_text(col, dtype)
+    return pl.when(codes.str.contains(r"^\d+$")).then(codes.str.zfill(width)).otherwise(codes)
+
+
+def pad_codes(df: pl.DataFrame, col: str, width: int = None):
+    """Formats the codes of a column as zero padded strings, e.g. 7 -> '07'."""
+    width = width or code_widths[col]
+    return df.with_columns(padded_codes(col, df.schema[col], width).alias(col))
+
+
+def map_distinct(df: pl.DataFrame, col: str, expr: pl.Expr):
+    """
+    Applies a string expression (on `pl.col(col)`) to the distinct values of a column only and
+    joins the results back. Categorical columns stay categorical, so only their dictionary of
+    names is rewritten rather than every row.
+    """
+    dtype = df.schema[col]
+    mapping = (
+        df.select(pl.col(col).unique())
+        .with_columns(expr.alias("\x00mapped"))
+        .with_columns(pl.col("\x00mapped").cast(dtype))
+    )
+    return df.join(mapping, on=col, how="left").with_columns(pl.col("\x00mapped").alias(col)).drop("\x00mapped")
+
+
+def to_title_case(df: pl.DataFrame, col: str):
+    return map_distinct(df, col, pl.col(col).cast(pl.Utf8).str.to_titlecase())
+
+
+def clean_names(df: pl.DataFrame, col: str):
+    """Replaces '&' with 'and', drops everything but letters and spaces and trims the names."""
+    return map_distinct(
+        df, col,
+        pl.col(col).cast(pl.Utf8)
+        .str.replace_all("&", "and", literal=True)
+        .str.replace_all(r"[^a-zA-Z\s]", "")
+        .str.strip()
+    )
+
+
+def round_decimals(df: pl.DataFrame, col: str, decimals=2):
+    return df.with_columns(pl.col(col).round(decimals))
+
+
+def to_absolute(df: pl.DataFrame, col: str):
+    return df.with_columns(pl.col(col).abs())
+
+
+def change_dtype(df: pl.DataFrame, col: str, dtype: str):
+    """Casts a column to one of `dtypes`; dates are normalized to dd-mm-yyyy strings."""
+    if dtype == "date":
+        return df.with_columns(normalize_dates(df.get_column(col)))
+    values = pl.col(col)
+    if df.schema[col] == pl.Categorical:
+        # categoricals cast to numbers as their dictionary indices
+        values = values.cast(pl.Utf8)
+    if dtype == "int":
+        return df.with_columns(values.cast(pl.Int64))
+    if dtype == "float":
+        return df.with_columns(values.cast(pl.Float64).round(3))
+    if dtype == "str":
+        return df.with_columns(pl.col(col).cast(pl.Utf8))
+    return df
+
+
+def drop_duplicates(df: pl.DataFrame):
+    return df.unique(keep="first", maintain_order=True)
@@ -0,0 +1,74 @@
+from typing import Dict
+import polars as pl
+from lib.qa.clean import code_text, code_widths, padded_codes
+from lib.qa.lgd import levels
+
+# code column -> (LGD directory, its code column) for the code columns with a bundled directory
+lgd_codes = {code: (lgd, lgd_code) for code, _, lgd, lgd_code in levels.values()}
+issues = ["not numeric", "too long", "not in LGD"]
+
+
+def code_columns(df: pl.DataFrame):
+    return [col for col in code_widths if col in df.columns]
+
+
+def lgd_reference(col: str, width: int):
+    """The padded LGD codes of a code column, from the bundled directories or the hierarchy store."""
+    if col in lgd_codes:
+        lgd, lgd_code = lgd_codes[col]
+        return lgd().lazy().select(padded_codes(lgd_code, pl.Utf8, width).alias("padded")).unique()
+    # numpy (for the hierarchy store) is only imported when a dataset has codes below districts
+    from lib.qa import hierarchy
+    level = col.removesuffix("_code")
+    if level in hierarchy.available_levels():
+        codes = pl.Series("code", hierarchy.load_level(level).codes).cast(pl.Utf8)
+        return codes.to_frame().lazy().select(padded_codes("code", pl.Utf8, width).alias("padded"))
+    return None
+
+
+def code_issues(df: pl.DataFrame, col: str, width: int = None) -> pl.DataFrame:
+    """
+    The distinct codes of a column that can't be valid once zero padded: codes that aren't
+    numbers, codes longer than the column's width and (for columns with a bundled LGD directory)
+    padded codes that aren't in the directory, with the number of rows of each. The data is read
+    once, to count the rows of every distinct code; the checks then run on the distinct codes,
+    against LGD with an anti join.
+    """
+    width = width or code_widths[col]
+    dtype = df.schema[col]
+    codes = (
+        df.lazy()
+        .groupby(col)
+        .agg(pl.count().alias("rows"))
+        .drop_nulls(col)
+        .with_columns(
+            code_text(col, dtype).alias("text"),
+            padded_codes(col, dtype, width).alias("padded"),
+        )
+        .with_columns(
+            pl.when(~pl.col("text").str.contains(r"^\d+$")).then(pl.lit(issues[0]))
+            .when(pl.col("text").str.lstrip("0").str.lengths() > width).then(pl.lit(issues[1]))
+            .alias("issue")
+        )
+    )
+    reference = lgd_reference(col, width)
+    if reference is not None:
+        unknown = (
+            codes.filter(pl.col("issue").is_null())
+            .join(reference, on="padded", how="anti")
+            .with_columns(pl.lit(issues[2]).alias("issue"))
+        )
+        codes = pl.concat([codes.filter(pl.col("issue").is_not_null()), unknown], how="vertical")
+    else:
+        codes = codes.filter(pl.col("issue").is_not_null())
+    return (
+        codes.select(pl.col(col).cast(pl.Utf8).alias("code"), "padded", "issue", "rows")
+        .sort(["issue", "rows", "code"], descending=[False, True, False])
+        .collect()
+    )
+
+
+def all_code_issues(df: pl.DataFrame) -> Dict[str, pl.DataFrame]:
+    """`code_issues` of every code column of `df` that has any."""
+    found = {col: code_issues(df, col) for col in code_columns(df)}
+    return {col: codes for col, codes in found.items() if not codes.is_empty()}
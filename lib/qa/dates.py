@@ -0,0 +1,38 @@
+import polars as pl
+
+# Accepted input formats, in order of precedence (the first one that parses a value wins).
+date_formats = ["%b-%Y", "%d-%m-%Y", "%Y-%m-%d", "%m-%Y", "%Y", "%d-%b-%Y", "%m/%d/%Y",
+                "%d/%m/%Y", "%Y.%m.%d", "%m/%d/%y", "%d/%m/%y", "%b %d, %Y", "%d-%m-%y", "%Y/%m/%d"]
+output_format = "%d-%m-%Y"
+invalid_date = "Invalid Date"
+
+
+def parse_dates(values: pl.Expr, formats=date_formats) -> pl.Expr:
+    """Parses strings trying each format in turn, unparseable values become null."""
+    parsed = []
+    values = values.cast(pl.Utf8)
+    for fmt in formats:
+        date = values.str.strptime(pl.Date, fmt, strict=False)
+        if "%Y" in fmt:
+            # %Y also accepts two digit years, which must fall through to the %y formats
+            date = pl.when(date.dt.year() >= 1000).then(date)
+        parsed.append(date)
+    return pl.coalesce(parsed)
+
+
+def normalize_dates(series: pl.Series, formats=date_formats) -> pl.Series:
+    """
+    Rewrites dates given in any of the accepted formats as dd-mm-yyyy. Values that can't be
+    parsed become 'Invalid Date', nulls stay null. Only the distinct values are parsed.
+    """
+    name = series.name
+    values = series.cast(pl.Utf8).str.strip()
+    distinct = values.unique().drop_nulls().to_frame("value")
+    mapping = distinct.with_columns(
+        parse_dates(pl.col("value"), formats).dt.strftime(output_format).fill_null(invalid_date).alias("date"))
+    return (
+        values.to_frame("value")
+        .join(mapping, on="value", how="left")
+        .get_column("date")
+        .alias(name)
+    )
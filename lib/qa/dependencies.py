@@ -0,0 +1,102 @@
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List
+import polars as pl
+from lib.qa import lgd
+from lib.qa.lgd import parent_levels
+
+# A dependency `determinant -> dependent` holds when every value of the determinant comes with a
+# single value of the dependent: a district code with one district name, a district code in
+# one state. Codes are unique across the country, so a level's code should determine its name
+# (1:1) and its parent's code (many:1). Names are only unique within their parent (Hamirpur,
+# Bilaspur and Pratapgarh are districts of two states each), so a name should determine its
+# code within its parent: the dependency is checked `within` the parent's column. Without codes,
+# a name should determine its parent, except for the names LGD lists more than once (`shared`).
+Dependency = namedtuple("Dependency", ["determinant", "dependent", "kind", "within", "shared"], defaults=[(), None])
+
+
+def levels(columns) -> List[str]:
+    """The region levels with a code or a name column in `columns`, the coarsest first."""
+    return [level for level in parent_levels if f"{level}_code" in columns or f"{level}_name" in columns]
+
+
+def key_columns(dependency: Dependency) -> List[str]:
+    """The columns whose values determine the dependent: the determinant within its scope."""
+    return [*dependency.within, dependency.determinant]
+
+
+@lru_cache(maxsize=None)
+def shared_names(level: str) -> frozenset:
+    """The (lower case) names LGD lists more than once for a level, e.g. districts of two states."""
+    if level not in lgd.levels:
+        return frozenset()
+    _, name, directory, _ = lgd.levels[level]
+    names = directory().get_column(name).str.strip().str.to_lowercase()
+    return frozenset(names.filter(names.is_duplicated()).to_list())
+
+
+def detect_dependencies(columns) -> List[Dependency]:
+    """The dependencies between the code and name columns of the region levels in `columns`."""
+    columns = set(columns)
+    found = levels(columns)
+    dependencies = []
+    for level in found:
+        code, name = f"{level}_code", f"{level}_name"
+        parent = parent_levels.get(level)
+        while parent is not None and parent not in found:
+            parent = parent_levels.get(parent)
+        # the column of the parent a name is unique within, the name when there is one
+        parent_column = None if parent is None else next(
+            c for c in [f"{parent}_name", f"{parent}_code"] if c in columns)
+        if code in columns and name in columns:
+            dependencies.append(Dependency(code, name, "1:1"))
+            if parent_levels.get(level) is None:
+                dependencies.append(Dependency(name, code, "1:1"))
+            elif parent is not None:
+                dependencies.append(Dependency(name, code, "1:1", (parent_column,)))
+        if parent is None:
+            continue
+        if code in columns:
+            dependencies.append(Dependency(
+                code, f"{parent}_code" if f"{parent}_code" in columns else parent_column, "many:1"))
+        else:
+            dependencies.append(Dependency(name, parent_column, "many:1", (), level))
+    return dependencies
+
+
+def dependency_violations(data, dependencies: List[Dependency] = None, streaming=True) -> Dict[Dependency, pl.DataFrame]:
+    """
+    Every value of a determinant that comes with more than one value of its dependent, listing
+    each of those values with its number of rows. `data` is a frame or a lazy frame (e.g. a
+    scanned file). The data is aggregated once, into the distinct combinations of all the columns
+    involved with their row counts (a small frame, computed by the streaming engine when
+    `streaming`); every dependency is then checked on those. Needs no reference data but the
+    bundled LGD names, for the names shared by regions of different parents.
+    """
+    data = data.lazy()
+    dependencies = dependencies or detect_dependencies(data.columns)
+    if not dependencies:
+        return {}
+    columns = list(dict.fromkeys(c for d in dependencies for c in (*key_columns(d), d.dependent)))
+    combinations = data.groupby(columns).agg(pl.count().alias("rows")).collect(streaming=streaming)
+    violations = {}
+    for dependency in dependencies:
+        x, y = key_columns(dependency), dependency.dependent
+        pairs = (
+            combinations.lazy()
+            .drop_nulls([*x, y])
+            .groupby([*x, y])
+            .agg(pl.col("rows").sum())
+        )
+        if dependency.shared is not None:
+            shared = list(shared_names(dependency.shared))
+            pairs = pairs.filter(~pl.col(dependency.determinant).cast(pl.Utf8).str.strip().str.to_lowercase().is_in(shared))
+        found = (
+            pairs.filter(pl.count().over(x) > 1)
+            .with_columns([pl.col(c).cast(pl.Utf8) for c in [*x, y]])
+            .sort([*x, "rows"], descending=[False] * len(x) + [True])
+            .collect()
+        )
+        if not found.is_empty():
+            violations[dependency] = found
+    return violations
@@ -0,0 +1,38 @@
+import gzip
+import io
+import polars as pl
+
+# label -> (file extension, mime type)
+export_formats = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet (zstd)": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+def write(df: pl.DataFrame, fmt: str, file):
+    """Writes `df` in one of `export_formats` to a binary file object."""
+    if fmt == "CSV":
+        df.write_csv(file, quote_style="always")
+    elif fmt == "CSV (gzip)":
+        # the csv is compressed as polars writes it, it's never held uncompressed
+        with gzip.GzipFile(fileobj=file, mode="wb", compresslevel=6, mtime=0) as gz:
+            df.write_csv(gz, quote_style="always")
+    elif fmt == "Parquet (zstd)":
+        df.write_parquet(file, compression="zstd", statistics=True)
+    elif fmt == "Arrow IPC":
+        df.write_ipc(file, compression="zstd")
+    else:
+        raise ValueError(f"Unknown export format '{fmt}'. Expected one of: {', '.join(export_formats)}")
+
+
+def export_bytes(df: pl.DataFrame, fmt: str) -> bytes:
+    """`df` written in memory in one of `export_formats`."""
+    buffer = io.BytesIO()
+    write(df, fmt, buffer)
+    return buffer.getvalue()
+
+
+def export_file_name(name: str, fmt: str):
+    return f"{name}.{export_formats[fmt][0]}"
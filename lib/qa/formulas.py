@@ -0,0 +1,247 @@
+import ast
+import operator
+from collections import namedtuple
+from graphlib import TopologicalSorter, CycleError
+from typing import Dict, List
+import polars as pl
+from lib.types import alphanumeric_name
+
+# Formulas of derived variables in codebooks, e.g. `female_population / total_population * 100`.
+# They're parsed with `ast` (never evaluated): only numbers, variable names, arithmetic and the
+# functions below are accepted. `^` is a power, as in spreadsheets, and a leading `=` or
+# `variable =` is ignored.
+
+operators = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow, ast.BitXor: operator.pow,
+}
+unary_operators = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+
+def _round(e: pl.Expr, decimals=0) -> pl.Expr:
+    # polars only rounds to decimal places, round(x, -2) rounds to hundreds as in spreadsheets
+    if decimals >= 0:
+        return e.round(decimals)
+    return (e / 10 ** -decimals).round(0) * 10 ** -decimals
+
+
+def _horizontal(aggregate):
+    # null when any argument is null, as arithmetic is (min/max_horizontal skip nulls)
+    return lambda *e: pl.when(pl.any_horizontal([x.is_null() for x in e])).then(None).otherwise(aggregate(list(e)))
+
+
+functions = {
+    "abs": lambda e: e.abs(),
+    "sqrt": lambda e: e.sqrt(),
+    "log": lambda e: e.log(),
+    "log10": lambda e: e.log10(),
+    "exp": lambda e: e.exp(),
+    "round": _round,
+    "min": _horizontal(pl.min_horizontal),
+    "max": _horizontal(pl.max_horizontal),
+    "sum": lambda *e: pl.sum_horizontal(list(e)),
+}
+# the fewest and most arguments of every function (None: any number)
+arities = {"abs": (1, 1), "sqrt": (1, 1), "log": (1, 1), "log10": (1, 1), "exp": (1, 1), "round": (1, 2),
+           "min": (1, None), "max": (1, None), "sum": (1, None)}
+# derived values are compared with |value - formula| <= tolerance + relative_tolerance * |formula|,
+# which allows for values rounded to two decimal places in the source
+tolerance = 0.01
+relative_tolerance = 0.001
+
+Formula = namedtuple("Formula", ["variable", "text", "tree", "references"])
+
+
+def _decimals(node: ast.AST):
+    """The decimal places of round(), an int constant (possibly negative), None for anything else."""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        decimals = _decimals(node.operand)
+        return -decimals if decimals is not None else None
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return node.value
+    return None
+
+
+def _check(node: ast.AST):
+    """Raises a ValueError for anything in a formula that isn't arithmetic on variables."""
+    if isinstance(node, ast.Expression):
+        return _check(node.body)
+    if isinstance(node, ast.BinOp) and type(node.op) in operators:
+        return _check(node.left), _check(node.right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in unary_operators:
+        return _check(node.operand)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return
+    if isinstance(node, ast.Name):
+        return
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in functions \
+            and not node.keywords:
+        fewest, most = arities[node.func.id]
+        if len(node.args) < fewest or (most is not None and len(node.args) > most):
+            expected = f"at least {fewest}" if most is None else str(fewest) if most == fewest else f"{fewest} or {most}"
+            raise ValueError(f"'{ast.unparse(node)}': {node.func.id}() takes {expected} argument(s)")
+        if node.func.id == "round" and len(node.args) == 2 and _decimals(node.args[1]) is None:
+            raise ValueError(f"'{ast.unparse(node)}': the decimal places of round() must be a whole number")
+        return [_check(arg) for arg in node.args]
+    raise ValueError(f"'{ast.unparse(node)}' isn't allowed in formulas")
+
+
+def parse_formula(text: str, variable: str = None) -> Formula:
+    """Parses a formula into a syntax tree, with the variables it refers to."""
+    text = text.strip().lstrip("=").strip()
+    if variable is not None and text.split("=")[0].strip() == variable and text.count("=") == 1:
+        text = text.split("=")[1].strip()
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError:
+        raise ValueError(f"'{text}' isn't a valid formula")
+    _check(tree)
+    called = {node.func.id for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    references = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)} - called
+    return Formula(variable, text, tree, sorted(references))
+
+
+def parse_formulas(variables: List[dict]):
+    """
+    The formulas of a codebook's variables (dicts with `name` and `formula`, as in json
+    codebooks), with the errors of the formulas that can't be parsed, refer to variables that
+    aren't in the codebook or refer to each other in a cycle. Returns (formulas, errors), both
+    by variable.
+    """
+    names = {v["name"] for v in variables}
+    formulas, errors = {}, {}
+    for v in variables:
+        if not isinstance(v.get("formula"), str) or not v["formula"].strip():
+            continue
+        try:
+            formula = parse_formula(v["formula"], v["name"])
+        except ValueError as e:
+            errors[v["name"]] = str(e)
+            continue
+        unknown = [name for name in formula.references if name not in names]
+        if unknown:
+            errors[v["name"]] = f"refers to variables that aren't in the codebook: {', '.join(unknown)}"
+        else:
+            formulas[v["name"]] = formula
+    for name, error in formula_cycles(formulas).items():
+        errors[name] = error
+        del formulas[name]
+    return formulas, errors
+
+
+def formula_cycles(formulas: Dict[str, Formula]) -> Dict[str, str]:
+    """The error of every variable whose formula is in a cycle (e.g. a = b * 2, b = a / 2), by variable."""
+    graph = {name: [r for r in formula.references if r in formulas] for name, formula in formulas.items()}
+    errors = {}
+    while True:
+        try:
+            TopologicalSorter(graph).prepare()
+            return errors
+        except CycleError as e:
+            cycle = list(reversed(e.args[1]))
+            for name in cycle[:-1]:
+                errors[name] = f"refers to itself in a cycle: {' -> '.join(cycle)}"
+                del graph[name]
+            graph = {name: [r for r in references if r in graph] for name, references in graph.items()}
+
+
+def formula_order(formulas: Dict[str, Formula]) -> List[str]:
+    """
+    The variables with formulas ordered so every formula comes after the formulas it refers to.
+    Raises a ValueError naming the variables of a cycle.
+    """
+    graph = {name: [r for r in formula.references if r in formulas] for name, formula in formulas.items()}
+    try:
+        return list(TopologicalSorter(graph).static_order())
+    except CycleError as e:
+        raise ValueError(f"Formulas refer to each other in a cycle: {' -> '.join(reversed(e.args[1]))}")
+
+
+def to_expr(node: ast.AST, resolve) -> pl.Expr:
+    """Compiles a formula's syntax tree into a polars expression, `resolve` giving the variables."""
+    if isinstance(node, ast.Expression):
+        return to_expr(node.body, resolve)
+    if isinstance(node, ast.BinOp):
+        return operators[type(node.op)](to_expr(node.left, resolve), to_expr(node.right, resolve))
+    if isinstance(node, ast.UnaryOp):
+        return unary_operators[type(node.op)](to_expr(node.operand, resolve))
+    if isinstance(node, ast.Constant):
+        return pl.lit(float(node.value))
+    if isinstance(node, ast.Name):
+        return resolve(node.id)
+    if isinstance(node, ast.Call):
+        args = [to_expr(arg, resolve) for arg in node.args]
+        if node.func.id == "round" and len(node.args) == 2:
+            return functions["round"](args[0], _decimals(node.args[1]))
+        return functions[node.func.id](*args)
+    raise ValueError(f"'{ast.unparse(node)}' isn't allowed in formulas")
+
+
+def variable_columns(columns: List[str]) -> Dict[str, str]:
+    """The dataset column of every variable name, by column name or by its alphanumeric name."""
+    column_of = {alphanumeric_name(c): c for c in columns}
+    column_of.update({c: c for c in columns})
+    return column_of
+
+
+def compile_formulas(formulas: Dict[str, Formula], columns: List[str]):
+    """
+    Polars expressions computing every formula from the dataset's columns. A variable is read
+    from the column with its name (or whose name it is, e.g. 'Total Population' for
+    total_population); variables that aren't columns are computed from their own formula.
+    Returns (expressions, errors) by variable.
+    """
+    column_of = variable_columns(columns)
+    exprs, errors = {}, {}
+
+    def resolve(name):
+        if name in column_of:
+            return pl.col(column_of[name]).cast(pl.Float64, strict=False)
+        if name in exprs:
+            return exprs[name]
+        raise KeyError(name)
+
+    for name in formula_order(formulas):
+        try:
+            exprs[name] = to_expr(formulas[name].tree, resolve)
+        except KeyError as e:
+            errors[name] = f"needs {e.args[0]}, which isn't in the dataset"
+    return exprs, errors
+
+
+def check_formulas(data, formulas: Dict[str, Formula], tolerance=tolerance, relative_tolerance=relative_tolerance):
+    """
+    Compares every derived column of the dataset with its formula. All the formulas are
+    evaluated in a single select. Rows where the column or a variable of the formula is null
+    aren't compared. Returns a frame with the compared rows, mismatches and the largest
+    difference per variable, and the errors of the formulas that couldn't be evaluated.
+    """
+    exprs, errors = compile_formulas(formulas, data.columns)
+    column_of = variable_columns(data.columns)
+    checked = [name for name in exprs if name in column_of]
+    schema = {"variable": pl.Utf8, "formula": pl.Utf8, "compared": pl.UInt32, "mismatches": pl.UInt32,
+              "mismatch_rate": pl.Float64, "max_difference": pl.Float64}
+    if not checked:
+        return pl.DataFrame(schema=schema), errors
+    # the differences are computed once each, then aggregated
+    differences, aggregations = [], []
+    for i, name in enumerate(checked):
+        value = pl.col(column_of[name]).cast(pl.Float64, strict=False)
+        differences += [(value - exprs[name]).abs().fill_nan(None).alias(f"{i}\x00difference"),
+                        (tolerance + relative_tolerance * exprs[name].abs()).alias(f"{i}\x00allowed")]
+        difference = pl.col(f"{i}\x00difference")
+        aggregations += [
+            difference.is_not_null().sum().alias(f"{i}\x00compared"),
+            (difference > pl.col(f"{i}\x00allowed")).sum().alias(f"{i}\x00mismatches"),
+            difference.max().alias(f"{i}\x00max_difference"),
+        ]
+    stats = data.lazy().select(differences).select(aggregations).collect().row(0, named=True)
+    results = pl.DataFrame([{
+        "variable": name,
+        "formula": formulas[name].text,
+        "compared": stats[f"{i}\x00compared"],
+        "mismatches": stats[f"{i}\x00mismatches"],
+        "mismatch_rate": stats[f"{i}\x00mismatches"] / stats[f"{i}\x00compared"] if stats[f"{i}\x00compared"] else None,
+        "max_difference": stats[f"{i}\x00max_difference"],
+    } for i, name in enumerate(checked)], schema=schema)
+    return results.sort("mismatch_rate", descending=True, nulls_last=True), errors
@@ -0,0 +1,92 @@
+from collections import namedtuple
+import polars as pl
+from lib.qa.panel import detect_panel_keys, period_index
+from lib.qa.partition import date_columns, year_columns
+from lib.qa.profile import is_string
+
+# frequency -> the range of days between consecutive periods it covers
+frequencies = {
+    "Daily": (1, 1),
+    "Weekly": (7, 7),
+    "Fortnightly": (14, 16),
+    "Monthly": (28, 31),
+    "Quarterly": (89, 92),
+    "Yearly": (365, 366),
+    "Quinquennially": (1825, 1827),
+}
+# regions whose periods are compared, sampled so the inference stays fast on huge panels
+sample_groups = 200
+# the share of deltas that must agree with the inferred frequency for pages to pre-fill it
+min_confidence = 0.6
+# deltas within this many periods of a whole number of periods are gaps of missing periods
+gap_tolerance = 0.15
+
+FrequencyGuess = namedtuple("FrequencyGuess", ["frequency", "confidence", "distribution", "groups", "deltas"])
+
+
+def period_column(schema: dict):
+    keys = detect_panel_keys(schema)
+    if keys is not None:
+        return keys.period
+    period = next((c for c in date_columns if c in schema and is_string(schema[c])), None)
+    return period or next((c for c in year_columns if c in schema), None)
+
+
+def frequency_of(days: pl.Expr) -> pl.Expr:
+    """The frequency a number of days between periods corresponds to, null if none."""
+    labels = None
+    for label, (low, high) in frequencies.items():
+        match = days.is_between(low, high)
+        labels = pl.when(match).then(pl.lit(label)) if labels is None else labels.when(match).then(pl.lit(label))
+    return labels.otherwise(None)
+
+
+def infer_frequency(df: pl.DataFrame, sample_groups=sample_groups, seed=0):
+    """
+    Infers the frequency of a dataset from its period column: the days between consecutive
+    distinct periods within each region (of a sample of regions) are classified into
+    frequencies. The most common one is the inferred frequency. Its confidence is the share of
+    deltas that agree with it, counting deltas of a few periods (gaps) as agreeing. None if
+    there's no period column or not enough periods.
+    """
+    period = period_column(df.schema)
+    if period is None:
+        return None
+    keys = detect_panel_keys(df.schema)
+    region = keys.region if keys is not None else None
+    if region is not None:
+        regions = df.select(pl.col(region).unique())
+        if regions.height > sample_groups:
+            regions = regions.sample(sample_groups, seed=seed)
+        df = df.join(regions, on=region, how="semi")
+    group = [region] if region is not None else []
+
+    # the distinct periods are parsed once, and numbered in days since 1970
+    index, unit = period_index(df, period)
+    days = pl.col("index") if unit == "day" else pl.date(pl.col("index") // 12, pl.col("index") % 12 + 1, 1)
+    index = index.filter(pl.col("aligned")).select(period, days.cast(pl.Int64).alias("days"))
+    periods = df.select(group + [period]).unique().join(index, on=period, how="inner")
+    deltas = (
+        periods.select(group + ["days"]).unique()
+        .sort(group + ["days"])
+        .with_columns((pl.col("days").diff().over(group) if group else pl.col("days").diff()).alias("delta"))
+        .drop_nulls("delta")
+        .with_columns(frequency_of(pl.col("delta")).fill_null("Other").alias("frequency"))
+    )
+    if deltas.is_empty():
+        return None
+    counts = dict(deltas.groupby("frequency").agg(pl.count()).sort("count", descending=True).iter_rows())
+    known = {f: n for f, n in counts.items() if f != "Other"}
+    frequency = max(known, key=known.get) if known else "Other"
+    if frequency == "Other":
+        confidence = counts[frequency] / deltas.height
+    else:
+        periods = pl.col("delta") / (sum(frequencies[frequency]) / 2)
+        confidence = deltas.select(((periods - periods.round(0)).abs() <= gap_tolerance).mean()).item()
+    return FrequencyGuess(
+        frequency=frequency,
+        confidence=confidence,
+        distribution=counts,
+        groups=deltas.get_column(region).n_unique() if region is not None else 1,
+        deltas=deltas.height,
+    )
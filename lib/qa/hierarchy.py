@@ -0,0 +1,190 @@
+import argparse
+import os
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict
+import numpy as np
+import polars as pl
+from lib.qa.lgd import parent_levels
+
+# The LGD hierarchy below districts (sub-districts, blocks, gram panchayats and villages,
+# ~650k villages) is too big to ship or to read from csv on every start. It's converted once
+# into a store directory with, per level, the sorted codes and the index of every code's parent
+# in its parent level as .npy files, which are memory mapped, plus the names as Arrow IPC:
+#
+#   lgd/village/codes.npy    int64, sorted
+#   lgd/village/parents.npy  int32, row of the parent in lgd/sub_district/codes.npy, -1 if unknown
+#   lgd/village/names.arrow  names in the order of the codes
+#   lgd/village/index.npy    int32, row of every code by code (-1 for gaps), so a lookup is a
+#                            single gather instead of a binary search; only for levels whose
+#                            codes are below `dense_index_limit`
+#
+# The store is built from LGD directory downloads named `{level}_lgd.csv`, with the columns
+# `{level}_lgd_code`, `{level}_name` and `{parent}_lgd_code` (the bundled state and district
+# directories have no parent column; their parents are unknown).
+
+dense_index_limit = 2 ** 24
+
+Level = namedtuple("Level", ["name", "codes", "parents", "index"])
+
+
+def store_path() -> Path:
+    return Path(os.environ.get("IDP_LGD_DIR", "lgd"))
+
+
+def _read_directory(csv_path: Path, level: str) -> pl.DataFrame:
+    parent = parent_levels[level]
+    df = pl.read_csv(csv_path, infer_schema_length=0)
+    columns = [pl.col(f"{level}_lgd_code").str.strip().cast(pl.Int64).alias("code"),
+               pl.col(f"{level}_name").alias("name")]
+    if parent and f"{parent}_lgd_code" in df.columns:
+        columns.append(pl.col(f"{parent}_lgd_code").str.strip().cast(pl.Int64, strict=False).alias("parent_code"))
+    else:
+        columns.append(pl.lit(None, pl.Int64).alias("parent_code"))
+    return df.select(columns).unique("code", keep="first").sort("code")
+
+
+def build_store(source, path=None):
+    """
+    Converts the `{level}_lgd.csv` directories in `source` into a hierarchy store at `path`.
+    Parents are resolved to row indices once here, so lookups never join on codes.
+    Returns the levels written with their number of codes.
+    """
+    source, path = Path(source), Path(path or store_path())
+    frames = {level: _read_directory(source / f"{level}_lgd.csv", level)
+              for level in parent_levels if (source / f"{level}_lgd.csv").is_file()}
+    written = {}
+    for level, df in frames.items():
+        codes = df.get_column("code").to_numpy()
+        parents = np.full(len(codes), -1, dtype=np.int32)
+        parent = parent_levels[level]
+        if parent in frames:
+            parents = _indices(frames[parent].get_column("code").to_numpy(),
+                               df.get_column("parent_code").fill_null(-1).to_numpy())
+        (path / level).mkdir(parents=True, exist_ok=True)
+        np.save(path / level / "codes.npy", codes.astype(np.int64))
+        np.save(path / level / "parents.npy", parents)
+        if len(codes) and 0 <= codes.min() and codes.max() < dense_index_limit:
+            index = np.full(codes.max() + 1, -1, dtype=np.int32)
+            index[codes] = np.arange(len(codes), dtype=np.int32)
+            np.save(path / level / "index.npy", index)
+        elif (path / level / "index.npy").exists():
+            (path / level / "index.npy").unlink()
+        # uncompressed, so it can be memory mapped
+        df.select("name").write_ipc(path / level / "names.arrow", compression="uncompressed")
+        written[level] = len(codes)
+    load_level.cache_clear()
+    return written
+
+
+def _indices(sorted_codes: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """The row of every code in `sorted_codes`, -1 for codes that aren't in it."""
+    if not len(sorted_codes):
+        return np.full(len(codes), -1, dtype=np.int32)
+    rows = np.searchsorted(sorted_codes, codes)
+    rows = np.minimum(rows, len(sorted_codes) - 1)
+    return np.where(sorted_codes[rows] == codes, rows, -1).astype(np.int32)
+
+
+def available_levels(path=None):
+    path = Path(path or store_path())
+    return [level for level in parent_levels if (path / level / "codes.npy").is_file()]
+
+
+@lru_cache(maxsize=None)
+def load_level(level: str, path=None) -> Level:
+    """The codes and parent pointers of a level, memory mapped (shared by every session)."""
+    path = Path(path or store_path()) / level
+    index = np.load(path / "index.npy", mmap_mode="r") if (path / "index.npy").is_file() else None
+    return Level(level, np.load(path / "codes.npy", mmap_mode="r"), np.load(path / "parents.npy", mmap_mode="r"), index)
+
+
+def names(level: str, path=None) -> pl.Series:
+    return pl.read_ipc(Path(path or store_path()) / level / "names.arrow", memory_map=True).get_column("name")
+
+
+def lookup(level: str, codes: np.ndarray, path=None) -> np.ndarray:
+    """The rows of `codes` in a level, -1 for codes that aren't LGD codes of the level."""
+    level = load_level(level, path)
+    codes = np.asarray(codes, dtype=np.int64)
+    if level.index is None:
+        return _indices(level.codes, codes)
+    inside = (codes >= 0) & (codes < len(level.index))
+    return np.where(inside, level.index[np.where(inside, codes, 0)], -1)
+
+
+def ancestry(level: str, to_level: str):
+    """The levels from `level` up to `to_level`, e.g. village, sub_district, district."""
+    levels = [level]
+    while levels[-1] != to_level:
+        parent = parent_levels[levels[-1]]
+        if parent is None:
+            raise ValueError(f"'{to_level}' is not above '{level}' in the LGD hierarchy")
+        levels.append(parent)
+    return levels
+
+
+def rollup(level: str, codes: np.ndarray, to_level: str, path=None) -> np.ndarray:
+    """
+    The `to_level` code of every code of `level`, following the parent pointers one level at a
+    time with vectorized indexing. Unknown codes (or unknown parents) roll up to -1.
+    """
+    rows = lookup(level, codes, path)
+    for child, parent in zip(ancestry(level, to_level), ancestry(level, to_level)[1:]):
+        parents = load_level(child, path).parents
+        rows = np.where(rows >= 0, parents[np.maximum(rows, 0)], -1)
+    codes = load_level(to_level, path).codes
+    return np.where(rows >= 0, codes[np.maximum(rows, 0)], -1)
+
+
+def belongs_to(level: str, codes: np.ndarray, parent_level: str, parent_codes: np.ndarray, path=None) -> np.ndarray:
+    """Whether each code of `level` is under the `parent_level` code next to it."""
+    return rollup(level, codes, parent_level, path) == np.asarray(parent_codes, dtype=np.int64)
+
+
+def hierarchy_mismatches(df: pl.DataFrame, path=None) -> Dict[str, pl.DataFrame]:
+    """
+    For every pair of code columns of `df` whose levels are in the store (village_code and
+    district_code, ...), the distinct pairs whose child isn't under the parent in LGD, with
+    their row counts. Codes that aren't LGD codes at all are left to the code checks.
+    """
+    levels = [level for level in available_levels(path) if f"{level}_code" in df.columns]
+    mismatches = {}
+    for level in levels:
+        for parent in ancestry(level, "state")[1:]:
+            if parent not in levels or not set(ancestry(level, parent)) <= set(available_levels(path)):
+                continue
+            child_col, parent_col = f"{level}_code", f"{parent}_code"
+            pairs = (
+                df.lazy()
+                .groupby([child_col, parent_col])
+                .agg(pl.count().alias("rows"))
+                .with_columns(
+                    pl.col(child_col).cast(pl.Utf8).cast(pl.Int64, strict=False).alias("child"),
+                    pl.col(parent_col).cast(pl.Utf8).cast(pl.Int64, strict=False).alias("parent"),
+                )
+                .drop_nulls(["child", "parent"])
+                .collect()
+            )
+            rolled = rollup(level, pairs.get_column("child").to_numpy(), parent, path)
+            known = rolled >= 0
+            wrong = known & (rolled != pairs.get_column("parent").to_numpy())
+            found = pairs.with_columns(pl.Series(f"lgd_{parent_col}", rolled)).filter(pl.Series(wrong))
+            if not found.is_empty():
+                mismatches[f"{child_col} in {parent_col}"] = found.select(
+                    child_col, parent_col, f"lgd_{parent_col}", "rows").sort("rows", descending=True)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds the LGD hierarchy store from LGD directory csv files.")
+    parser.add_argument("source", help="directory with {level}_lgd.csv files")
+    parser.add_argument("--output", default=None, help="store directory (default: $IDP_LGD_DIR or lgd)")
+    args = parser.parse_args()
+    for level, count in build_store(args.source, args.output).items():
+        print(f"{level}: {count} codes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import codecs
+import csv
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+from typing import Iterator, List
+import polars as pl
+
+# Datasets are read from files on the server instead of being uploaded through the
+# browser (which buffers the whole upload in memory before it's parsed into a copy).
+# Parquet and Arrow IPC files are memory mapped and csv files are read in batches.
+
+csv_suffixes = [".csv", ".tsv", ".txt"]
+parquet_suffixes = [".parquet"]
+ipc_suffixes = [".arrow", ".ipc", ".feather"]
+sniff_bytes = 64 * 1024
+batch_rows = 100_000
+infer_schema_length = 10_000
+
+CsvDialect = namedtuple("CsvDialect", ["encoding", "bom", "separator", "quote_char", "has_header"])
+
+boms = [
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+
+def drop_folder() -> Path:
+    return Path(os.environ.get("IDP_DROP_FOLDER", "drop"))
+
+
+def ingest_roots() -> List[Path]:
+    """Directories datasets can be read from: the drop folder and any in IDP_INGEST_ROOTS."""
+    roots = [drop_folder()]
+    roots += [Path(p) for p in os.environ.get("IDP_INGEST_ROOTS", "").split(os.pathsep) if p]
+    return [r.resolve() for r in roots]
+
+
+def resolve_path(path) -> Path:
+    """
+    The absolute path of a dataset, which must be a file inside one of the ingest roots.
+    Relative paths are relative to the drop folder.
+    """
+    path = Path(path)
+    if not path.is_absolute():
+        path = drop_folder() / path
+    path = path.resolve()
+    if not any(path.is_relative_to(root) for root in ingest_roots()):
+        raise ValueError(f"'{path}' is outside of the directories datasets can be read from")
+    if not path.is_file():
+        raise ValueError(f"'{path}' is not a file")
+    return path
+
+
+def list_drop_folder() -> List[Path]:
+    """Dataset files in the drop folder (and its sub folders), relative to it."""
+    folder = drop_folder()
+    if not folder.is_dir():
+        return []
+    suffixes = csv_suffixes + parquet_suffixes + ipc_suffixes
+    return sorted(p.relative_to(folder) for p in folder.rglob("*") if p.suffix.lower() in suffixes)
+
+
+def sniff(path, sample_bytes=sniff_bytes) -> CsvDialect:
+    """Guesses the encoding, separator and quote character of a csv from its first bytes."""
+    with open(path, "rb") as f:
+        sample = f.read(sample_bytes)
+    encoding, bom = None, False
+    for mark, name in boms:
+        if sample.startswith(mark):
+            encoding, bom, sample = name, True, sample[len(mark):]
+            break
+    if encoding is None:
+        try:
+            # the sample may end in the middle of a character
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "cp1252"
+    text = sample.decode(encoding, errors="ignore")
+    # only whole lines are sniffed
+    if len(sample) == sample_bytes and "\n" in text:
+        text = text[:text.rindex("\n")]
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=",;\t|")
+        separator, quote_char = dialect.delimiter, dialect.quotechar
+    except csv.Error:
+        separator, quote_char = ",", '"'
+    # the first row is always the header: csv.Sniffer().has_header guesses wrong on text columns
+    return CsvDialect(encoding, bom, separator, quote_char, True)
+
+
+def _utf8_path(path: Path, dialect: CsvDialect) -> Path:
+    """`path` itself if it's utf-8, otherwise a utf-8 copy in a temporary file, transcoded in chunks."""
+    if dialect.encoding == "utf-8":
+        return path
+    target = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+    with open(path, "r", encoding=dialect.encoding, newline="") as src, \
+            open(target.name, "w", encoding="utf-8", newline="") as dst:
+        if dialect.bom:
+            src.read(1)
+        shutil.copyfileobj(src, dst, length=1024 * 1024)
+    return Path(target.name)
+
+
+def _csv_options(dialect: CsvDialect, dtypes: dict = None):
+    options = {
+        "separator": dialect.separator,
+        "quote_char": dialect.quote_char,
+        "has_header": dialect.has_header,
+        "infer_schema_length": infer_schema_length,
+    }
+    if dtypes:
+        # polars only reads the columns named in `dtypes` (all of them must be given)
+        options["dtypes"] = dtypes
+    return options
+
+
+def csv_batches(path, dialect: CsvDialect = None, batch_rows=batch_rows, dtypes: dict = None) -> Iterator[pl.DataFrame]:
+    """Reads a csv a batch of about `batch_rows` rows at a time."""
+    path = Path(path)
+    dialect = dialect or sniff(path)
+    source = _utf8_path(path, dialect)
+    try:
+        reader = pl.read_csv_batched(source, batch_size=batch_rows, **_csv_options(dialect, dtypes))
+        while True:
+            batches = reader.next_batches(1)
+            if not batches:
+                return
+            yield from batches
+    finally:
+        if source != path:
+            source.unlink()
+
+
+def scan(path, dialect: CsvDialect = None) -> pl.LazyFrame:
+    """A lazy frame over a dataset file, for queries that shouldn't load the whole file."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in parquet_suffixes:
+        return pl.scan_parquet(path)
+    if suffix in ipc_suffixes:
+        return pl.scan_ipc(path, memory_map=True)
+    dialect = dialect or sniff(path)
+    if dialect.encoding != "utf-8":
+        raise ValueError(f"'{path}' is {dialect.encoding} encoded, only utf-8 csv files can be scanned")
+    return pl.scan_csv(path, **_csv_options(dialect))
+
+
+def head(path, n: int, dialect: CsvDialect = None) -> pl.DataFrame:
+    """The first `n` rows of a dataset file."""
+    path = Path(path)
+    if path.suffix.lower() in csv_suffixes:
+        dialect = dialect or sniff(path)
+        source = _utf8_path(path, dialect)
+        try:
+            return pl.read_csv(source, n_rows=n, **_csv_options(dialect))
+        finally:
+            if source != path:
+                source.unlink()
+    return scan(path).head(n).collect()
+
+
+def read(path, dialect: CsvDialect = None, dtypes: dict = None) -> pl.DataFrame:
+    """
+    Reads a dataset file: parquet and Arrow IPC files are memory mapped, csv files are
+    sniffed and read in batches that are then stitched together without copying.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in parquet_suffixes:
+        return pl.read_parquet(path, memory_map=True)
+    if suffix in ipc_suffixes:
+        return pl.read_ipc(path, memory_map=True)
+    batches = list(csv_batches(path, dialect, dtypes=dtypes))
+    if not batches:
+        # only a header: the columns, without rows
+        header = head(path, 1, dialect)
+        return pl.DataFrame(schema={c: (dtypes or {}).get(c, dtype) for c, dtype in header.schema.items()})
+    return pl.concat(batches, how="vertical", rechunk=False)
+
+
+def read_upload(uploaded_file, dtypes: dict = None) -> pl.DataFrame:
+    """Reads a file uploaded through streamlit."""
+    uploaded_file.seek(0)
+    if uploaded_file.name.endswith(".parquet"):
+        return pl.read_parquet(uploaded_file)
+    return pl.read_csv(uploaded_file, infer_schema_length=infer_schema_length, dtypes=dtypes)
+
+
+def head_upload(uploaded_file, n: int) -> pl.DataFrame:
+    uploaded_file.seek(0)
+    if uploaded_file.name.endswith(".parquet"):
+        return pl.read_parquet(uploaded_file, n_rows=n)
+    return pl.read_csv(uploaded_file, infer_schema_length=infer_schema_length, n_rows=n)
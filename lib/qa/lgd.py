@@ -0,0 +1,84 @@
+import polars as pl
+from lib.qa.profile import is_float, is_string
+from lib.resources import state_lgd, district_lgd
+
+# region level -> (code column, name column) in datasets, and the LGD directory with its code column
+levels = {
+    "state": ("state_code", "state_name", state_lgd, "state_lgd_code"),
+    "district": ("district_code", "district_name", district_lgd, "district_lgd_code"),
+}
+
+# region level -> its parent level in the LGD hierarchy
+parent_levels = {
+    "state": None,
+    "district": "state",
+    "sub_district": "district",
+    "block": "district",
+    "gp": "block",
+    "village": "sub_district",
+}
+
+
+def code_key(name: str, dtype) -> pl.Expr:
+    """Codes as strings without leading zeros, so 1, 1.0, '1' and '01' all match."""
+    col = pl.col(name)
+    if is_float(dtype):
+        col = col.cast(pl.Int64, strict=False)
+    col = col.cast(pl.Utf8)
+    if is_string(dtype):
+        col = col.str.strip()
+    return col.str.lstrip("0")
+
+
+def detected_levels(df: pl.DataFrame):
+    """Region levels whose code and name columns are both in `df`."""
+    return [level for level, (code, name, _, _) in levels.items() if code in df.columns and name in df.columns]
+
+
+def name_mismatches(df: pl.DataFrame, code: str, name: str, lgd: pl.DataFrame, lgd_code: str, lgd_name: str = None):
+    """
+    Distinct (code, name) pairs of `df` whose name differs from the LGD name of the code,
+    with the LGD name and the number of rows of each pair. Codes missing from LGD are skipped.
+    """
+    lgd_name = lgd_name or name
+    reference = lgd.lazy().select(
+        code_key(lgd_code, lgd.schema[lgd_code]).alias("key"),
+        pl.col(lgd_name).alias("lgd_name"),
+    )
+    return (
+        df.lazy()
+        .groupby([code, name])
+        .agg(pl.count().alias("rows"))
+        .with_columns(code_key(code, df.schema[code]).alias("key"))
+        .join(reference, on="key", how="inner")
+        # categorical names are compared (and sorted) as strings, once per distinct pair
+        .with_columns(pl.col(name).cast(pl.Utf8))
+        .filter(pl.col(name) != pl.col("lgd_name"))
+        .select(code, name, "lgd_name", "rows")
+        .sort([code, name])
+        .collect()
+    )
+
+
+def replace_names(df: pl.DataFrame, mismatches: pl.DataFrame, code: str, name: str):
+    """Replaces the names of the (code, name) pairs in `mismatches` with their LGD names."""
+    dtype = df.schema[name]
+    mapping = mismatches.select(pl.col(code).cast(df.schema[code]), pl.col(name).cast(dtype), "lgd_name")
+    return (
+        df.join(mapping, on=[code, name], how="left")
+        .with_columns(pl.coalesce("lgd_name", pl.col(name).cast(pl.Utf8)).cast(dtype).alias(name))
+        .drop("lgd_name")
+    )
+
+
+def level_mismatches(df: pl.DataFrame, level: str):
+    code, name, lgd, lgd_code = levels[level]
+    return name_mismatches(df, code, name, lgd(), lgd_code)
+
+
+def replace_level_names(df: pl.DataFrame, level: str, mismatches: pl.DataFrame = None):
+    """Replaces every name of a region level that differs from its LGD name."""
+    code, name, _, _ = levels[level]
+    if mismatches is None:
+        mismatches = level_mismatches(df, level)
+    return replace_names(df, mismatches, code, name)
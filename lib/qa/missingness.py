@@ -0,0 +1,160 @@
+from collections import namedtuple
+from typing import List
+import numpy as np
+import polars as pl
+from lib.qa.frequency import period_column
+from lib.qa.profile import is_float
+
+# A value is missing when it's null or NaN (float columns read from files often hold NaN for
+# blanks), in the counts, the bitmaps and the breakdowns alike. Every column's missing values are
+# encoded as a bitmap, one bit per row, inverted from the Arrow validity buffer of the column when
+# it has no NaN, so comparing the nulls of two columns is an AND of two bitmaps and a popcount
+# over 64 rows at a time.
+
+# columns the null rates are broken down by, the coarsest region first (codes before names, which
+# are often misspelt)
+region_columns = ["state_code", "state_name", "district_code", "district_name"]
+# the most columns whose pairs are compared (the ones with the most nulls)
+max_columns = 500
+# groups of a breakdown shown per column (the ones with the highest null rates)
+top_groups = 20
+# the fewest rows of a group for a column missing in all of them to be a structural gap
+min_group_rows = 10
+
+Missingness = namedtuple("Missingness", ["rows", "columns", "co_missing", "breakdowns", "structural"])
+
+
+def is_missing(column: str, dtype) -> pl.Expr:
+    """Whether each value of a column is missing: null, or NaN in float columns."""
+    if is_float(dtype):
+        return pl.col(column).is_null() | pl.col(column).is_nan()
+    return pl.col(column).is_null()
+
+
+def missing_bitmap(series: pl.Series) -> np.ndarray:
+    """The rows where a column is null (or NaN) as a bitmap of little endian bits, padded to 64 bits."""
+    n = len(series)
+    words = (n + 63) // 64
+    array = series.rechunk().to_arrow()
+    validity = array.buffers()[0] if series.null_count() else None
+    if is_float(series.dtype) and series.is_nan().any():
+        bitmap = np.packbits((series.is_null() | series.is_nan()).to_numpy(), bitorder="little")
+    elif validity is None:
+        return np.zeros(words, dtype=np.uint64)
+    elif array.offset % 8 == 0:
+        # a copy of the validity bits, inverted
+        bitmap = ~np.frombuffer(validity, dtype=np.uint8, count=(array.offset + n + 7) // 8)[array.offset // 8:]
+    else:
+        bitmap = np.packbits(series.is_null().to_numpy(), bitorder="little")
+    padded = np.zeros(words * 8, dtype=np.uint8)
+    padded[:len(bitmap)] = bitmap
+    if n % 8:
+        padded[n // 8] &= (1 << (n % 8)) - 1
+    padded[(n + 7) // 8:] = 0
+    return padded.view(np.uint64)
+
+
+def popcount(words: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    The number of set bits of every uint64 (numpy 1.x has no bitwise_count), summed over the last
+    axis. The words are overwritten; `out`, of the words' shape, avoids allocating temporaries.
+    """
+    tmp = np.empty_like(words) if out is None else out
+    np.right_shift(words, np.uint64(1), out=tmp)
+    tmp &= np.uint64(0x5555555555555555)
+    words -= tmp
+    np.right_shift(words, np.uint64(2), out=tmp)
+    tmp &= np.uint64(0x3333333333333333)
+    words &= np.uint64(0x3333333333333333)
+    words += tmp
+    np.right_shift(words, np.uint64(4), out=tmp)
+    words += tmp
+    words &= np.uint64(0x0F0F0F0F0F0F0F0F)
+    words *= np.uint64(0x0101010101010101)
+    words >>= np.uint64(56)
+    return words.sum(axis=-1)
+
+
+def co_missingness(bitmaps: np.ndarray, columns: List[str], nulls: np.ndarray) -> pl.DataFrame:
+    """
+    The rows where both columns of every pair are missing, from the popcounts of the ANDs of
+    their bitmaps (one column against all the later ones at a time). Only pairs missing together
+    at least once are kept; 'share' is the Jaccard similarity of their missing rows.
+    """
+    firsts, seconds, both = [], [], []
+    words, tmp = np.empty_like(bitmaps), np.empty_like(bitmaps)
+    for i in range(len(columns) - 1):
+        rest = len(columns) - i - 1
+        np.bitwise_and(bitmaps[i], bitmaps[i + 1:], out=words[:rest])
+        counts = popcount(words[:rest], tmp[:rest])
+        js = np.flatnonzero(counts) + i + 1
+        firsts += [i] * len(js)
+        seconds += js.tolist()
+        both += counts[js - i - 1].tolist()
+    firsts, seconds, both = np.array(firsts, dtype=np.int64), np.array(seconds, dtype=np.int64), np.array(both)
+    union = nulls[firsts] + nulls[seconds] - both if len(both) else both
+    return pl.DataFrame({
+        "column": [columns[i] for i in firsts],
+        "other": [columns[j] for j in seconds],
+        "both_missing": both,
+        "share": both / union if len(both) else both.astype(float),
+        # the nulls of one column are all in rows where the other is missing too
+        "nested": (both == nulls[firsts]) | (both == nulls[seconds]) if len(both) else both.astype(bool),
+    }, schema={"column": pl.Utf8, "other": pl.Utf8, "both_missing": pl.Int64, "share": pl.Float64,
+               "nested": pl.Boolean}).sort("share", descending=True)
+
+
+def null_breakdowns(df: pl.DataFrame, keys: List[str], columns: List[str]):
+    """
+    The missing rate of every column within every group of each key. The rows are aggregated
+    once, by all the keys together; each key's groups are sums of those cells.
+    """
+    cells = (
+        df.lazy()
+        .groupby(keys)
+        .agg([pl.count().alias("\x00rows")] + [is_missing(c, df.schema[c]).sum().alias(c) for c in columns])
+        .collect()
+    )
+    breakdowns = {}
+    for key in keys:
+        counts = cells.groupby(key).agg(pl.col("\x00rows").sum(), *[pl.col(c).sum() for c in columns])
+        breakdowns[key] = (
+            counts.melt(id_vars=[key, "\x00rows"], value_vars=columns, variable_name="column", value_name="nulls")
+            .rename({"\x00rows": "rows"})
+            .with_columns(pl.col(key).cast(pl.Utf8), (pl.col("nulls") / pl.col("rows")).alias("rate"))
+            .select("column", pl.col(key).alias("group"), "rows", "nulls", "rate")
+        )
+    return breakdowns
+
+
+def missingness(df: pl.DataFrame, max_columns=max_columns) -> Missingness:
+    """
+    The missing (null or NaN) counts of every column, which columns are missing together, and
+    the missing rates per region and per period. A column entirely missing in a group it's present elsewhere is a
+    structural gap (e.g. an indicator not collected in a state or a year).
+    """
+    nulls = df.select([is_missing(c, dtype).sum().alias(c) for c, dtype in df.schema.items()]).row(0) if df.width else ()
+    counts = pl.DataFrame({"column": df.columns, "nulls": nulls}, schema={"column": pl.Utf8, "nulls": pl.Int64}) \
+        .with_columns((pl.col("nulls") / max(df.height, 1)).alias("rate")).sort("nulls", descending=True)
+    missing = counts.filter(pl.col("nulls") > 0).head(max_columns)
+    columns = missing.get_column("column").to_list()
+    bitmaps = np.stack([missing_bitmap(df.get_column(c)) for c in columns]) if columns else np.zeros((0, 0), np.uint64)
+    co_missing = co_missingness(bitmaps, columns, np.array(missing.get_column("nulls")))
+
+    keys = [k for k in [next((c for c in region_columns if c in df.columns), None), period_column(df.schema)] if k]
+    # columns missing in every row have no structural gaps, and nothing to break down
+    values = missing.filter(pl.col("nulls") < df.height).get_column("column").to_list()
+    values = [c for c in values if c not in keys]
+    breakdowns = null_breakdowns(df, keys, values) if keys and values else {}
+    structural = pl.concat([
+        b.filter((pl.col("rate") == 1) & pl.col("rows").is_between(min_group_rows, df.height - 1)).with_columns(pl.lit(key).alias("by"))
+        for key, b in breakdowns.items()
+    ], how="vertical") if breakdowns else pl.DataFrame(
+        schema={"column": pl.Utf8, "group": pl.Utf8, "rows": pl.UInt32, "nulls": pl.UInt32, "rate": pl.Float64, "by": pl.Utf8})
+    # the partly missing columns, and per group the top `top_groups` rates of each column
+    breakdowns = {
+        key: b.filter(pl.col("nulls") > 0).sort("rate", descending=True)
+        .groupby("column", maintain_order=True).head(top_groups)
+        for key, b in breakdowns.items()
+    }
+    return Missingness(df.height, counts, co_missing, breakdowns, structural.select("by", "group", "column", "rows"))
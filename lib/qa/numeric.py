@@ -0,0 +1,134 @@
+from typing import Dict, List
+import polars as pl
+from lib.qa.optimize import is_code_column
+from lib.qa.profile import is_string
+
+# Numbers in tables from government portals, as text. Each rule is a pattern on the trimmed
+# text; the rules are applied in this order, so a footnote marker is dropped before the
+# percent sign or the parentheses of the number it follows are recognized.
+missing_pattern = r"(?i)^(na|n\.a\.?|n/a|-+|–|—|\*+|\.{2,}|x)$"
+zero_pattern = r"(?i)^nil$"
+footnote_pattern = r"(\s*\([a-z]\)|\s*[*#@†‡^]+)$"
+negative_pattern = r"^\((.*)\)$"
+percent_pattern = r"%$"
+separator_pattern = r"^[+-]?\d{1,3}(,\d{2})*,\d{3}(\.\d+)?$|^[+-]?\d{1,3}(,\d{3})+(\.\d+)?$"
+
+numeric_rules = {
+    "missing": "missing markers (NA, -, *, ...) made null",
+    "nil": "'Nil' read as 0",
+    "footnote": "footnote markers dropped",
+    "negative": "(123) read as -123",
+    "percent": "percent signs dropped",
+    "separators": "thousands separators (1,23,456) dropped",
+    "plain": "plain numbers",
+    "unparsed": "values that aren't numbers made null",
+}
+# share of a text column's values that must be numbers (after the rules) for it to be offered
+min_numeric_share = 0.5
+
+
+def _steps(col: pl.Expr):
+    """The text after each rule, with whether the rule applied to it."""
+    text = col.cast(pl.Utf8).str.strip()
+    flags = {
+        "missing": text.str.contains(missing_pattern),
+        "nil": text.str.contains(zero_pattern),
+    }
+    flags["footnote"] = text.str.contains(footnote_pattern) & ~flags["missing"]
+    text = text.str.replace(footnote_pattern, "")
+    flags["negative"] = text.str.contains(negative_pattern)
+    text = text.str.replace(negative_pattern, "-$1").str.strip()
+    flags["percent"] = text.str.contains(percent_pattern)
+    text = text.str.replace(percent_pattern, "").str.strip()
+    flags["separators"] = text.str.contains(separator_pattern)
+    text = pl.when(flags["separators"]).then(text.str.replace_all(",", "", literal=True)).otherwise(text)
+    text = text.str.replace(r"^-\+", "-").str.replace(r"^--", "")
+    return text, flags
+
+
+def parse_numbers(col: pl.Expr) -> pl.Expr:
+    """Numbers written in any of the recognized ways as floats; anything else becomes null."""
+    text, flags = _steps(col)
+    return (
+        pl.when(flags["missing"]).then(None)
+        .when(flags["nil"]).then(pl.lit(0.0))
+        .otherwise(text.cast(pl.Float64, strict=False))
+    )
+
+
+def _plain(col: str) -> pl.Expr:
+    return pl.col(col).cast(pl.Utf8).str.strip().cast(pl.Float64, strict=False)
+
+
+def _other_values(df: pl.DataFrame, col: str) -> pl.DataFrame:
+    """
+    The distinct values of a column that aren't plain numbers, with their number of cells and
+    their parsed number. The rules' string kernels only run on these, not on every cell.
+    """
+    return (
+        df.lazy()
+        .filter(pl.col(col).is_not_null() & _plain(col).is_null())
+        .groupby(col).agg(pl.count().alias("cells"))
+        .with_columns(parse_numbers(pl.col(col)).alias("number"))
+        .collect()
+    )
+
+
+def numeric_tally(df: pl.DataFrame, columns: List[str] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Per text column, the number of cells each rule applies to. 'plain' cells were numbers
+    already, 'unparsed' cells aren't numbers at all. The plain numbers of every column are
+    counted in a single select; the rules then only look at the other distinct values.
+    """
+    columns = columns if columns is not None else \
+        [c for c, dtype in df.schema.items() if is_string(dtype) and not is_code_column(c)]
+    if not columns:
+        return {}
+    counts = df.select(
+        [_plain(c).is_not_null().sum().alias(f"{c}\x00plain") for c in columns]
+        + [pl.col(c).is_not_null().sum().alias(f"{c}\x00values") for c in columns]
+    ).row(0, named=True)
+    tally = {}
+    for col in columns:
+        tally[col] = {rule: 0 for rule in numeric_rules}
+        tally[col].update(plain=counts[f"{col}\x00plain"], values=counts[f"{col}\x00values"])
+        if tally[col]["plain"] == tally[col]["values"]:
+            continue
+        others = _other_values(df, col)
+        _, flags = _steps(pl.col(col))
+        flags["unparsed"] = pl.col("number").is_null() & ~flags["missing"]
+        tally[col].update(others.select([
+            (flag.cast(pl.UInt32) * pl.col("cells")).sum().alias(rule) for rule, flag in flags.items()
+        ]).row(0, named=True))
+    return tally
+
+
+def numeric_candidates(tally: Dict[str, Dict[str, int]], min_share=min_numeric_share) -> Dict[str, Dict[str, int]]:
+    """The text columns whose values are mostly numbers once the rules are applied."""
+    candidates = {}
+    for col, counts in tally.items():
+        numbers = counts["values"] - counts["missing"] - counts["unparsed"]
+        if counts["values"] and numbers / counts["values"] >= min_share:
+            candidates[col] = counts
+    return candidates
+
+
+def tally_table(tally: Dict[str, Dict[str, int]]) -> pl.DataFrame:
+    return pl.DataFrame(
+        [{"column": col, **{rule: counts[rule] for rule in numeric_rules}} for col, counts in tally.items()],
+        schema={"column": pl.Utf8, **{rule: pl.UInt32 for rule in numeric_rules}},
+    )
+
+
+def tally_summary(counts: Dict[str, int]):
+    return ", ".join(f"{numeric_rules[rule]}: {counts[rule]}" for rule in numeric_rules if counts.get(rule))
+
+
+def convert_numbers(df: pl.DataFrame, col: str):
+    """Converts a text column to numbers: plain numbers are cast, the other values are parsed once each."""
+    others = _other_values(df, col).select(col, "number")
+    return (
+        df.join(others, on=col, how="left")
+        .with_columns(pl.coalesce(_plain(col), pl.col("number")).alias(col))
+        .drop("number")
+    )
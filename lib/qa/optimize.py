@@ -0,0 +1,124 @@
+import polars as pl
+from lib.qa import ingest
+from lib.qa.clean import code_widths
+from lib.qa.profile import is_float, is_string
+
+# Low cardinality string columns (state and district names, units, categories) are
+# stored as categoricals: one dictionary of distinct values plus an integer code per
+# row. Categoricals of different frames can only be compared or joined when they
+# share the global string cache, which the QA pages therefore enable.
+sample_rows = 100_000
+# a string column becomes categorical when its distinct values (in the sample) are
+# at most this fraction of its values
+max_cardinality_ratio = 0.2
+
+
+def enable_string_cache():
+    pl.enable_string_cache(True)
+
+
+def is_code_column(name: str):
+    return name in code_widths or name.endswith("_code")
+
+
+def sample_dtypes(sample: pl.DataFrame, max_cardinality_ratio=max_cardinality_ratio) -> dict:
+    """
+    Dtypes to read a whole csv with, decided from a sample of it: code columns as strings (so
+    leading zeros survive), low cardinality strings as categoricals, everything else as inferred.
+    """
+    dtypes = dict(sample.schema)
+    if sample.is_empty():
+        # nothing to infer from (e.g. a csv with only a header)
+        return dtypes
+    distinct = sample.select(pl.all().n_unique()).row(0, named=True)
+    for col, dtype in sample.schema.items():
+        if is_code_column(col):
+            dtypes[col] = pl.Utf8
+        elif dtype == pl.Utf8 and distinct[col] <= max_cardinality_ratio * sample.height:
+            dtypes[col] = pl.Categorical
+    return dtypes
+
+
+def _lossless_float32(col: str) -> pl.Expr:
+    return (pl.col(col).cast(pl.Float32).cast(pl.Float64) == pl.col(col)).all()
+
+
+def optimize_dtypes(df: pl.DataFrame, max_cardinality_ratio=max_cardinality_ratio) -> pl.DataFrame:
+    """
+    Downcasts integers to the smallest type their values fit in, floats to 32 bits where no
+    value loses precision and low cardinality strings to categoricals. Code columns stay strings.
+    """
+    enable_string_cache()
+    floats = [c for c, dtype in df.schema.items() if dtype == pl.Float64]
+    # an empty frame has no cardinality to go by
+    strings = [c for c, dtype in df.schema.items() if dtype == pl.Utf8 and not is_code_column(c)] if df.height else []
+    checks = df.select(
+        [_lossless_float32(c).alias(f"{c}\x00f32") for c in floats]
+        + [pl.col(c).n_unique().alias(f"{c}\x00distinct") for c in strings]
+    ).row(0, named=True) if floats or strings else {}
+
+    exprs = []
+    for col, dtype in df.schema.items():
+        if dtype in pl.INTEGER_DTYPES:
+            exprs.append(pl.col(col).shrink_dtype())
+        elif is_float(dtype) and checks.get(f"{col}\x00f32"):
+            exprs.append(pl.col(col).cast(pl.Float32))
+        elif col in strings and checks[f"{col}\x00distinct"] <= max_cardinality_ratio * df.height:
+            exprs.append(pl.col(col).cast(pl.Categorical))
+    return df.with_columns(exprs) if exprs else df
+
+
+def column_sizes(df: pl.DataFrame) -> dict:
+    return {col: df.get_column(col).estimated_size() for col in df.columns}
+
+
+def memory_report(before: dict, after: pl.DataFrame, before_dtypes: dict = None) -> pl.DataFrame:
+    """Per column dtypes and sizes before and after optimizing, with a total row."""
+    sizes = column_sizes(after)
+    report = pl.DataFrame({
+        "column": list(sizes),
+        "dtype_before": [str((before_dtypes or {}).get(c, "")) for c in sizes],
+        "dtype_after": [str(after.schema[c]) for c in sizes],
+        "mb_before": [before.get(c, 0) / 2 ** 20 for c in sizes],
+        "mb_after": [sizes[c] / 2 ** 20 for c in sizes],
+    })
+    total = report.select(
+        pl.lit("total").alias("column"), pl.lit("").alias("dtype_before"), pl.lit("").alias("dtype_after"),
+        pl.col("mb_before").sum(), pl.col("mb_after").sum())
+    return pl.concat([report, total], how="vertical")
+
+
+def optimize(df: pl.DataFrame):
+    """The optimized frame and its memory report."""
+    before, dtypes = column_sizes(df), dict(df.schema)
+    optimized = optimize_dtypes(df)
+    return optimized, memory_report(before, optimized, dtypes)
+
+
+def _read_with_sample(sample: pl.DataFrame, read):
+    """
+    Reads a dataset with the dtypes decided from its sample and optimizes it. The sizes before
+    optimizing are extrapolated from the sample, the dataset is never held unoptimized.
+    """
+    enable_string_cache()
+    df = read(sample_dtypes(sample))
+    scale = df.height / sample.height if sample.height else 0
+    before = {col: size * scale for col, size in column_sizes(sample).items()}
+    optimized = optimize_dtypes(df)
+    return optimized, memory_report(before, optimized, dict(sample.schema))
+
+
+def read_optimized(path):
+    """Reads a dataset file with optimized dtypes. Returns the frame and its memory report."""
+    sample = ingest.head(path, sample_rows)
+    if str(path).lower().endswith(tuple(ingest.csv_suffixes)):
+        return _read_with_sample(sample, lambda dtypes: ingest.read(path, dtypes=dtypes))
+    return optimize(ingest.read(path))
+
+
+def read_upload_optimized(uploaded_file):
+    """Reads an uploaded dataset with optimized dtypes. Returns the frame and its memory report."""
+    if uploaded_file.name.endswith(".parquet"):
+        return optimize(ingest.read_upload(uploaded_file))
+    sample = ingest.head_upload(uploaded_file, sample_rows)
+    return _read_with_sample(sample, lambda dtypes: ingest.read_upload(uploaded_file, dtypes=dtypes))
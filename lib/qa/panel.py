@@ -0,0 +1,166 @@
+from collections import namedtuple
+from typing import List
+import polars as pl
+from lib.qa.dates import parse_dates
+from lib.qa.partition import date_columns, year_columns
+from lib.qa.profile import is_numeric, is_string
+
+# Region columns from the finest level to the coarsest: the first one in a dataset is its
+# region key.
+region_columns = [
+    "village_code", "gp_code", "block_code", "sub_district_code", "district_code", "state_code",
+    "village_name", "gp_name", "block_name", "sub_district_name", "district_name", "state_name",
+]
+
+# Periods are numbered so the expected periods are a range: months since year 0 for yearly,
+# quarterly and monthly data (mostly dates on the first of a month), days since 1970 otherwise.
+# In monthly units, dates on other days are off the expected periods ('extra periods').
+PanelKeys = namedtuple("PanelKeys", ["region", "period"])
+Periods = namedtuple("Periods", ["unit", "step", "first", "last"])
+Completeness = namedtuple("Completeness", [
+    "keys", "periods", "regions", "expected", "observed", "unparsed_rows",
+    "region_coverage", "period_coverage", "gaps", "extra_periods", "indicator_coverage"])
+
+
+def detect_panel_keys(schema: dict):
+    """The region and period columns of a panel, None if it doesn't have both."""
+    region = next((c for c in region_columns if c in schema), None)
+    period = next((c for c in date_columns if c in schema and is_string(schema[c])), None)
+    period = period or next((c for c in year_columns if c in schema), None)
+    if region is None or period is None:
+        return None
+    return PanelKeys(region, period)
+
+
+def period_index(df: pl.DataFrame, period: str) -> pl.DataFrame:
+    """
+    The distinct values of the period column with their period number ('index'), whether they
+    fall on a period ('aligned') and the unit periods are counted in ('month' or 'day'). Only
+    the distinct values are parsed.
+    """
+    values = df.select(pl.col(period).unique())
+    dtype = df.schema[period]
+    if is_numeric(dtype):
+        return values.with_columns(
+            (pl.col(period).cast(pl.Int64) * 12).alias("index"), pl.lit(True).alias("aligned")), "month"
+    dates = values.with_columns(parse_dates(pl.col(period)).alias("parsed"))
+    parsed = dates.get_column("parsed").drop_nulls()
+    if parsed.is_empty() or (parsed.dt.day() == 1).mean() >= 0.5:
+        index, unit = pl.col("parsed").dt.year().cast(pl.Int64) * 12 + pl.col("parsed").dt.month() - 1, "month"
+        aligned = pl.col("parsed").dt.day() == 1
+    else:
+        index, unit = pl.col("parsed").cast(pl.Int64), "day"
+        aligned = pl.lit(True)
+    return dates.select(period, index.alias("index"), aligned.alias("aligned")), unit
+
+
+def period_step(indices: pl.Series) -> int:
+    """The most common difference between consecutive distinct periods."""
+    steps = indices.unique().sort().diff().drop_nulls()
+    if steps.is_empty():
+        return 1
+    return int(steps.mode().min())
+
+
+def period_label(index: pl.Expr, periods: Periods) -> pl.Expr:
+    if periods.unit == "day":
+        return index.cast(pl.Date).dt.strftime("%Y-%m-%d")
+    year = (index // 12).cast(pl.Utf8)
+    if periods.step % 12 == 0:
+        return year
+    return year + "-" + (index % 12 + 1).cast(pl.Utf8).str.zfill(2)
+
+
+def completeness(df: pl.DataFrame, keys: PanelKeys = None) -> Completeness:
+    """
+    Compares the observed (region, period) cells of a panel with the expected ones: every
+    region in every period from the first to the last at the panel's step. The missing cells
+    are an anti join of the expected cross product with the observed cells. Reports the
+    coverage per region, per period and per indicator column, the runs of consecutive missing
+    periods per region and the periods that are off the expected steps.
+    """
+    keys = keys or detect_panel_keys(df.schema)
+    if keys is None:
+        raise ValueError("No region and period columns to check the panel's completeness on")
+    region, period = keys
+    index, unit = period_index(df, period)
+    cells = df.select(region, period).join(index, on=period, how="left")
+    unparsed = cells.get_column("index").null_count()
+    cells = cells.drop_nulls()
+    observed = cells.filter(pl.col("aligned")).select(region, "index").unique()
+    indices = observed.get_column("index")
+    step = period_step(indices)
+    periods = Periods(unit, step, indices.min(), indices.max())
+
+    grid = pl.DataFrame({"index": pl.arange(periods.first, periods.last + 1, step, eager=True)}) \
+        if observed.height else pl.DataFrame({"index": []}, schema={"index": pl.Int64})
+    grid = grid.with_columns(pl.col("index").cast(pl.Int64))
+    regions = observed.select(region).unique()
+    expected = regions.join(grid, how="cross")
+    missing = expected.join(observed, on=[region, "index"], how="anti")
+    on_grid = observed.join(grid, on="index", how="semi")
+    # cells off the expected periods: dates within a period or periods between the steps
+    extra = pl.concat([
+        cells.filter(~pl.col("aligned")),
+        cells.filter(pl.col("aligned")).join(grid, on="index", how="anti"),
+    ], how="vertical")
+
+    region_coverage = (
+        on_grid.groupby(region).agg(pl.count().alias("observed"))
+        .join(regions, on=region, how="outer")
+        .with_columns(pl.col("observed").fill_null(0))
+        .with_columns((pl.col("observed") / max(grid.height, 1)).alias("coverage"))
+        .sort(["coverage", region])
+    )
+    period_coverage = (
+        grid.join(on_grid.groupby("index").agg(pl.count().alias("regions")), on="index", how="left")
+        .with_columns(pl.col("regions").fill_null(0))
+        .with_columns((pl.col("regions") / max(regions.height, 1)).alias("coverage"),
+                      period_label(pl.col("index"), periods).alias("period"))
+        .select("period", "regions", "coverage", "index")
+        .sort("index")
+    )
+    gaps = (
+        missing.sort([region, "index"])
+        .with_columns(
+            ((pl.col("index").diff() != step) | (pl.col(region) != pl.col(region).shift())).fill_null(True)
+            .cumsum().alias("run"))
+        .groupby([region, "run"], maintain_order=True)
+        .agg(pl.col("index").min().alias("start"), pl.col("index").max().alias("end"), pl.count().alias("periods"))
+        .with_columns(period_label(pl.col("start"), periods).alias("from"),
+                      period_label(pl.col("end"), periods).alias("to"))
+        .select(region, "from", "to", "periods")
+        .sort(["periods", region], descending=[True, False])
+    )
+    extra_periods = (
+        extra.groupby(period).agg(pl.count().alias("rows"), pl.col(region).n_unique().alias("regions"))
+        .with_columns(pl.col(period).cast(pl.Utf8))
+        .sort(period)
+    )
+    return Completeness(
+        keys=keys,
+        periods=periods,
+        regions=regions.height,
+        expected=expected.height,
+        observed=on_grid.height,
+        unparsed_rows=unparsed,
+        region_coverage=region_coverage,
+        period_coverage=period_coverage,
+        gaps=gaps,
+        extra_periods=extra_periods,
+        indicator_coverage=indicator_coverage(df, keys, expected.height),
+    )
+
+
+def indicator_columns(df: pl.DataFrame, keys: PanelKeys) -> List[str]:
+    return [c for c, dtype in df.schema.items() if is_numeric(dtype) and c not in keys and c not in year_columns]
+
+
+def indicator_coverage(df: pl.DataFrame, keys: PanelKeys, expected: int) -> pl.DataFrame:
+    """The share of the expected cells with a value, per numeric indicator column, in one select."""
+    columns = indicator_columns(df, keys)
+    if not columns:
+        return pl.DataFrame(schema={"indicator": pl.Utf8, "values": pl.Int64, "coverage": pl.Float64})
+    counts = df.select([pl.col(c).is_not_null().sum() for c in columns]).row(0)
+    return pl.DataFrame({"indicator": columns, "values": list(counts)}).with_columns(
+        (pl.col("values") / max(expected, 1)).alias("coverage")).sort("coverage")
@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import tempfile
+import urllib.parse
+from pathlib import Path
+from typing import Iterator, List
+import polars as pl
+from lib.qa.dates import parse_dates
+from lib.qa.profile import is_numeric, is_string
+
+# Candidate partition columns, in order of preference. States and years give a few
+# hundred to a few thousand partitions; districts or dates would give far too many.
+region_columns = ["state_code", "state_name"]
+year_columns = ["year", "financial_year", "fy"]
+date_columns = ["date", "month", "period"]
+row_group_size = 100_000
+# rows buffered before they are split into partitions and written
+buffer_rows = 2_000_000
+null_partition = "__HIVE_DEFAULT_PARTITION__"
+manifest_name = "_manifest.json"
+
+
+def output_dir() -> Path:
+    """The directory partitioned datasets are written into from the pages."""
+    return Path(os.environ.get("IDP_OUTPUT_DIR", "output"))
+
+
+def resolve_output_path(path) -> Path:
+    """
+    The absolute path of a partitioned dataset, which must be a directory inside the output
+    directory. Relative paths are relative to the output directory.
+    """
+    root = output_dir().resolve()
+    path = Path(path)
+    if not path.is_absolute():
+        path = root / path
+    path = path.resolve()
+    if path == root or not path.is_relative_to(root):
+        raise ValueError(f"'{path}' isn't a directory inside the directory datasets are written to ({root})")
+    return path
+
+
+def detect_partition_columns(schema: dict) -> List[str]:
+    """The region and time columns to partition a dataset with the given schema on."""
+    columns = [next((c for c in region_columns if c in schema), None)]
+    year = next((c for c in year_columns if c in schema), None)
+    if year is None and any(c in schema and is_string(schema[c]) for c in date_columns):
+        year = "year"
+    columns.append(year)
+    return [c for c in columns if c]
+
+
+def with_partition_columns(df: pl.DataFrame, columns: List[str]) -> pl.DataFrame:
+    """
+    Adds a 'year' column parsed from the date column when it's a partition column but not in
+    the data. Only the distinct dates are parsed.
+    """
+    if "year" in columns and "year" not in df.columns:
+        date = next(c for c in date_columns if c in df.columns and is_string(df.schema[c]))
+        years = df.select(pl.col(date).unique()).with_columns(parse_dates(pl.col(date)).dt.year().alias("year"))
+        df = df.join(years, on=date, how="left")
+    return df
+
+
+def _partition_value(value):
+    return null_partition if value is None else urllib.parse.quote(str(value), safe="")
+
+
+def batches(data, batch_rows: int) -> Iterator[pl.DataFrame]:
+    """
+    Frames of about `batch_rows` rows from a frame, a lazy frame or any iterable of frames such
+    as a batched csv reader. A lazy frame is sunk by the streaming engine into a temporary
+    parquet file in one pass, then read back a row group at a time (collecting slices of the
+    plan would read a scanned csv again from its start for every batch).
+    """
+    if isinstance(data, pl.DataFrame):
+        for offset in range(0, data.height, batch_rows):
+            yield data.slice(offset, batch_rows)
+    elif isinstance(data, pl.LazyFrame):
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as tmp:
+            file = Path(tmp) / "data.parquet"
+            data.sink_parquet(file, row_group_size=batch_rows)
+            for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_rows):
+                yield pl.from_arrow(batch)
+    else:
+        yield from data
+
+
+def _statistics(df: pl.DataFrame, columns: List[str]) -> pl.DataFrame:
+    """Rows and min/max of every numeric column per partition, in a single aggregation."""
+    stats = [c for c, dtype in df.schema.items() if c not in columns and is_numeric(dtype)]
+    return df.groupby(columns).agg(
+        [pl.count().alias("rows")]
+        + [pl.col(c).min().alias(f"{c}\x00min") for c in stats]
+        + [pl.col(c).max().alias(f"{c}\x00max") for c in stats])
+
+
+def _merge_statistics(partition: dict, row: dict):
+    partition["rows"] += row["rows"]
+    for key, value in row.items():
+        if "\x00" not in key or value is None:
+            continue
+        col, stat = key.split("\x00")
+        current = partition["statistics"].setdefault(col, {}).get(stat)
+        if current is not None:
+            value = min(current, value) if stat == "min" else max(current, value)
+        partition["statistics"][col][stat] = value
+
+
+def _check_replaceable(path: Path):
+    if path.exists() and (not path.is_dir() or (any(path.iterdir()) and not (path / manifest_name).is_file())):
+        raise ValueError(f"'{path}' exists and isn't a partitioned dataset, it won't be replaced")
+
+
+def _replace(staged: Path, path: Path):
+    """Moves a staged dataset to `path`, then removes the dataset it replaces."""
+    if not path.exists():
+        staged.rename(path)
+        return
+    old = Path(tempfile.mkdtemp(prefix=f".{path.name}.old-", dir=path.parent))
+    path.rename(old / path.name)
+    staged.rename(path)
+    shutil.rmtree(old)
+
+
+def write_partitioned(data, path, columns: List[str] = None, row_group_size=row_group_size,
+                      buffer_rows=buffer_rows):
+    """
+    Writes a dataset as hive partitioned parquet (`path/state_code=01/year=2001/part-0.parquet`)
+    plus a manifest listing every partition with its files, row count and the min/max of its
+    numeric columns, so readers can prune partitions without opening them. `data` is a frame,
+    a lazy frame or an iterable of frames; it's written `buffer_rows` rows at a time, each
+    buffer adding one file to every partition it has rows of. Returns the manifest.
+
+    The dataset is written into a staging directory next to `path` that then replaces it, so
+    a dataset written before leaves no partitions or files behind. An existing `path` that
+    isn't a partitioned dataset (or empty) is never replaced.
+    """
+    target = Path(path)
+    _check_replaceable(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    path = Path(tempfile.mkdtemp(prefix=f".{target.name}.", dir=target.parent))
+    try:
+        manifest = _write_partitioned(data, path, columns, row_group_size, buffer_rows)
+        _replace(path, target)
+    except BaseException:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    return manifest
+
+
+def _write_partitioned(data, path: Path, columns, row_group_size, buffer_rows):
+    # pyarrow is only needed (and imported) when a dataset is written
+    import pyarrow.parquet as pq
+    partitions = {}
+    schema = {}
+
+    def flush(df: pl.DataFrame, part: int):
+        for row in _statistics(df, columns).iter_rows(named=True):
+            key = tuple(row[c] for c in columns)
+            partitions.setdefault(key, {
+                "path": Path(*[f"{c}={_partition_value(v)}" for c, v in zip(columns, key)]).as_posix(),
+                "values": dict(zip(columns, key)),
+                "files": [],
+                "rows": 0,
+                "statistics": {},
+            })
+            _merge_statistics(partitions[key], row)
+        for key, frame in df.partition_by(columns, as_dict=True).items():
+            partition = partitions[key if isinstance(key, tuple) else (key,)]
+            file = f"{partition['path']}/part-{part}.parquet"
+            (path / partition["path"]).mkdir(parents=True, exist_ok=True)
+            pq.write_table(frame.drop(columns).to_arrow(), path / file, row_group_size=row_group_size,
+                           compression="zstd", write_statistics=True)
+            partition["files"].append(file)
+
+    buffer, buffered, part = [], 0, 0
+    for batch in batches(data, buffer_rows):
+        if columns is None:
+            columns = detect_partition_columns(batch.schema)
+            if not columns:
+                raise ValueError("No region or time column to partition the dataset on")
+        batch = with_partition_columns(batch, columns)
+        schema = schema or {c: str(dtype) for c, dtype in batch.schema.items() if c not in columns}
+        buffer.append(batch)
+        buffered += batch.height
+        if buffered >= buffer_rows:
+            flush(pl.concat(buffer, how="vertical"), part)
+            buffer, buffered, part = [], 0, part + 1
+    if buffer:
+        flush(pl.concat(buffer, how="vertical"), part)
+
+    manifest = {
+        "format": "parquet",
+        "partitioning": "hive",
+        "partition_columns": columns,
+        "schema": schema,
+        "row_group_size": row_group_size,
+        "rows": sum(p["rows"] for p in partitions.values()),
+        "partitions": sorted(partitions.values(), key=lambda p: p["path"]),
+    }
+    (path / manifest_name).write_text(json.dumps(manifest, indent=2, default=str))
+    return manifest
+
+
+def read_manifest(path):
+    return json.loads((Path(path) / manifest_name).read_text())
@@ -0,0 +1,105 @@
+from collections import namedtuple
+from typing import Dict
+import polars as pl
+from lib.qa.optimize import is_code_column
+from lib.qa.profile import is_float, is_string
+
+# Decimal places are counted up to `max_decimals`. A float that still isn't equal to itself
+# rounded to that many places is a float artifact (0.1 + 0.2 = 0.30000000000000004) or an
+# unrounded result of a division.
+max_decimals = 10
+scientific_pattern = r"^\s*[+-]?(\d+\.?\d*|\.\d+)[eE][+-]?\d+\s*$"
+number_pattern = r"^\s*[+-]?(\d+\.?\d*|\.\d+)\s*$"
+
+PrecisionProfile = namedtuple("PrecisionProfile", [
+    "name", "decimal_places", "max_places", "artifacts", "scientific"])
+
+
+def text_decimal_places(col: pl.Expr) -> pl.Expr:
+    """The number of digits after the decimal point of numbers written as text, null for other values."""
+    number = col.str.strip()
+    return pl.when(number.str.contains(number_pattern)).then(
+        number.str.extract(r"\.(\d*)$").str.lengths().fill_null(0))
+
+
+def _float_exprs(name: str, max_decimals=max_decimals):
+    """
+    The number of values of a float column with at most d decimal places, for every d: a value has
+    at most d places if rounding it to d places doesn't change it. The rest are artifacts.
+    """
+    col = pl.col(name)
+    # NaN isn't equal to itself rounded, so NaNs are neither counted here nor as values
+    exprs = {f"le{d}": (col.round(d) == col).sum() for d in range(max_decimals + 1)}
+    exprs["values"] = col.is_not_null().sum() - col.is_nan().sum()
+    exprs["scientific"] = pl.lit(0)
+    return [e.alias(f"{name}\x00{key}") for key, e in exprs.items()]
+
+
+def _text_exprs(name: str, max_decimals=max_decimals):
+    """Same as `_float_exprs` for a frame of decimal places of text columns (see `profile_precision`)."""
+    places = pl.col(name)
+    exprs = {f"le{d}": (places <= d).sum() for d in range(max_decimals + 1)}
+    exprs["values"] = places.is_not_null().sum()
+    exprs["scientific"] = pl.col(f"{name}\x00scientific").sum()
+    return [e.alias(f"{name}\x00{key}") for key, e in exprs.items()]
+
+
+def precision_columns(df: pl.DataFrame):
+    """Float columns and text columns that may hold numbers (integer columns have no decimals)."""
+    return [name for name, dtype in df.schema.items()
+            if is_float(dtype) or (is_string(dtype) and not is_code_column(name))]
+
+
+def profile_precision(df: pl.DataFrame, max_decimals=max_decimals) -> Dict[str, PrecisionProfile]:
+    """
+    The distribution of decimal places of every float (and numeric text) column and the number of
+    float artifacts and numbers in scientific notation, in a single pass over the data.
+    """
+    columns = precision_columns(df)
+    floats = [c for c in columns if is_float(df.schema[c])]
+    texts = [c for c in columns if c not in floats]
+    row = df.select([e for name in floats for e in _float_exprs(name, max_decimals)]).row(0, named=True) \
+        if floats else {}
+    if texts:
+        # the decimal places of text are extracted once and then counted
+        places = df.select(
+            [text_decimal_places(pl.col(c).cast(pl.Utf8)).alias(c) for c in texts]
+            + [pl.col(c).cast(pl.Utf8).str.contains(scientific_pattern).alias(f"{c}\x00scientific") for c in texts])
+        row.update(places.select([e for name in texts for e in _text_exprs(name, max_decimals)]).row(0, named=True))
+    stats = {name: {} for name in columns}
+    for key, value in row.items():
+        name, stat = key.split("\x00")
+        stats[name][stat] = value
+    profiles = {}
+    for name in columns:
+        s = stats[name]
+        at_most = [s[f"le{d}"] for d in range(max_decimals + 1)]
+        places = {d: n - (at_most[d - 1] if d else 0) for d, n in enumerate(at_most)}
+        places = {d: n for d, n in places.items() if n}
+        artifacts = s["values"] - at_most[-1]
+        if not s["values"] and not s["scientific"]:
+            # text column without numbers
+            continue
+        profiles[name] = PrecisionProfile(
+            name=name,
+            decimal_places=places,
+            max_places=max(places) if places else None,
+            artifacts=artifacts,
+            scientific=s["scientific"],
+        )
+    return profiles
+
+
+def precision_table(profiles: Dict[str, PrecisionProfile], max_decimals=max_decimals) -> pl.DataFrame:
+    """One row per column with its count of values per number of decimal places."""
+    return pl.DataFrame(
+        [{
+            "column": p.name,
+            **{f"{d} dp": p.decimal_places.get(d, 0) for d in range(max_decimals + 1)},
+            "artifacts": p.artifacts,
+            "scientific": p.scientific,
+        } for p in profiles.values()],
+        schema={"column": pl.Utf8, **{f"{d} dp": pl.UInt32 for d in range(max_decimals + 1)},
+                "artifacts": pl.UInt32, "scientific": pl.UInt32},
+    )
+
@@ -0,0 +1,88 @@
+from collections import namedtuple
+from typing import Dict
+import polars as pl
+
+special_char_pattern = r"[^a-zA-Z0-9\s]"
+# number of distinct (and distinct special character) values kept per column
+sample_size = 100
+
+ColumnProfile = namedtuple("ColumnProfile", [
+    "name", "dtype", "numeric_count", "null_count", "unique_count", "unique_values",
+    "special_chars", "special_count", "title_case", "extra_decimals", "has_negatives"])
+
+
+def is_string(dtype):
+    return dtype == pl.Utf8 or dtype == pl.Categorical
+
+
+def is_float(dtype):
+    return dtype in pl.FLOAT_DTYPES
+
+
+def is_numeric(dtype):
+    return dtype in pl.NUMERIC_DTYPES
+
+
+def _column_exprs(name: str, dtype, sample=sample_size):
+    col = pl.col(name)
+    text = col.cast(pl.Utf8) if dtype == pl.Categorical else col
+    exprs = {
+        "null_count": col.null_count(),
+        "unique_count": col.drop_nulls().n_unique(),
+        "unique_values": col.drop_nulls().unique(maintain_order=True).head(sample).cast(pl.Utf8).implode(),
+    }
+    if is_string(dtype):
+        exprs["numeric_count"] = text.str.strip().cast(pl.Float64, strict=False).is_not_null().sum()
+        special = text.str.contains(special_char_pattern)
+        exprs["special_chars"] = text.filter(special).unique(maintain_order=True).head(sample).implode()
+        exprs["special_count"] = text.filter(special).n_unique()
+        exprs["title_case"] = (text == text.str.to_titlecase()).all()
+    elif is_numeric(dtype):
+        exprs["numeric_count"] = col.is_not_null().sum()
+        exprs["has_negatives"] = (col < 0).any()
+        if is_float(dtype):
+            exprs["extra_decimals"] = (col.round(2) != col).any()
+    else:
+        exprs["numeric_count"] = pl.lit(0)
+    return [e.alias(f"{name}\x00{key}") for key, e in exprs.items()]
+
+
+def profile_columns(df: pl.DataFrame, sample=sample_size) -> Dict[str, ColumnProfile]:
+    """Profiles every column of `df` in a single pass over the data."""
+    exprs = [e for name, dtype in df.schema.items() for e in _column_exprs(name, dtype, sample)]
+    row = df.select(exprs).row(0, named=True) if exprs else {}
+    stats = {name: {} for name in df.columns}
+    for key, value in row.items():
+        name, stat = key.split("\x00")
+        stats[name][stat] = value
+    profiles = {}
+    for name, dtype in df.schema.items():
+        s = stats[name]
+        profiles[name] = ColumnProfile(
+            name=name,
+            dtype=dtype,
+            numeric_count=s["numeric_count"],
+            null_count=s["null_count"],
+            unique_count=s["unique_count"],
+            unique_values=s["unique_values"],
+            special_chars=s.get("special_chars") or [],
+            special_count=s.get("special_count", 0),
+            title_case=s.get("title_case", True) is not False,
+            extra_decimals=bool(s.get("extra_decimals")),
+            has_negatives=bool(s.get("has_negatives")),
+        )
+    return profiles
+
+
+def duplicate_count(df: pl.DataFrame):
+    return df.height - df.n_unique() if df.height else 0
+
+
+def numeric_columns(df: pl.DataFrame):
+    return [name for name, dtype in df.schema.items() if is_numeric(dtype)]
+
+
+def summary_statistics(df: pl.DataFrame):
+    """describe() of the numeric columns, None if there are none."""
+    columns = numeric_columns(df)
+    return df.select(columns).describe() if columns else None
@@ -0,0 +1,193 @@
+from collections import namedtuple
+from typing import Dict, List
+import numpy as np
+import polars as pl
+from lib.qa.formulas import parse_formula, to_expr, variable_columns
+from lib.qa.optimize import is_code_column
+from lib.qa.partition import year_columns
+from lib.qa.profile import is_numeric
+from lib.types import alphanumeric_name
+
+# Redundant columns of wide indicator tables:
+#   duplicate - the same values as an earlier column (found by hashing every column once)
+#   linear    - a rescaling of an earlier column, e.g. a value in lakh next to it in crore
+#   sum       - the sum of a run of adjacent columns right before or after it (parts, total)
+# Linear relationships are found with a correlation matrix of a sample of rows, computed in
+# blocks of columns with numpy; sums with cumulative sums over the columns of the sample. Every
+# candidate is then verified on all rows in a single select. Formulas use variable names (the
+# alphanumeric names of the columns), as in codebooks.
+
+sample_size = 20_000
+block_columns = 256
+# the correlation of two columns that are rescalings of each other (before the exact check)
+min_correlation = 0.9999
+# the longest run of adjacent columns tested as parts of a total, on the first rows of the sample
+max_parts = 20
+sum_sample_size = 1000
+# relationships must hold (within the tolerances) on this share of the rows compared
+min_match = 0.99
+tolerance = 0.01
+relative_tolerance = 1e-6
+
+Relationship = namedtuple("Relationship", ["column", "kind", "of", "formula"])
+
+
+def numeric_columns(df: pl.DataFrame) -> List[str]:
+    return [c for c, dtype in df.schema.items()
+            if is_numeric(dtype) and not is_code_column(c) and c not in year_columns]
+
+
+def duplicate_columns(df: pl.DataFrame) -> List[Relationship]:
+    """
+    Columns equal to an earlier column. Every column is hashed in one select; only the columns
+    with the same hash are compared, by the hashes of their values (so NaNs and nulls match).
+    """
+    hashes = df.select(pl.all().hash(seed=0).sum()).row(0)
+    first = {}
+    duplicates = []
+
+    def equal(a, b):
+        return df.select((pl.col(a).hash(seed=0) == pl.col(b).hash(seed=0)).all()).item()
+
+    for col, h in zip(df.columns, hashes):
+        original = next((c for c in first.get(h, []) if equal(c, col)), None)
+        if original is None:
+            first.setdefault(h, []).append(col)
+        else:
+            duplicates.append(Relationship(col, "duplicate", [original], alphanumeric_name(original)))
+    return duplicates
+
+
+def _sample_matrix(df: pl.DataFrame, columns: List[str], size: int, seed: int) -> np.ndarray:
+    sample = df.select(columns)
+    if sample.height > size:
+        sample = sample.sample(size, seed=seed)
+    return sample.select(pl.all().cast(pl.Float64)).to_numpy()
+
+
+def _scale(factor: float) -> str:
+    if round(factor, 6) == 1:
+        return ""
+    return f" * {factor:.6g}" if abs(factor) >= 1 else f" / {1 / factor:.6g}"
+
+
+def linear_candidates(x: np.ndarray, columns: List[str], block=block_columns, threshold=min_correlation) -> List[Relationship]:
+    """
+    Columns that are (almost) perfectly correlated with an earlier column, as y = a * x + b fitted
+    on the sample. The correlation matrix is computed block by block of columns, so its memory
+    stays at block x columns; missing values are filled with the column means.
+    """
+    means = np.nanmean(x, axis=0)
+    x = np.where(np.isnan(x), means, x)
+    stds = x.std(axis=0)
+    usable = np.flatnonzero(stds > 0)
+    z = (x[:, usable] - means[usable]) / stds[usable]
+    pairs = []
+    for start in range(0, len(usable), block):
+        corr = z[:, start:start + block].T @ z[:, start:] / len(z)
+        i, j = np.nonzero(np.triu(np.abs(corr) >= threshold, k=1))
+        pairs.append(np.column_stack([usable[i + start], usable[j + start]]))
+    pairs = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=int)
+    # every column is related to the first column it's correlated with
+    pairs = pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]
+    pairs = pairs[np.unique(pairs[:, 1], return_index=True)[1]] if len(pairs) else pairs
+    candidates = []
+    for i, j in pairs:
+        slope = np.cov(x[:, i], x[:, j])[0, 1] / x[:, i].var(ddof=1)
+        intercept = means[j] - slope * means[i]
+        formula = f"{alphanumeric_name(columns[i])}{_scale(slope)}"
+        if abs(intercept) > tolerance:
+            formula += f" {'+' if intercept > 0 else '-'} {abs(intercept):.6g}"
+        candidates.append(Relationship(columns[j], "linear", [columns[i]], formula))
+    return candidates
+
+
+def sum_candidates(x: np.ndarray, columns: List[str], max_parts=max_parts) -> List[Relationship]:
+    """
+    Columns equal to the sum of the run of 2 to `max_parts` columns right before or right after
+    them, tested for every column and run length at once with cumulative sums over the columns
+    of the sample. Rows where a part or the total is missing aren't compared.
+    """
+    n, k = x.shape
+    filled = np.nan_to_num(x)
+    missing = np.isnan(x)
+    sums = np.concatenate([np.zeros((n, 1)), np.cumsum(filled, axis=1)], axis=1)
+    gaps = np.concatenate([np.zeros((n, 1)), np.cumsum(missing, axis=1)], axis=1)
+    found = {}
+    for length in range(2, min(max_parts, k - 1) + 1):
+        # runs[:, s] is the sum of the columns s .. s + length - 1
+        runs = sums[:, length:] - sums[:, :-length]
+        complete = (gaps[:, length:] - gaps[:, :-length]) == 0
+        for total, run in [(slice(length, k), slice(0, k - length)), (slice(0, k - length), slice(1, k - length + 1))]:
+            compared = complete[:, run] & ~missing[:, total]
+            close = np.abs(runs[:, run] - x[:, total]) <= tolerance + relative_tolerance * np.abs(x[:, total])
+            matches = (close & compared).sum(axis=0)
+            counts = compared.sum(axis=0)
+            for t in np.flatnonzero((counts > 0) & (matches >= min_match * np.maximum(counts, 1))):
+                col = t + total.start
+                start = t + run.start
+                if col not in found:
+                    parts = columns[start:start + length]
+                    found[col] = Relationship(columns[col], "sum", parts, " + ".join(map(alphanumeric_name, parts)))
+    return [found[col] for col in sorted(found)]
+
+
+def verify(df: pl.DataFrame, candidates: List[Relationship]) -> pl.DataFrame:
+    """The rows compared and the share of them where each candidate holds, over all the rows, in one select."""
+    column_of = variable_columns(df.columns)
+    aggregations = []
+    for i, r in enumerate(candidates):
+        # formulas can't refer to columns whose names aren't identifiers (e.g. '2011 population')
+        try:
+            tree = parse_formula(r.formula).tree
+        except ValueError:
+            continue
+        expected = to_expr(tree, lambda name: pl.col(column_of[name]).cast(pl.Float64))
+        difference = (pl.col(r.column).cast(pl.Float64) - expected).abs()
+        allowed = tolerance + relative_tolerance * expected.abs()
+        aggregations += [difference.is_not_null().sum().alias(f"{i}\x00compared"),
+                         (difference <= allowed).sum().alias(f"{i}\x00matches")]
+    stats = df.select(aggregations).row(0, named=True) if aggregations else {}
+    return pl.DataFrame([{
+        "column": r.column,
+        "kind": r.kind,
+        "formula": r.formula,
+        "compared": stats[f"{i}\x00compared"],
+        "match": stats[f"{i}\x00matches"] / stats[f"{i}\x00compared"] if stats[f"{i}\x00compared"] else None,
+    } for i, r in enumerate(candidates) if f"{i}\x00compared" in stats],
+        schema={"column": pl.Utf8, "kind": pl.Utf8, "formula": pl.Utf8, "compared": pl.UInt32, "match": pl.Float64})
+
+
+def redundant_columns(df: pl.DataFrame, sample_size=sample_size, seed=0) -> pl.DataFrame:
+    """
+    The columns that duplicate, rescale or add up other columns, with the formula deriving them
+    and the share of the rows it holds on (at least `min_match`).
+    """
+    duplicates = duplicate_columns(df)
+    duplicated = {r.column for r in duplicates}
+    columns = [c for c in numeric_columns(df) if c not in duplicated]
+    candidates = []
+    if len(columns) > 1:
+        x = _sample_matrix(df, columns, sample_size, seed)
+        candidates = linear_candidates(x, columns) + sum_candidates(x[:sum_sample_size], columns)
+        # a column that adds up others isn't reported as a rescaling of one of them
+        sums = {r.column for r in candidates if r.kind == "sum"}
+        candidates = [r for r in candidates if r.kind == "sum" or r.column not in sums]
+    results = verify(df, candidates).filter(pl.col("match") >= min_match)
+    exact = pl.DataFrame([{"column": r.column, "kind": r.kind, "formula": r.formula,
+                           "compared": df.height, "match": 1.0} for r in duplicates], schema=results.schema)
+    return pl.concat([exact, results], how="vertical")
+
+
+def derived_proposals(variables: List[dict], redundant: pl.DataFrame) -> Dict[str, str]:
+    """
+    The formulas the redundant columns suggest for codebook variables that aren't marked as
+    derived and have no formula yet, by variable.
+    """
+    names = {v["name"] for v in variables if not v.get("is_derived") and not (v.get("formula") or "").strip()}
+    proposals = {}
+    for column, formula in redundant.select("column", "formula").iter_rows():
+        name = column if column in names else alphanumeric_name(column)
+        if name in names and name not in proposals:
+            proposals[name] = formula
+    return proposals
@@ -0,0 +1,171 @@
+import polars as pl
+from lib.qa.clean import code_widths
+from lib.qa.dependencies import key_columns
+from lib.qa.numeric import tally_summary
+from lib.qa.precision import PrecisionProfile
+from lib.qa.profile import ColumnProfile
+
+
+def _values(values: list, total: int):
+    text = ", ".join(map(str, values))
+    return text + ", ..." if total > len(values) else text
+
+
+def column_info(profile: ColumnProfile):
+    """The DQA information of a column."""
+    dqa_info = f"### Column: {profile.name}\n"
+    dqa_info += f"Data Type: {profile.dtype}\n"
+    dqa_info += f"Number of Numerical Values: {profile.numeric_count}\n"
+    dqa_info += f"Number of NaN Values: {profile.null_count}\n"
+    dqa_info += f"Count of Unique Values: {profile.unique_count}\n"
+    dqa_info += f"Count of Special Characters: {profile.special_count}\n"
+    dqa_info += f"Unique Values: {_values(profile.unique_values, profile.unique_count)}\n\n"
+    if profile.name in code_widths:
+        dqa_info += f"Formatting: {profile.name} values were formatted to have leading zeros.\n"
+    dqa_info += "\n"
+    return dqa_info
+
+
+def special_chars_info(profile: ColumnProfile):
+    if not profile.special_count:
+        return ""
+    dqa_info = f"### Column: {profile.name}\n"
+    dqa_info += f"Special Character Values: {_values(profile.special_chars, profile.special_count)}\n\n"
+    return dqa_info
+
+
+def duplicate_info(duplicate_count: int):
+    return f"## Number of Duplicate Rows\nNumber of Duplicate Rows: {duplicate_count}\n\n"
+
+
+def changes_summary(changes: dict):
+    dqa_info = "## Data Type Changes and Other Changes Summary\n"
+    for col, change in changes.items():
+        dqa_info += f"Column/Change: {col}\nChange: {change}\n\n"
+    return dqa_info
+
+
+def summary_statistics_info(summary_statistics: pl.DataFrame):
+    dqa_info = "## Summary Statistics for Numerical Columns\n"
+    if summary_statistics is None:
+        return dqa_info + "No numeric columns found in the dataset.\n\n"
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=10_000, tbl_hide_dataframe_shape=True):
+        dqa_info += str(summary_statistics)
+    dqa_info += "\n\n"
+    return dqa_info
+
+
+def precision_info(profile: PrecisionProfile):
+    places = ", ".join(f"{d}: {n}" for d, n in profile.decimal_places.items())
+    dqa_info = f"### Column: {profile.name}\n"
+    dqa_info += f"Values per Decimal Places: {places}\n"
+    dqa_info += f"Float Artifacts: {profile.artifacts}\n"
+    dqa_info += f"Scientific Notation Values: {profile.scientific}\n\n"
+    return dqa_info
+
+
+def code_issues_info(col: str, issues: pl.DataFrame):
+    dqa_info = f"### Column: {col}\n"
+    for code, padded, issue, rows in issues.iter_rows():
+        dqa_info += f"{padded}: {issue} ({rows} rows)\n"
+    return dqa_info + "\n"
+
+
+def dependency_info(dependency, found: pl.DataFrame):
+    x, y = key_columns(dependency), dependency.dependent
+    within = f" within {', '.join(dependency.within)}" if dependency.within else ""
+    dqa_info = f"### {dependency.determinant} -> {y}{within} ({dependency.kind})\n"
+    for value, group in found.groupby(x, maintain_order=True):
+        others = ", ".join(f"{v} ({rows} rows)" for v, rows in group.select(y, "rows").iter_rows())
+        dqa_info += f"{' / '.join(map(str, value)) if isinstance(value, tuple) else value}: {others}\n"
+    return dqa_info + "\n"
+
+
+def completeness_info(panel):
+    region, period = panel.keys
+    dqa_info = "## Panel Completeness\n"
+    dqa_info += f"Region/Period: {region}/{period}\n"
+    dqa_info += f"Cells Present: {panel.observed} of {panel.expected}\n"
+    dqa_info += f"Rows with Unparsed Periods: {panel.unparsed_rows}\n"
+    dqa_info += f"Gaps: {panel.gaps.height}\n"
+    for row in panel.gaps.head(100).iter_rows(named=True):
+        dqa_info += f"{row[region]}: {row['from']} to {row['to']} ({row['periods']} periods)\n"
+    dqa_info += f"Extra Periods: {', '.join(panel.extra_periods.get_column(period).head(100))}\n\n"
+    return dqa_info
+
+
+def numeric_text_info(numeric_text: dict):
+    dqa_info = "## Numbers Stored as Text\n"
+    for col, counts in numeric_text.items():
+        dqa_info += f"### Column: {col}\n{tally_summary(counts)}\n\n"
+    return dqa_info
+
+
+def rules_info(rules: pl.DataFrame):
+    dqa_info = "## Rules\n"
+    for rule, kind, violations, rows in rules.iter_rows():
+        dqa_info += f"{rule} ({kind}): {violations} rows"
+        dqa_info += f", e.g. rows {', '.join(map(str, rows))}\n" if violations else "\n"
+    return dqa_info + "\n"
+
+
+def formulas_info(formulas):
+    results, errors = formulas
+    dqa_info = "## Derived Variables\n"
+    for name, error in errors.items():
+        dqa_info += f"{name}: {error}\n"
+    for row in results.iter_rows(named=True):
+        dqa_info += f"{row['variable']} = {row['formula']}: {row['mismatches']} of {row['compared']} rows don't match"
+        dqa_info += f" (largest difference {row['max_difference']})\n" if row["mismatches"] else "\n"
+    return dqa_info + "\n"
+
+
+def redundancy_info(redundant: pl.DataFrame):
+    dqa_info = "## Redundant Columns\n"
+    for column, kind, formula, compared, match in redundant.iter_rows():
+        dqa_info += f"{column} ({kind}): {formula}, on {match:.1%} of {compared} rows\n"
+    return dqa_info + "\n"
+
+
+def missingness_info(missing):
+    dqa_info = "## Missing Values\n"
+    for by, group, column, rows in missing.structural.iter_rows():
+        dqa_info += f"{column} is missing in all {rows} rows of {by} {group}\n"
+    for column, other, both, share, nested in missing.co_missing.head(100).iter_rows():
+        dqa_info += f"{column} and {other} are both missing in {both} rows ({share:.1%} of their missing rows)\n"
+    return dqa_info + "\n"
+
+
+def dqa_report(profiles: dict, duplicate_count: int, summary_statistics: pl.DataFrame, changes: dict,
+               precision: dict = None, code_issues: dict = None, violations: dict = None, panel=None,
+               numeric_text: dict = None, rules: pl.DataFrame = None, formulas=None,
+               redundant: pl.DataFrame = None, missing=None):
+    """The full text DQA report of a dataset."""
+    report = "## Data Quality Assessment (DQA) Report\n\n"
+    report += "".join(column_info(p) for p in profiles.values())
+    report += "".join(special_chars_info(p) for p in profiles.values())
+    if code_issues:
+        report += "## Invalid Codes\n"
+        report += "".join(code_issues_info(col, issues) for col, issues in code_issues.items())
+    if violations:
+        report += "## Code and Name Consistency\n"
+        report += "".join(dependency_info(d, found) for d, found in violations.items())
+    if panel is not None:
+        report += completeness_info(panel)
+    if rules is not None:
+        report += rules_info(rules)
+    if formulas is not None:
+        report += formulas_info(formulas)
+    if redundant is not None and not redundant.is_empty():
+        report += redundancy_info(redundant)
+    if missing is not None:
+        report += missingness_info(missing)
+    report += duplicate_info(duplicate_count)
+    report += summary_statistics_info(summary_statistics)
+    if numeric_text:
+        report += numeric_text_info(numeric_text)
+    if precision:
+        report += "## Numeric Precision\n"
+        report += "".join(precision_info(p) for p in precision.values())
+    report += changes_summary(changes)
+    return report
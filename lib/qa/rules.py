@@ -0,0 +1,201 @@
+import argparse
+import json
+from collections import namedtuple
+from pathlib import Path
+from typing import List
+import polars as pl
+from lib.qa.ingest import scan
+
+# Cross column rules are declared per dataset (or per codebook) in JSON or YAML:
+#
+#   rules:
+#     - name: male and female add up to total
+#       type: sum
+#       columns: [male, female]
+#       equals: total
+#       tolerance: 1
+#     - {name: percentages, type: range, columns: [literacy_rate], min: 0, max: 100}
+#     - {name: no negative counts, type: non_negative, columns: [population, households]}
+#     - {name: one row per district and year, type: unique, columns: [district_code, year]}
+#     - {name: rural below total, type: compare, column: rural, op: "<=", other: total}
+#     - name: districts add up to their state
+#       type: rollup
+#       column: population
+#       by: [state_code, year]
+#       total: {column: district_code, is_null: true}   # the rows holding the state totals
+#
+# Every rule becomes a boolean 'violated' expression, unique and rollup rules after joining
+# their group-by aggregation back to the rows. All of them are evaluated by one streaming query
+# returning a flag per row and rule, whose violations are then counted.
+
+rule_types = ["sum", "range", "non_negative", "not_null", "unique", "compare", "rollup"]
+comparisons = {
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b, "==": lambda a, b: a == b,
+    ">=": lambda a, b: a >= b, ">": lambda a, b: a > b, "!=": lambda a, b: a != b,
+}
+sample_rows = 10
+rule_suffixes = [".rules.json", ".rules.yaml", ".rules.yml"]
+row_index = "\x00row"
+
+Rule = namedtuple("Rule", ["name", "type", "spec"])
+
+
+def parse_rules(text: str, fmt: str = "json") -> List[Rule]:
+    """Rules from the text of a JSON or YAML rules file (a list of rules or {"rules": [...]})."""
+    if fmt in ("yaml", "yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML rules need pyyaml (pip install pyyaml), use a JSON rules file instead")
+        declared = yaml.safe_load(text)
+    else:
+        declared = json.loads(text)
+    if isinstance(declared, dict):
+        declared = declared.get("rules", [])
+    rules = []
+    for i, spec in enumerate(declared or []):
+        if not isinstance(spec, dict) or spec.get("type") not in rule_types:
+            raise ValueError(f"Rule {i + 1} needs a type, one of: {', '.join(rule_types)}")
+        rules.append(Rule(spec.get("name") or f"rule {i + 1}", spec["type"], spec))
+    return rules
+
+
+def load_rules(path) -> List[Rule]:
+    path = Path(path)
+    return parse_rules(path.read_text(), path.suffix.lower().lstrip("."))
+
+
+def rules_file(dataset_path):
+    """The rules file next to a dataset (`panel.csv` -> `panel.rules.yaml`), None if there's none."""
+    dataset_path = Path(dataset_path)
+    stem = dataset_path.name.split(".")[0]
+    return next((dataset_path.with_name(stem + s) for s in rule_suffixes
+                 if dataset_path.with_name(stem + s).is_file()), None)
+
+
+def _columns(rule: Rule):
+    spec = rule.spec
+    columns = list(spec.get("columns", []))
+    columns += [spec[k] for k in ("column", "equals", "other") if isinstance(spec.get(k), str)]
+    columns += list(spec.get("by", []))
+    if "total" in spec:
+        columns.append(spec["total"]["column"])
+    return columns
+
+
+def _is_total(total: dict) -> pl.Expr:
+    if total.get("is_null"):
+        return pl.col(total["column"]).is_null()
+    return pl.col(total["column"]).cast(pl.Utf8) == str(total["equals"])
+
+
+def group_aggregation(rule: Rule, name: str):
+    """
+    The group-by aggregation a unique or rollup rule compares every row with, as (the columns
+    computed before grouping, the group columns, the aggregation named `name`, the groups worth
+    joining back), None for rules of single rows. Aggregations are joined back to the rows,
+    which the streaming engine can run (windows like `is_duplicated` or `sum().over` can't be).
+    """
+    spec = rule.spec
+    if rule.type == "unique":
+        # only the duplicated keys are kept, rows of other keys don't break the rule
+        return [], list(spec["columns"]), pl.count().alias(name), pl.col(name) > 1
+    if rule.type == "rollup":
+        parts = pl.when(~_is_total(spec["total"])).then(pl.col(spec["column"])).alias(name)
+        return [parts], list(spec["by"]), pl.col(name).sum(), pl.lit(True)
+    return None
+
+
+def violated(rule: Rule, aggregated: str = None) -> pl.Expr:
+    """
+    Whether each row breaks the rule (null values break no rule but not_null). Unique and rollup
+    rules read their group's aggregation from the `aggregated` column (see `group_aggregation`).
+    """
+    spec = rule.spec
+    columns = [pl.col(c) for c in spec.get("columns", [])]
+    tolerance = spec.get("tolerance", 0)
+    if rule.type == "sum":
+        return (pl.sum_horizontal(columns) - pl.col(spec["equals"])).abs() > tolerance
+    if rule.type == "range":
+        broken = pl.lit(False)
+        for col in columns:
+            if "min" in spec:
+                broken = broken | (col < spec["min"])
+            if "max" in spec:
+                broken = broken | (col > spec["max"])
+        return broken
+    if rule.type == "non_negative":
+        return pl.any_horizontal([col < 0 for col in columns])
+    if rule.type == "not_null":
+        return pl.any_horizontal([col.is_null() for col in columns])
+    if rule.type == "unique":
+        return pl.col(aggregated) > 1
+    if rule.type == "compare":
+        if spec.get("op") not in comparisons:
+            raise ValueError(f"Rule '{rule.name}' needs an op, one of: {', '.join(comparisons)}")
+        other = pl.col(spec["other"]) if "other" in spec else pl.lit(spec["value"])
+        return ~comparisons[spec["op"]](pl.col(spec["column"]), other)
+    if rule.type == "rollup":
+        return _is_total(spec["total"]) & ((pl.col(spec["column"]) - pl.col(aggregated)).abs() > tolerance)
+    raise ValueError(f"Unknown rule type '{rule.type}'")
+
+
+def check_rules(data, rules: List[Rule], sample=sample_rows, streaming=True) -> pl.DataFrame:
+    """
+    The number of rows breaking each rule with the indices of the first `sample` of them. `data`
+    is a frame or a lazy frame (e.g. `ingest.scan` of a big file), evaluated by the streaming
+    engine: each unique or rollup rule first reads it for its group-by aggregation, then one
+    query joins the aggregations back and evaluates every rule. What's kept in memory is the
+    aggregations (a row per group, for unique rules while grouping: the keys of all the rows)
+    and the flags (a bit per row and rule), not the rows.
+    """
+    data = data.lazy()
+    used = list(dict.fromkeys(c for rule in rules for c in _columns(rule)))
+    missing = sorted(set(used) - set(data.columns))
+    if missing:
+        raise ValueError(f"Rules refer to columns that aren't in the dataset: {', '.join(missing)}")
+    if not rules:
+        return pl.DataFrame(schema={"rule": pl.Utf8, "type": pl.Utf8, "violations": pl.UInt32,
+                                    "sample_rows": pl.List(pl.UInt32)})
+    # only the columns the rules use are read from a scan
+    data = data.select(used)
+    rows = data
+    for i, rule in enumerate(rules):
+        aggregation = group_aggregation(rule, f"\x00{i}\x00group")
+        if aggregation is not None:
+            computed, by, aggregate, kept = aggregation
+            groups = data.with_columns(computed).groupby(by).agg(aggregate).filter(kept).collect(streaming=streaming)
+            rows = rows.join(groups.lazy(), on=by, how="left")
+    flags = (
+        rows.select([violated(rule, f"\x00{i}\x00group").fill_null(False).alias(f"\x00{i}")
+                     for i, rule in enumerate(rules)])
+        .collect(streaming=streaming)
+    )
+    # the rows are numbered once the flags are collected (with_row_count can't be streamed)
+    result = flags.with_row_count(row_index).select(
+        [pl.col(f"\x00{i}").sum().alias(f"{i}\x00violations") for i in range(len(rules))]
+        + [pl.col(row_index).filter(pl.col(f"\x00{i}")).head(sample).implode().alias(f"{i}\x00sample_rows")
+           for i in range(len(rules))]
+    ).row(0, named=True)
+    return pl.DataFrame({
+        "rule": [rule.name for rule in rules],
+        "type": [rule.type for rule in rules],
+        "violations": [result[f"{i}\x00violations"] for i in range(len(rules))],
+        "sample_rows": [result[f"{i}\x00sample_rows"] for i in range(len(rules))],
+    }, schema={"rule": pl.Utf8, "type": pl.Utf8, "violations": pl.UInt32, "sample_rows": pl.List(pl.UInt32)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks a dataset file against a rules file without loading it.")
+    parser.add_argument("dataset", help="csv, parquet or arrow file")
+    parser.add_argument("rules", nargs="?", help="rules file (default: the rules file next to the dataset)")
+    args = parser.parse_args()
+    path = args.rules or rules_file(args.dataset)
+    if path is None:
+        parser.error(f"no rules file next to {args.dataset} ({', '.join(rule_suffixes)})")
+    for rule, kind, violations, rows in check_rules(scan(args.dataset), load_rules(path)).iter_rows():
+        print(f"{rule} ({kind}): {violations} rows" + (f", e.g. rows {', '.join(map(str, rows))}" if violations else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List
+import polars as pl
+from lib.qa.formulas import variable_columns
+
+# The unit registry: a unit is a base unit times a scale, e.g. 'Rs. in Lakh' is 100000 Rupees
+# and 'Lakh Hectare' is 100000 Hectare. A unit that's only a scale ('Crore') counts numbers.
+base_units = {
+    "number": ("Number", 1.0), "numbers": ("Number", 1.0), "no": ("Number", 1.0), "nos": ("Number", 1.0),
+    "count": ("Number", 1.0),
+    "rupee": ("Rupees", 1.0), "rupees": ("Rupees", 1.0), "rs": ("Rupees", 1.0), "inr": ("Rupees", 1.0),
+    "₹": ("Rupees", 1.0),
+    "hectare": ("Hectare", 1.0), "hectares": ("Hectare", 1.0), "ha": ("Hectare", 1.0),
+    "acre": ("Hectare", 0.40468564224), "acres": ("Hectare", 0.40468564224),
+    "sqkm": ("Hectare", 100.0), "km2": ("Hectare", 100.0),
+    "tonne": ("Tonne", 1.0), "tonnes": ("Tonne", 1.0), "ton": ("Tonne", 1.0), "tons": ("Tonne", 1.0),
+    "mt": ("Tonne", 1.0), "quintal": ("Tonne", 0.1), "quintals": ("Tonne", 0.1), "qtl": ("Tonne", 0.1),
+    "kg": ("Tonne", 0.001), "kgs": ("Tonne", 0.001), "kilogram": ("Tonne", 0.001), "kilograms": ("Tonne", 0.001),
+    "percentage": ("Percentage", 1.0), "percent": ("Percentage", 1.0), "pct": ("Percentage", 1.0),
+    "%": ("Percentage", 1.0), "ratio": ("Ratio", 1.0), "index": ("Index", 1.0),
+}
+# units without a dimension, which are known but never converted (a percentage stays a percentage)
+dimensionless = {"Percentage", "Ratio", "Index"}
+scales = {
+    "hundred": 1e2, "thousand": 1e3, "thousands": 1e3, "'000": 1e3, "000": 1e3,
+    "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5,
+    "million": 1e6, "millions": 1e6, "mn": 1e6,
+    "crore": 1e7, "crores": 1e7, "cr": 1e7,
+    "billion": 1e9, "billions": 1e9, "bn": 1e9,
+}
+# words of unit descriptions that don't change the unit ('Rs. in Lakh', 'Area (in Hectare)')
+filler_words = {"in", "of", "per", "the"}
+# columns holding the units of a variable whose unit varies by row, `{column}` is the variable's column
+unit_columns = ["{column}_unit", "{column}_units", "unit", "units", "unit_of_measurement", "measurement_unit"]
+
+Unit = namedtuple("Unit", ["base", "factor"])
+Conversion = namedtuple("Conversion", ["variable", "column", "unit", "to", "factor", "unit_column"])
+
+
+@lru_cache(maxsize=2 ** 12)
+def parse_unit(text: str):
+    """The base unit and the factor to it of a unit description, None if it isn't in the registry."""
+    text = re.sub(r"\bsq(uare)?\.?\s*(km|kilomet(er|re)s?)\b", "sqkm", text.strip().lower())
+    words = [w for w in re.split(r"[\s.,()/\[\]-]+", text.replace("₹", " ₹ ").replace("%", " % ")) if w and w not in filler_words]
+    if not words:
+        return None
+    base, factor = None, 1.0
+    for word in words:
+        if word in scales:
+            factor *= scales[word]
+        elif word in base_units and base is None:
+            base, base_factor = base_units[word]
+            factor *= base_factor
+        elif word in base_units and base_units[word] == (base, base_factor):
+            # the same unit written twice, e.g. 'Percentage (%)'
+            continue
+        else:
+            return None
+    return Unit(base or "Number", factor)
+
+
+def unit_column(columns: List[str], column: str):
+    return next((c for c in (u.format(column=column) for u in unit_columns) if c in columns and c != column), None)
+
+
+def _target(variable: dict, base: str):
+    """The unit a variable is converted to: its `unit_conversion` if that's a unit of the same kind."""
+    to = variable.get("unit_conversion")
+    target = parse_unit(to) if isinstance(to, str) and to.strip() else None
+    if target is None or target.base != base:
+        return base, 1.0
+    return to.strip(), target.factor
+
+
+def plan_conversions(df: pl.DataFrame, variables: List[dict]):
+    """
+    The unit conversions of a dataset's variables from their codebook: the factor from the
+    `measurement_unit` to the `unit_conversion` (or the base unit) of every variable, or for
+    variables whose unit varies, the factor of every distinct value of their unit column.
+    Returns (conversions, problems), the problems by variable.
+    """
+    column_of = variable_columns(df.columns)
+    conversions, problems = [], {}
+    for variable in variables:
+        name, column = variable["name"], column_of.get(variable["name"])
+        unit = variable.get("measurement_unit")
+        if column is None:
+            continue
+        if variable.get("unit_varies"):
+            units_col = unit_column(df.columns, column)
+            if units_col is None:
+                problems[name] = f"its unit varies but there's no unit column ({', '.join(unit_columns)})"
+                continue
+            units = df.get_column(units_col).cast(pl.Utf8).unique().drop_nulls().to_list()
+            parsed = {u: parse_unit(u) for u in units}
+            unknown = [u for u, p in parsed.items() if p is None]
+            bases = {p.base for p in parsed.values() if p is not None}
+            if unknown or len(bases) > 1:
+                problems[name] = f"unknown units in {units_col}: {', '.join(unknown)}" if unknown else \
+                    f"{units_col} mixes units of different kinds: {', '.join(sorted(bases))}"
+                continue
+            if not bases or bases <= dimensionless:
+                continue
+            to, to_factor = _target(variable, bases.pop())
+            factors = {u: p.factor / to_factor for u, p in parsed.items()}
+            if any(f != 1 for f in factors.values()) or any(u != to for u in units):
+                conversions.append(Conversion(name, column, unit, to, factors, units_col))
+            continue
+        if not isinstance(unit, str) or not unit.strip():
+            continue
+        parsed = parse_unit(unit)
+        if parsed is None:
+            problems[name] = f"'{unit}' isn't a known unit"
+            continue
+        if parsed.base in dimensionless:
+            continue
+        to, to_factor = _target(variable, parsed.base)
+        if parsed.factor != to_factor or unit.strip() != to:
+            conversions.append(Conversion(name, column, unit, to, parsed.factor / to_factor, None))
+    # a unit column shared by several variables can only be relabelled to one unit
+    targets = {}
+    for conversion in list(conversions):
+        if conversion.unit_column is not None and targets.setdefault(conversion.unit_column, conversion.to) != conversion.to:
+            problems[conversion.variable] = f"{conversion.unit_column} is converted to {targets[conversion.unit_column]}"
+            conversions.remove(conversion)
+    return conversions, problems
+
+
+def conversion_table(conversions: List[Conversion]) -> pl.DataFrame:
+    return pl.DataFrame([{
+        "variable": c.variable,
+        "from": c.unit if c.unit_column is None else f"varies ({c.unit_column})",
+        "to": c.to,
+        "factor": f"{c.factor:g}" if c.unit_column is None else
+                  ", ".join(f"{u}: {f:g}" for u, f in sorted(c.factor.items())),
+    } for c in conversions], schema={"variable": pl.Utf8, "from": pl.Utf8, "to": pl.Utf8, "factor": pl.Utf8})
+
+
+def convert_units(df: pl.DataFrame, conversions: List[Conversion]) -> pl.DataFrame:
+    """
+    Applies the conversions in one pass: constant factors are literals, row dependent factors
+    come from a join of each unit column with the factors of its distinct units. Unit columns
+    are relabelled with the unit their variables were converted to.
+    """
+    data = df.lazy()
+    columns = []
+    for units_col in dict.fromkeys(c.unit_column for c in conversions if c.unit_column is not None):
+        sharing = [c for c in conversions if c.unit_column == units_col]
+        units = list(sharing[0].factor)
+        factors = pl.LazyFrame(
+            {f"\x00{units_col}": units, **{f"\x00{c.variable}": [c.factor[u] for u in units] for c in sharing}},
+            schema={f"\x00{units_col}": pl.Utf8, **{f"\x00{c.variable}": pl.Float64 for c in sharing}})
+        data = data.join(factors, left_on=pl.col(units_col).cast(pl.Utf8), right_on=f"\x00{units_col}", how="left")
+    for c in conversions:
+        # values without a unit (a null unit) are kept as they are
+        factor = pl.lit(c.factor) if c.unit_column is None else pl.col(f"\x00{c.variable}").fill_null(1.0)
+        columns.append((pl.col(c.column).cast(pl.Float64) * factor).alias(c.column))
+    targets = {c.unit_column: c.to for c in conversions if c.unit_column is not None}
+    columns += [pl.when(pl.col(u).is_null()).then(None).otherwise(pl.lit(to)).alias(u) for u, to in targets.items()]
+    return (
+        data.with_columns(columns)
+        .select(df.columns)
+        .collect()
+    )
+
+
+def normalize_codebook(variables: List[dict], conversions: List[Conversion]) -> List[dict]:
+    """The codebook's variables with the units the conversions converted them to."""
+    converted: Dict[str, Conversion] = {c.variable: c for c in conversions}
+    return [
+        {**v, "measurement_unit": converted[v["name"]].to, "unit_conversion": None, "unit_varies": False}
+        if v["name"] in converted else v
+        for v in variables
+    ]
@@ -0,0 +1,593 @@
+import json
+import os
+from collections import namedtuple
+from functools import partial
+import polars as pl
+import streamlit as st
+from lib.frames import head
+from lib.instrument import Timings, show_timings
+from lib.qa import clean, ingest, lgd, optimize
+from lib.qa.codes import all_code_issues
+from lib.qa.dependencies import dependency_violations, key_columns
+from lib.qa.numeric import numeric_tally, numeric_candidates, tally_table, tally_summary, convert_numbers
+from lib.qa.panel import completeness, detect_panel_keys
+from lib.qa.frequency import infer_frequency, min_confidence
+from lib.qa.export import export_formats, export_bytes, export_file_name
+from lib.qa.partition import detect_partition_columns, output_dir, resolve_output_path, write_partitioned
+from lib.qa.precision import profile_precision, precision_table
+from lib.qa.profile import ColumnProfile, profile_columns, duplicate_count, summary_statistics, is_string
+from lib.qa.report import dqa_report
+from lib.qa.rules import check_rules, load_rules, parse_rules, rules_file
+
+# number of values shown per column in the page (the report keeps more)
+display_values = 30
+
+
+Dataset = namedtuple("Dataset", ["name", "key", "read", "rules"])
+
+
+def choose_dataset(key="dataset"):
+    """
+    Lets the user upload a dataset or pick a file on the server (in the drop folder or by path).
+    Returns a Dataset with the file's name (without extension), a key identifying the file's
+    contents, a function reading it with optimized dtypes (returning the frame and its
+    memory report) and the rules file next to it, or None until a file is chosen.
+    """
+    source = st.radio("Dataset source", ["Upload", "Server file"], horizontal=True, key=f"{key}_source")
+    if source == "Upload":
+        uploaded_file = st.file_uploader("Upload a data file", type=["csv", "parquet"], key=f"{key}_upload")
+        if not uploaded_file:
+            return None
+        return Dataset(uploaded_file.name.split(".")[0], f"upload:{uploaded_file.file_id}",
+                       partial(optimize.read_upload_optimized, uploaded_file), None)
+    files = [str(p) for p in ingest.list_drop_folder()]
+    path = st.selectbox(f"File in the drop folder ({ingest.drop_folder()})", files, index=None,
+                        key=f"{key}_drop_file")
+    path = st.text_input("Or a path on the server", key=f"{key}_server_path") or path
+    if not path:
+        return None
+    try:
+        path = ingest.resolve_path(path)
+    except ValueError as e:
+        st.error(str(e))
+        return None
+    return Dataset(path.name.split(".")[0], f"{path}:{path.stat().st_mtime_ns}", partial(optimize.read_optimized, path),
+                   rules_file(path))
+
+
+def analysis(name: str, compute, *args, key=None):
+    """
+    The result of `compute(*args)`, an analysis of the session's dataset, computed once per
+    version of the dataset (and of `key`, e.g. the codebook the analysis also depends on). Widget
+    interactions that don't change the dataset rerun the page without repeating its analyses.
+    """
+    results = st.session_state.setdefault("analyses", {})
+    if name not in results or results[name][0] != key:
+        results[name] = key, compute(*args)
+    return results[name][1]
+
+
+def _set_data(data: pl.DataFrame):
+    """Replaces the dataset of the session, dropping the analyses of the previous version."""
+    st.session_state.data = data
+    st.session_state.analyses = {}
+
+
+def _set_codebook(variables: list):
+    st.session_state.codebook = variables
+    st.session_state.codebook_version = st.session_state.get("codebook_version", 0) + 1
+
+
+def _apply(operation, change_key, change, *args):
+    """
+    Widget callback applying a cleaning operation to the dataset of the session. Callbacks run
+    before the page reruns, so the rerun profiles and shows the updated dataset.
+    """
+    try:
+        _set_data(operation(st.session_state.data, *args))
+        st.session_state.changes[change_key] = change
+        st.session_state.messages.append(("success", change))
+    except Exception as e:
+        st.session_state.changes[change_key] = f"Error-{e}: {change}"
+        st.session_state.messages.append(("error", f"{change} failed because of {e}"))
+
+
+def _change_dtype(col):
+    dtype = st.session_state[f"{col}_dtype"]
+    if dtype == "No Change":
+        return
+    fmt = " (Format: dd-mm-yyyy)" if dtype == "date" else ""
+    _apply(clean.change_dtype, col, f"Data Type Changed to {dtype}{fmt}", col, dtype)
+
+
+def _values(values: list, total: int):
+    values = values[:display_values]
+    return f"{values}..." if total > len(values) else f"{values}"
+
+
+def show_column(profile: ColumnProfile):
+    col = profile.name
+    st.write(f"### Column: {col}")
+    st.write(f"Data Type: {profile.dtype}")
+    st.write(f"Number of Numerical Values: {profile.numeric_count}")
+    st.write(f"Number of NaN Values: {profile.null_count}")
+    st.write(f"Count of Unique Values: {profile.unique_count}")
+    if profile.unique_count:
+        st.write(f"Unique Values: {_values(profile.unique_values, profile.unique_count)}")
+    else:
+        st.write("No unique non-null values found.")
+
+    if col in clean.code_widths:
+        st.write(f"##### {col} values were formatted to have leading zeros.")
+
+    if is_string(profile.dtype) and col not in clean.code_widths:
+        if profile.special_count:
+            st.button(f"Clean '{col}' Column", on_click=_apply, args=(
+                clean.clean_names, col, f"Cleaned special characters from '{col}' column.", col))
+        if not profile.title_case:
+            st.button(f"Convert {col} to Title Case", on_click=_apply, args=(
+                clean.to_title_case, col, f"Converted {col} to title case.", col))
+        else:
+            st.write(f"The values in column '{col}' are already in title case.")
+
+    if profile.extra_decimals:
+        st.button(f"Round Off Decimal Numbers in {col}", on_click=_apply, args=(
+            clean.round_decimals, col, f"Rounded off decimal numbers to 2 decimal places in {col}.", col))
+
+    if profile.has_negatives:
+        st.button(f"Convert Negative Numbers to Absolute in {col}", on_click=_apply, args=(
+            clean.to_absolute, col, f"Converted negative numbers to absolute values in {col}.", col))
+
+    st.selectbox(f"Change Data Type for {col}:", clean.dtypes, key=f"{col}_dtype",
+                 on_change=_change_dtype, args=(col,))
+
+    st.write(f"Count of Special Characters: {profile.special_count}")
+    if profile.special_count:
+        st.write(f"Special Character Values: {_values(profile.special_chars, profile.special_count)}")
+
+
+def show_lgd_names(data: pl.DataFrame):
+    """Lists the region names that differ from their LGD names, with a button replacing them."""
+    levels = lgd.detected_levels(data)
+    if not levels:
+        return
+    st.write("## LGD Names")
+    for level in levels:
+        code, name, _, _ = lgd.levels[level]
+        mismatches = analysis(f"lgd names: {level}", lgd.level_mismatches, data, level)
+        if mismatches.is_empty():
+            st.write(f"All {name} values match their LGD names.")
+            continue
+        st.write(f"{mismatches.height} ({code}, {name}) pairs differ from their LGD names:")
+        st.dataframe(head(mismatches), hide_index=True)
+        st.button(f"Replace {name} values with LGD names", key=f"replace_{level}_names", on_click=_apply, args=(
+            lgd.replace_level_names, name, f"{level.title()} names replaced based on {level}_lgd.csv data.", level))
+
+
+def show_precision(precision: dict):
+    """The decimal places of the float (and numeric text) columns, with rounding of float columns."""
+    if not precision:
+        return
+    st.write("## Numeric Precision")
+    st.write("Number of values per count of decimal places. Artifacts have more decimal places than "
+             "the data could have been entered with, e.g. 0.30000000000000004.")
+    st.dataframe(precision_table(precision), hide_index=True)
+    data = st.session_state.data
+    floats = [p.name for p in precision.values() if data.schema[p.name] in pl.FLOAT_DTYPES
+              and (p.artifacts or (p.max_places or 0) > 2)]
+    if not floats:
+        return
+    col = st.selectbox("Column to round", floats, key="round_column")
+    decimals = st.number_input("Decimal places", min_value=0, max_value=10, value=2, key="round_decimals")
+    st.button("Round", on_click=_apply, args=(
+        clean.round_decimals, col, f"Rounded off decimal numbers to {decimals} decimal places in {col}.",
+        col, decimals))
+
+
+def show_numeric_text(candidates: dict):
+    """Text columns holding numbers in Indian or report formats, with a button converting each."""
+    if not candidates:
+        return
+    st.write("## Numbers Stored as Text")
+    st.write("Number of cells each rule applies to:")
+    st.dataframe(tally_table(candidates), hide_index=True)
+    for col, counts in candidates.items():
+        st.button(f"Convert {col} to Numbers", key=f"convert_{col}_numbers", on_click=_apply, args=(
+            convert_numbers, col, f"Converted {col} to numbers ({tally_summary(counts)}).", col))
+
+
+def show_code_issues(code_issues: dict):
+    """The codes that aren't numbers, are too long or aren't LGD codes, with their row counts."""
+    if not code_issues:
+        return
+    st.write("## Invalid Codes")
+    for col, issues in code_issues.items():
+        st.write(f"{issues.height} distinct {col} values are invalid ({issues['rows'].sum()} rows):")
+        st.dataframe(head(issues), hide_index=True)
+
+
+def show_dependency_violations(violations: dict):
+    """Codes with more than one name, names with more than one code or parent, with row counts."""
+    if not violations:
+        return
+    st.write("## Code and Name Consistency")
+    for dependency, found in violations.items():
+        values = found.select(key_columns(dependency)).n_unique()
+        within = f" within their {', '.join(dependency.within)}" if dependency.within else ""
+        st.write(f"{values} {dependency.determinant} values{within} have more than one {dependency.dependent} "
+                 f"(expected {dependency.kind}):")
+        st.dataframe(head(found), hide_index=True)
+
+
+def show_hierarchy_mismatches(data: pl.DataFrame):
+    """Codes that LGD places under a different parent than the dataset does."""
+    if not any(f"{level}_code" in data.columns for level in lgd.parent_levels if level not in lgd.levels):
+        return
+    # numpy (for the hierarchy store) is only imported for datasets with codes below districts
+    from lib.qa import hierarchy
+    mismatches = analysis("hierarchy", hierarchy.hierarchy_mismatches, data)
+    if not mismatches:
+        return
+    st.write("## LGD Hierarchy")
+    for pair, found in mismatches.items():
+        st.write(f"{found.height} ({pair}) pairs aren't in LGD ({found['rows'].sum()} rows):")
+        st.dataframe(head(found), hide_index=True)
+
+
+def show_completeness(data: pl.DataFrame):
+    """Which region/period cells of a panel are missing, or None when it has no region and period."""
+    keys = detect_panel_keys(data.schema)
+    if keys is None:
+        return None
+    st.write("## Panel Completeness")
+    result = analysis("completeness", completeness, data, keys, key=keys)
+    share = result.observed / result.expected if result.expected else 0
+    st.write(f"{result.observed} of the {result.expected} ({keys.region}, {keys.period}) cells expected from "
+             f"{result.regions} regions and {result.period_coverage.height} periods are present ({share:.1%}).")
+    if result.unparsed_rows:
+        st.write(f"{result.unparsed_rows} rows have a {keys.period} that couldn't be parsed.")
+    for title, frame in [("Coverage per region", result.region_coverage),
+                         ("Coverage per period", result.period_coverage.drop("index")),
+                         ("Gaps", result.gaps),
+                         ("Extra periods", result.extra_periods),
+                         ("Coverage per indicator", result.indicator_coverage)]:
+        with st.expander(f"{title} ({frame.height})"):
+            st.dataframe(head(frame), hide_index=True)
+    return result
+
+
+def choose_codebook():
+    """
+    Lets the user upload the dataset's codebook (Excel or json). Returns its variables as dicts,
+    parsed once per file, or None until a codebook is uploaded.
+    """
+    uploaded_file = st.file_uploader("Codebook (Excel or json)", type=["xlsx", "json"], key="codebook_file")
+    if not uploaded_file:
+        return None
+    if st.session_state.get("codebook_key") != uploaded_file.file_id:
+        if uploaded_file.name.lower().endswith(".json"):
+            variables = json.loads(uploaded_file.getvalue())["variables"]
+        else:
+            # pandas and pandera are only needed for Excel codebooks
+            import pandas as pd
+            from lib.bipp.codebook.parse import parse_variables, get_similar_sheet_name
+            wb = pd.ExcelFile(uploaded_file)
+            variables = [v.model_dump() for v in parse_variables(
+                wb.parse(get_similar_sheet_name("code", wb.sheet_names), header=None))]
+        _set_codebook(variables)
+        st.session_state.codebook_key = uploaded_file.file_id
+    return st.session_state.codebook
+
+
+def show_formulas(data: pl.DataFrame, variables: list):
+    """
+    Compares the derived columns of the dataset with the formulas of the codebook. Returns the
+    comparison and the formulas' errors.
+    """
+    # the formulas use lib.types (pydantic), only imported once a codebook is uploaded
+    from lib.qa.formulas import parse_formulas, check_formulas
+    formulas, errors = parse_formulas(variables)
+    if not formulas and not errors:
+        return None
+    st.write("## Derived Variables")
+    results, evaluation_errors = analysis("formulas", check_formulas, data, formulas,
+                                          key=st.session_state.codebook_version)
+    errors.update(evaluation_errors)
+    for name, error in errors.items():
+        st.warning(f"Formula of {name}: {error}")
+    if not results.is_empty():
+        wrong = results.filter(pl.col("mismatches") > 0).height
+        st.write(f"{wrong} of {results.height} derived columns don't match their formulas:")
+        st.dataframe(results, hide_index=True)
+    return results, errors
+
+
+def _convert_units(conversions):
+    """Widget callback converting the units, then updating the units of the session's codebook."""
+    from lib.qa.units import convert_units, normalize_codebook
+    change = "Converted " + ", ".join(f"{c.variable} to {c.to}" for c in conversions) + "."
+    _apply(convert_units, "Units", change, conversions)
+    if not st.session_state.changes["Units"].startswith("Error"):
+        _set_codebook(normalize_codebook(st.session_state.codebook, conversions))
+
+
+def show_units(data: pl.DataFrame, variables: list):
+    """The unit conversions of the codebook's units, with a button applying them."""
+    from lib.qa.units import plan_conversions, conversion_table
+    conversions, problems = analysis("units", plan_conversions, data, variables, key=st.session_state.codebook_version)
+    if not conversions and not problems:
+        return
+    st.write("## Units")
+    for name, problem in problems.items():
+        st.warning(f"Units of {name}: {problem}")
+    if conversions:
+        st.dataframe(conversion_table(conversions), hide_index=True)
+        st.button("Convert Units", on_click=_convert_units, args=(conversions,))
+
+
+def _mark_derived(proposals: dict):
+    """Widget callback marking the codebook's redundant variables as derived, with their formulas."""
+    _set_codebook([
+        {**v, "is_derived": True, "formula": proposals[v["name"]]} if v["name"] in proposals else v
+        for v in st.session_state.codebook
+    ])
+    st.session_state.messages.append(("success", f"Marked {', '.join(proposals)} as derived."))
+
+
+def show_redundant_columns(data: pl.DataFrame, variables: list = None):
+    """
+    Columns duplicating, rescaling or adding up other columns. With a codebook, offers to mark
+    them as derived with the formula found.
+    """
+    # numpy is only imported for the redundancy checks
+    from lib.qa.redundancy import redundant_columns, derived_proposals
+    redundant = analysis("redundant columns", redundant_columns, data)
+    if redundant.is_empty():
+        return redundant
+    st.write("## Redundant Columns")
+    st.dataframe(redundant, hide_index=True)
+    proposals = derived_proposals(variables, redundant) if variables is not None else {}
+    if proposals:
+        st.write(f"{len(proposals)} codebook variables look derived: {', '.join(proposals)}")
+        st.button("Mark as Derived", on_click=_mark_derived, args=(proposals,))
+    return redundant
+
+
+def show_missingness(data: pl.DataFrame):
+    """Which columns are missing together and which regions and periods their nulls are in."""
+    # numpy is only imported for the missingness analysis
+    from lib.qa.missingness import missingness
+    result = analysis("missingness", missingness, data)
+    missing = result.columns.filter(pl.col("nulls") > 0)
+    if missing.is_empty():
+        return None
+    st.write("## Missing Values")
+    st.write(f"{missing.height} of {data.width} columns have missing values.")
+    if not result.structural.is_empty():
+        st.write("Columns entirely missing in some groups:")
+        st.dataframe(head(result.structural), hide_index=True)
+    for title, frame in [("Missing values per column", missing),
+                         ("Columns missing together", result.co_missing),
+                         *[(f"Missing values per {key}", b) for key, b in result.breakdowns.items()]]:
+        with st.expander(f"{title} ({frame.height})"):
+            st.dataframe(head(frame), hide_index=True)
+    return result
+
+
+def show_rules(data: pl.DataFrame):
+    """
+    Checks the dataset against cross column rules from an uploaded rules file, or from the rules
+    file next to a server dataset. Returns the violations, or None without rules.
+    """
+    st.write("## Rules")
+    uploaded_file = st.file_uploader("Rules file (JSON or YAML)", type=["json", "yaml", "yml"], key="rules_file")
+    if uploaded_file:
+        rules = parse_rules(uploaded_file.getvalue().decode("utf-8"), uploaded_file.name.split(".")[-1].lower())
+        source = uploaded_file.file_id
+    elif st.session_state.get("rules_path") is not None:
+        st.write(f"Rules from {st.session_state.rules_path}")
+        rules = load_rules(st.session_state.rules_path)
+        source = f"{st.session_state.rules_path}:{os.stat(st.session_state.rules_path).st_mtime_ns}"
+    else:
+        return None
+    results = analysis("rules", check_rules, data, rules, key=source)
+    broken = results.filter(pl.col("violations") > 0).height
+    st.write(f"{broken} of {results.height} rules are broken.")
+    st.dataframe(results, hide_index=True)
+    return results
+
+
+def show_partitioned_output(data: pl.DataFrame, file_name: str, timings: Timings):
+    """Writes the dataset as hive partitioned parquet into a server side directory."""
+    columns = detect_partition_columns(data.schema)
+    if not columns:
+        return
+    st.write("## Partitioned Parquet")
+    path = st.text_input(f"Output directory (in {output_dir()})", file_name, key="partition_path")
+    columns = st.multiselect("Partition columns", data.columns, default=columns, key="partition_columns")
+    if columns and st.button("Write Partitioned Parquet"):
+        try:
+            path = resolve_output_path(path)
+            with timings.span("write partitioned parquet"):
+                manifest = write_partitioned(data, path, columns)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.success(f"Wrote {manifest['rows']} rows in {len(manifest['partitions'])} partitions to {path}.")
+
+
+def remember_frequency(data: pl.DataFrame):
+    """
+    Infers the dataset's frequency. When it's confident, it's kept in the session as
+    `inferred_frequency` so the codebook and dataset id pages can pre-fill it.
+    """
+    guess = infer_frequency(data)
+    if guess is not None and guess.frequency != "Other" and guess.confidence >= min_confidence:
+        st.session_state.inferred_frequency = guess.frequency
+    else:
+        st.session_state.pop("inferred_frequency", None)
+    return guess
+
+
+def load(dataset: Dataset, timings: Timings):
+    """Reads a dataset into the session and zero pads its LGD code columns."""
+    with timings.span("read"):
+        data, memory_report = dataset.read()
+    changes = {}
+    with timings.span("format codes"):
+        for col, width in clean.code_widths.items():
+            if col in data.columns:
+                data = clean.pad_codes(data, col, width)
+                changes[col] = f"{col} values were formatted to have leading zeros."
+    _set_data(data)
+    st.session_state.changes = changes
+    st.session_state.memory_report = memory_report
+    st.session_state.rules_path = dataset.rules
+    with timings.span("frequency"):
+        st.session_state.frequency = remember_frequency(data)
+    st.session_state.dataset_key = dataset.key
+    st.session_state.file_name = dataset.name
+
+
+def main(page_title="Dataset QA"):
+    """
+    The dataset QA page: profiles every column of an uploaded dataset, offers cleaning
+    operations and LGD name replacements and exports the cleaned dataset with a DQA report.
+    The analyses are kept in the session until the dataset changes.
+    """
+    st.set_page_config(page_title=page_title)
+    timings = Timings()
+    try:
+        for key, default in [("data", None), ("changes", {}), ("messages", [])]:
+            if key not in st.session_state:
+                st.session_state[key] = default
+
+        st.title("Dataset QA App")
+        dataset = choose_dataset()
+        if dataset is not None and st.session_state.get("dataset_key") != dataset.key:
+            load(dataset, timings)
+
+        data = st.session_state.data
+        if data is None or data.is_empty():
+            return
+        file_name = st.session_state.file_name
+
+        for kind, message in st.session_state.messages:
+            getattr(st, kind)(message)
+        st.session_state.messages = []
+
+        st.write("## Dataset Preview")
+        st.dataframe(data.head())
+        st.dataframe(data.tail())
+
+        st.write("## Dataset Information")
+        st.write(f"Number of Rows: {data.height}")
+        st.write(f"Number of Columns: {data.width}")
+        guess = st.session_state.frequency
+        if guess is not None:
+            st.write(f"Inferred Frequency: {guess.frequency} ({guess.confidence:.0%} of {guess.deltas} "
+                     f"intervals between periods in {guess.groups} regions agree)")
+        with st.expander("Memory"):
+            st.dataframe(st.session_state.memory_report, hide_index=True)
+
+        with timings.span("profile"):
+            profiles = analysis("profile", profile_columns, data)
+
+        st.write("## Column Information")
+        with timings.span("columns"):
+            for profile in profiles.values():
+                with timings.span(f"column: {profile.name}"):
+                    show_column(profile)
+                st.write("---")
+
+        with timings.span("numeric text"):
+            numeric_text = numeric_candidates(analysis("numeric text", numeric_tally, data))
+            show_numeric_text(numeric_text)
+
+        with timings.span("lgd names"):
+            show_lgd_names(data)
+
+        with timings.span("codes"):
+            code_issues = analysis("codes", all_code_issues, data)
+            show_code_issues(code_issues)
+            show_hierarchy_mismatches(data)
+            violations = analysis("dependencies", dependency_violations, data)
+            show_dependency_violations(violations)
+
+        with timings.span("completeness"):
+            panel = show_completeness(data)
+
+        st.write("## Codebook")
+        with timings.span("codebook"):
+            variables = choose_codebook()
+        formulas = None
+        if variables is not None:
+            with timings.span("formulas"):
+                try:
+                    formulas = show_formulas(data, variables)
+                except ValueError as e:
+                    st.error(f"Invalid formulas: {e}")
+            with timings.span("units"):
+                show_units(data, variables)
+
+        with timings.span("redundant columns"):
+            redundant = show_redundant_columns(data, variables)
+
+        with timings.span("rules"):
+            try:
+                rules = show_rules(data)
+            except ValueError as e:
+                st.error(f"Invalid rules: {e}")
+                rules = None
+
+        with timings.span("missingness"):
+            missing = show_missingness(data)
+
+        with timings.span("duplicates"):
+            duplicates = analysis("duplicates", duplicate_count, data)
+        st.write("## Number of Duplicate Rows")
+        st.write(f"Number of Duplicate Rows: {duplicates}")
+        if duplicates:
+            st.button("Remove Duplicate Rows", on_click=_apply, args=(
+                clean.drop_duplicates, "Duplicate Rows", "Duplicate rows were removed."))
+
+        with timings.span("precision"):
+            precision = analysis("precision", profile_precision, data)
+            show_precision(precision)
+
+        st.write("## Summary Statistics for Numerical Columns")
+        with timings.span("describe"):
+            statistics = analysis("describe", summary_statistics, data)
+        if statistics is None:
+            st.write("No numeric columns found in the dataset.")
+        else:
+            st.dataframe(statistics, hide_index=True)
+
+        # downloads are generated when their button is clicked, in memory and per session
+        st.write("## Download Updated Dataset")
+        fmt = st.selectbox("Format", list(export_formats), key="export_format")
+        st.download_button(
+            "Download", partial(export_bytes, data, fmt),
+            file_name=export_file_name(f"{file_name}_updated", fmt),
+            mime=export_formats[fmt][1], on_click="ignore")
+        st.download_button(
+            "Download DQA Report",
+            partial(dqa_report, profiles, duplicates, statistics, dict(st.session_state.changes), precision,
+                    code_issues, violations, panel, numeric_text, rules, formulas, redundant,
+                    missing),
+            file_name=f"{file_name}_data_quality_report.txt", mime="text/plain", on_click="ignore")
+        if variables is not None:
+            st.download_button(
+                "Download Codebook", json.dumps({"variables": st.session_state.codebook}),
+                file_name=f"{file_name}_codebook.json", mime="application/json", on_click="ignore")
+        if timings.enabled:
+            st.download_button(
+                "Download Timings", timings.to_json,
+                file_name=f"{file_name}_timings.json", mime="application/json", on_click="ignore")
+
+        show_partitioned_output(data, file_name, timings)
+
+        show_timings(timings)
+
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
@@ -0,0 +1,151 @@
+import csv
+import hashlib
+import io
+import sqlite3
+import string
+from typing import Iterable, List
+
+granularities = {
+    "Country": "CN",
+    "India": "IN",
+    "State": "ST",
+    "District": "DT",
+    "Tehsil": "TH",
+    "Block": "BL",
+    "Sub-District": "SD",
+    "Gram Panchayat": "GP",
+    "City": "CT",
+    "Village": "VL",
+    "Local Body": "LB",
+    "Assembly Constituency": "AC",
+    "Parliamentary Constituency": "PC",
+    "Other Level": "OL",
+    "Point Level": "PL",
+}
+
+frequencies = {
+    "Daily": "DL",
+    "Weekly": "WK",
+    "Fortnightly": "FN",
+    "Monthly": "MN",
+    "Quarterly": "QT",
+    "Seasonally": "SN",
+    "Biannually": "BN",
+    "Yearly": "YR",
+    "Quinquennial": "QQ",
+    "Decadal": "DC",
+    "Other / One Time": "OT",
+}
+
+manifest_columns = ["dataset_name", "source_name", "granularity", "frequency"]
+
+schema = """
+CREATE TABLE IF NOT EXISTS dataset_ids (
+    id TEXT PRIMARY KEY,
+    prefix TEXT NOT NULL UNIQUE,
+    dataset_name TEXT NOT NULL,
+    source_name TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def open_registry(path="dataset_ids.db", **kwargs):
+    """Opens (and creates if needed) the dataset id registry stored in a SQLite file."""
+    conn = sqlite3.connect(path, **kwargs)
+    conn.executescript(schema)
+    return conn
+
+
+def dataset_id_prefix(name: str, source: str, granularity: str, frequency: str):
+    prefix = "-".join((name, source, granularity, frequency))
+    return prefix.strip().replace(" ", "").lower()
+
+
+def dataset_id_suffix(prefix: str, attempt=0):
+    """Three lowercase letters derived from the prefix, so the same inputs always give the same suffix."""
+    digest = hashlib.sha256(f"{prefix}#{attempt}".encode("utf-8")).digest()
+    n = int.from_bytes(digest[:8], "big")
+    letters = []
+    for _ in range(3):
+        n, i = divmod(n, 26)
+        letters.append(string.ascii_lowercase[i])
+    return "".join(letters)
+
+
+def generate_dataset_id(name: str, source: str, granularity: str, frequency: str):
+    prefix = dataset_id_prefix(name, source, granularity, frequency)
+    return f"{prefix}-{dataset_id_suffix(prefix)}"
+
+
+def _code(value: str, codes: dict, field: str):
+    value = value.strip()
+    if value in codes:
+        return codes[value]
+    if value.upper() in codes.values():
+        return value.upper()
+    raise ValueError(f"Unknown {field} '{value}'. Expected one of: {', '.join(codes.keys())}")
+
+
+def id_exists(conn: sqlite3.Connection, dataset_id: str):
+    return conn.execute("SELECT 1 FROM dataset_ids WHERE id = ?", (dataset_id,)).fetchone() is not None
+
+
+def _allocate(conn: sqlite3.Connection, name: str, source: str, granularity: str, frequency: str):
+    granularity = _code(granularity, granularities, "granularity")
+    frequency = _code(frequency, frequencies, "frequency")
+    prefix = dataset_id_prefix(name, source, granularity, frequency)
+    row = conn.execute(
+        "SELECT id FROM dataset_ids WHERE prefix = ?", (prefix,)).fetchone()
+    if row is not None:
+        return row[0]
+    # ids of datasets registered with the same prefix always match the existing row, so
+    # probing only matters for ids that were added to the registry by other means.
+    attempt = 0
+    while id_exists(conn, f"{prefix}-{dataset_id_suffix(prefix, attempt)}"):
+        attempt += 1
+    dataset_id = f"{prefix}-{dataset_id_suffix(prefix, attempt)}"
+    conn.execute("""
+        INSERT INTO dataset_ids (id, prefix, dataset_name, source_name, granularity, frequency)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (dataset_id, prefix, name, source, granularity, frequency))
+    return dataset_id
+
+
+def allocate_dataset_id(conn: sqlite3.Connection, name: str, source: str, granularity: str, frequency: str):
+    """
+    Returns the registered id for a dataset, allocating a new one if the dataset isn't registered yet.
+    Granularity and frequency can be given either as labels (e.g. 'District') or codes (e.g. 'DT').
+    """
+    with conn:
+        return _allocate(conn, name, source, granularity, frequency)
+
+
+def allocate_dataset_ids(conn: sqlite3.Connection, rows: Iterable[dict]) -> List[str]:
+    """Allocates ids for many datasets in a single transaction. Nothing is registered if any row is invalid."""
+    ids = []
+    with conn:
+        for i, row in enumerate(rows):
+            try:
+                ids.append(_allocate(conn, *[str(row[c]) for c in manifest_columns]))
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Row {i + 1} of the manifest: {e}") from e
+    return ids
+
+
+def allocate_manifest(conn: sqlite3.Connection, manifest: str):
+    """Allocates ids for a csv manifest and returns the manifest as csv with an added 'dataset_id' column."""
+    reader = csv.DictReader(io.StringIO(manifest.lstrip("\ufeff")))
+    missing = set(manifest_columns) - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"The manifest is missing the column(s): {', '.join(sorted(missing))}")
+    rows = list(reader)
+    for row, dataset_id in zip(rows, allocate_dataset_ids(conn, rows)):
+        row["dataset_id"] = dataset_id
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=[*reader.fieldnames, "dataset_id"])
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
@@ -0,0 +1,27 @@
+from functools import lru_cache
+from pathlib import Path
+
+# Static resources are loaded once per process and shared by every session, so a
+# page rerun (or a new session) never re-reads them. Callers must not mutate them.
+
+root = Path(__file__).resolve().parent.parent
+
+
+@lru_cache(maxsize=None)
+def state_lgd():
+    """Bundled LGD state directory (polars) with codes as strings."""
+    import polars as pl
+    return pl.read_csv(root / "state_lgd.csv", dtypes={"state_lgd_code": pl.Utf8})
+
+
+@lru_cache(maxsize=None)
+def district_lgd():
+    """Bundled LGD district directory (polars) with codes as strings."""
+    import polars as pl
+    return pl.read_csv(root / "district_lgd.csv", dtypes={"district_lgd_code": pl.Utf8})
+
+
+@lru_cache(maxsize=None)
+def codebook_template():
+    """Bytes of the bundled codebook template."""
+    return (root / "template" / "dataset_name_codebook.xlsx").read_bytes()
@@ -1,135 +1,187 @@
-from openpyxl import Workbook
+import argparse
+import re
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from openpyxl import Workbook, load_workbook
+from lib.critic import get_similar, codebook_columns, metadata_fields, additional_information_fields, variable_types
 
+# Every sheet is read as a stream of rows (read-only mode) and written as a stream
+# of rows (write-only mode), so memory stays flat however large a sheet is.
 
-def codebook_openpyxl(codebook: Workbook):
-    sheet = codebook.get_sheet_by_name('codebook')
-    if sheet['A1'] == 'Dataset variables & Formulas used' and sheet['A2'] == 'Variable' and sheet['B2'] == 'Variable description' and sheet['C2'] == 'Variable type' and sheet['D2'] == 'Unit of measurment' and sheet['E2'] == 'Constant Unit/Changing Unit' and sheet['F2'] == 'Formula' and sheet['G2'] == 'Unit Reference' and sheet['H2'] == 'Parent variable' and sheet['I2'] == 'Unit conversion' and sheet['J2'] == 'Original/Derived' and sheet['K2'] == 'Variable Parent':
-        print('columns are correct')
-    else:
-        sheet['A1'] = 'Dataset variables & Formulas used'
-        sheet['A2'] = 'Variable name'
-        sheet['B2'] = 'Variable description'
-        sheet['C2'] = 'Variable type'
-        sheet['D2'] = 'Unit of measurment'
-        sheet['E2'] = 'Constant Unit/Changing Unit'
-        sheet['F2'] = 'Formula'
-        sheet['G2'] = 'Unit Reference'
-        sheet['H2'] = 'Parent variable'
-        sheet['I2'] = 'Unit conversion'
-        sheet['J2'] = 'Original/Derived'
-        sheet['K2'] = 'Variable Parent'
-        print('replaced coloumns')
-    return codebook
-
-
-def metadata_openpyxl(metadata: Workbook):
-    sheet = metadata.get_sheet_by_name('metadata information')
-    if sheet['A1'] == 'Metadata information' and sheet['A2'] == 'Domain' and sheet['A3'] == 'Dataset name' and sheet['A4'] == 'Granularity level' and sheet['A5'] == 'Frequency' and sheet['A6'] == 'Source name' and sheet['A7'] == 'Source link' and sheet['A8'] == 'Data retrieval date' and sheet['A9'] == 'Data last updated' and sheet['A10'] == 'Data extraction page' and sheet['A11'] == 'About' and sheet['A12'] == 'Methodology' and sheet['A13'] == 'Resource' and sheet['A14'] == 'Data Insights' and sheet['A15'] == 'Tags' and sheet['A16'] == 'Similar Datasets' and sheet['A17'] == 'Package Description':
-        print('columns are correct')
-    else:
-        sheet['A1'] = 'Metadata information'
-        sheet['A2'] = 'Domain'
-        sheet['A3'] = 'Dataset name'
-        sheet['A4'] = 'Granularity level'
-        sheet['A5'] = 'Frequency'
-        sheet['A6'] = 'Source name'
-        sheet['A7'] = 'Source link'
-        sheet['A8'] = 'Data retrieval date'
-        sheet['A9'] = 'Data last updated'
-        sheet['A10'] = 'Data extraction page'
-        sheet['A11'] = 'About'
-        sheet['A12'] = 'Methodology'
-        sheet['A13'] = 'Resource'
-        sheet['A14'] = 'Data Insights'
-        sheet['A15'] = 'Tags'
-        sheet['A16'] = 'Similar Datasets'
-        sheet['A17'] = 'Package Description'
-        print('replaced coloumns')
-    return metadata
-
-
-def additional_info_openpyxl(additional_info: Workbook):
-    sheet = additional_info.get_sheet_by_name('additional information')
-    if sheet['A1'] == 'Additional information' and sheet['A2'] == 'Years covered' and sheet['A3'] == 'Number of State(s) / Union Territories' and sheet['A4'] == 'Number of District(s)' and sheet['A5'] == 'Additional information':
-        print('columns are correct')
+codebook_title = "Dataset Variables & Formulas Used"
+metadata_title = "Metadata Information"
+additional_info_title = "Additional Information"
+
+sheet_names = {
+    "code": "codebook",
+    "meta": "metadata information",
+    "addi": "additional information",
+}
+
+region_words = {"state", "district", "sub_district", "subdistrict", "tehsil",
+                "block", "village", "gp", "gram_panchayat", "constituency", "city"}
+date_words = {"year", "date", "month", "quarter", "week", "day", "fy", "financial_year"}
+numeric_words = {"num", "number", "count", "total", "pct", "percentage", "percent",
+                 "rate", "ratio", "amount", "value", "avg", "average"}
+region_suffixes = r"(_(name|code|lgd_code|id))?"
+
+
+def _strip(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def _label(text: str, standard: Optional[str]):
+    """
+    A title or field name with its whitespace normalized, in its own casing (e.g. 'LGD Mapped'),
+    or the standard name (in sentence case) when it's only similar to it.
+    """
+    text = " ".join(text.split())
+    if standard is None or text.lower() == standard:
+        return text
+    return standard[0].upper() + standard[1:]
+
+
+def _is_empty(value):
+    return value is None or (isinstance(value, str) and value.strip() == "")
+
+
+def infer_variable_type(name: str) -> Optional[str]:
+    """Guesses the type of a variable from its name, e.g. 'district_code' -> 'Region'."""
+    name = re.sub(r"[^a-z0-9]+", "_", str(name).lower()).strip("_")
+    words = "|".join(sorted(region_words | date_words, key=len, reverse=True))
+    match = re.fullmatch(rf"({words}){region_suffixes}", name)
+    if match:
+        return "Date" if match.group(1) in date_words else "Region"
+    if set(name.split("_")) & numeric_words:
+        return "Numeric"
+    return None
+
+
+def find_header(rows: list, titles=codebook_columns):
+    """Index of the row (among `rows`) with the most recognized column titles."""
+    def matches(row):
+        return sum(bool(get_similar(str(v).strip().lower(), candidates=titles))
+                   for v in row if isinstance(v, str))
+    scores = [matches(row) for row in rows]
+    return None if max(scores, default=0) == 0 else scores.index(max(scores))
+
+
+def normalize_codebook_rows(rows: Iterable[tuple]) -> Iterator[list]:
+    """
+    Rewrites the rows of a 'codebook' sheet: adds the sheet title, replaces column titles with
+    the standard ones, strips values, title cases variable types and flags and infers missing
+    variable types from variable names.
+    """
+    rows = iter(rows)
+    head = [row for _, row in zip(range(3), rows)]
+    header_idx = find_header(head)
+    if header_idx is None:
+        yield from map(list, head)
+        yield from map(list, rows)
+        return
+
+    header = [
+        get_similar(str(v).strip().lower(), candidates=codebook_columns) if isinstance(v, str) else None
+        for v in head[header_idx]
+    ]
+    yield [codebook_title]
+    yield [_label(v, h) if h else _strip(v) for h, v in zip(header, head[header_idx])]
+
+    column = {h: i for i, h in enumerate(header) if h}
+    name_idx = column.get("variable name")
+    type_idx = column.get("variable type")
+    title_case = [column[c] for c in ["variable type", "constant unit / changing unit", "original / derived"]
+                  if c in column]
+    for row in chain(head[header_idx + 1:], rows):
+        values = [_strip(v) for v in row]
+        if all(_is_empty(v) for v in values):
+            continue
+        for i in title_case:
+            if i < len(values) and isinstance(values[i], str):
+                values[i] = values[i].title()
+        if type_idx is not None and name_idx is not None and name_idx < len(values):
+            values += [None] * (type_idx + 1 - len(values))
+            current = str(values[type_idx] or "").lower()
+            if current not in variable_types and current != "boolean":
+                values[type_idx] = infer_variable_type(
+                    values[name_idx]) or values[type_idx]
+        yield values
+
+
+def normalize_key_value_rows(rows: Iterable[tuple], title: str, fields: list) -> Iterator[list]:
+    """
+    Rewrites the rows of a two column (field, value) sheet: adds the sheet title, replaces
+    misspelt field names with the standard ones and strips values.
+    """
+    yield [title]
+    for row in rows:
+        key, value = (list(row) + [None, None])[:2]
+        if _is_empty(key) and _is_empty(value):
+            continue
+        if isinstance(key, str):
+            key = " ".join(key.split())
+            if key.lower() == title.lower():
+                continue
+            key = _label(key, get_similar(key.lower(), candidates=fields))
+        yield [key, _strip(value)]
+
+
+def _sheet_kind(name: str):
+    return next((kind for kind in sheet_names if kind in name.lower()), None)
+
+
+def normalize_workbook(src, dst):
+    """Streams a codebook workbook from `src` into a normalized workbook at `dst`."""
+    source = load_workbook(src, read_only=True, data_only=True)
+    target = Workbook(write_only=True)
+    try:
+        for sheet in source.worksheets:
+            kind = _sheet_kind(sheet.title)
+            rows = sheet.iter_rows(values_only=True)
+            if kind == "code":
+                rows = normalize_codebook_rows(rows)
+            elif kind == "meta":
+                rows = normalize_key_value_rows(
+                    rows, metadata_title, metadata_fields)
+            elif kind == "addi":
+                rows = normalize_key_value_rows(
+                    rows, additional_info_title, additional_information_fields)
+            out = target.create_sheet(sheet_names.get(kind, sheet.title))
+            for row in rows:
+                out.append(row)
+        target.save(dst)
+    finally:
+        source.close()
+
+
+def normalize_directory(src, dst, pattern="*.xlsx"):
+    """
+    Normalizes every codebook workbook in the `src` directory into the `dst` directory, one
+    workbook at a time. Returns a mapping of files that couldn't be normalized to their errors.
+    """
+    dst = Path(dst)
+    dst.mkdir(parents=True, exist_ok=True)
+    errors = {}
+    for file in sorted(Path(src).glob(pattern)):
+        try:
+            normalize_workbook(file, dst / file.name)
+        except Exception as e:
+            errors[str(file)] = e
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalizes codebook workbooks, one file or a directory of them.")
+    parser.add_argument("src", help="codebook workbook (xlsx) or directory of workbooks")
+    parser.add_argument("dst", help="normalized workbook, or directory for the normalized workbooks")
+    args = parser.parse_args()
+    if Path(args.src).is_dir():
+        for file, error in normalize_directory(args.src, args.dst).items():
+            print(f"{file}: {error}")
     else:
-        sheet['A1'] = 'Additional information'
-        sheet['A2'] = 'Years covered'
-        sheet['A3'] = 'Number of State(s) / Union Territories'
-        sheet['A4'] = 'Number of District(s)'
-        sheet['A5'] = 'Additional information'
-        print('replaced coloumns')
-    return additional_info
-
-
-def codebook_value_qa(codebook: Workbook):
-    sheet = codebook.get_sheet_by_name('codebook')
-    cells = []
-    for i in range(3, sheet.max_row + 1):
-        cell_a = 'A'+str(i)
-        cell_b = 'B'+str(i)
-        cell_c = 'C'+str(i)
-        cell_d = 'D'+str(i)
-        cell_e = 'E'+str(i)
-        cell_f = 'F'+str(i)
-        cell_g = 'G'+str(i)
-        cell_h = 'H'+str(i)
-        cell_i = 'I'+str(i)
-        cell_j = 'J'+str(i)
-        cells = [cell_a, cell_b, cell_c, cell_d, cell_e,
-                 cell_f, cell_g, cell_h, cell_i, cell_j]
-        for cell in cells:
-            if sheet[cell].value == None:
-                print(sheet[cell] + 'is empty in codebook sheet')
-                pass
-            elif type(sheet[cell].value) == int:
-                pass
-            else:
-                sheet[cell].value.title().strip()
-                if 'Year' or 'Date' in sheet[cell].value:
-                    date = 'C'+str(cell)
-                    sheet[date].value = 'Date'
-                elif 'Num' in sheet[cell].value:
-                    num = 'C'+str(cell)
-                    sheet[num].value = 'Numeric'
-                    numeric = 'E'+str(cell)
-                    sheet[numeric].value = 0
-                elif 'state' or 'district' in sheet[cell].value:
-                    text = 'C'+str(cell)
-                    sheet[text].value = 'Region'
-                else:
-                    text = 'C'+str(cell)
-                    sheet[text].value = 'Categorical'
-                    text = 'E'+str(cell)
-                    sheet[text].value = ''
-
-
-def metadata_value_qa(metadata: Workbook):
-    sheet = metadata.get_sheet_by_name('metadata information')
-    cells = []
-    for i in range(3, sheet.max_row + 1):
-        cell_a = 'A'+str(i)
-        cell_b = 'B'+str(i)
-        cells = [cell_a, cell_b]
-        for cell in cells:
-            if sheet[cell].value == None:
-                print(sheet[cell] + 'is empty in metadata sheet')
-                pass
-            else:
-                sheet[cell].value.title().strip()
-
-
-def additional_info_value_qa(additional_info: Workbook):
-    sheet = additional_info.get_sheet_by_name('additional information')
-    cells = []
-    for i in range(sheet.max_row + 1):
-        cell_a = 'A'+str(i)
-        cell_b = 'B'+str(i)
-        cells = [cell_a, cell_b]
-        for cell in cells:
-            if sheet[cell].value == None:
-                print(sheet[cell] + 'is empty in additional information sheet')
-                pass
-            else:
-                sheet[cell].value.title().strip(). replace('/', '').replace(':', '').replace('*', '').replace(
-                    '?', '').replace('"', '').replace('<', '').replace('>', '').replace('|', '')
+        normalize_workbook(args.src, args.dst)
+
+
+if __name__ == "__main__":
+    main()
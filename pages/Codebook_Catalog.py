@@ -0,0 +1,55 @@
+import os
+import streamlit as st
+import pandas as pd
+from lib.bipp.codebook.catalog import open_catalog, ingest_codebooks, find_datasets, search_variables, search_datasets, list_values
+from lib.bipp.codebook.similar import open_similarity_index, add_codebooks
+
+st.set_page_config(page_title="Codebook Catalog")
+st.title("Codebook Catalog")
+
+catalog_path = os.environ.get("IDP_CATALOG_PATH", "catalog.db")
+
+
+@st.cache_resource
+def connections(path):
+    # opened once per process and shared by every session and rerun (sqlite serializes the threads)
+    return open_catalog(path, check_same_thread=False), open_similarity_index(path, check_same_thread=False)
+
+
+catalog, similarity_index = connections(catalog_path)
+
+files = st.file_uploader("Add codebooks to the catalog",
+                         type=["xlsx"], accept_multiple_files=True)
+if files and st.button("Ingest Codebooks"):
+    # imported on use: the parser pulls in pandera
+    from lib.bipp.codebook.parse import parse_codebook
+    codebooks = []
+    for file in files:
+        try:
+            codebooks.append(parse_codebook(pd.ExcelFile(file)))
+        except Exception as e:
+            st.error(f"🤷‍♀️ Couldn't parse '{file.name}': {e}")
+    changed = ingest_codebooks(catalog, codebooks)
+    add_codebooks(similarity_index, codebooks)
+    st.success(
+        f"{changed} codebook(s) added or updated, {len(codebooks) - changed} unchanged.")
+
+st.write("## Find Datasets")
+variable = st.text_input("Variable name (exact), e.g. district_code")
+col1, col2 = st.columns(2)
+domain = col1.selectbox("Domain", ["", *list_values(catalog, "domain")])
+tag = col2.selectbox("Tag", ["", *list_values(catalog, "tag")])
+granularity = col1.selectbox(
+    "Granularity", ["", *list_values(catalog, "granularity_level")])
+frequency = col2.selectbox(
+    "Frequency", ["", *list_values(catalog, "frequency")])
+st.dataframe(pd.DataFrame(find_datasets(catalog, variable=variable, domain=domain,
+             granularity=granularity, frequency=frequency, tag=tag)))
+
+st.write("## Search")
+text = st.text_input("Search variables and datasets")
+if text:
+    st.write("#### Datasets")
+    st.dataframe(pd.DataFrame(search_datasets(catalog, text)))
+    st.write("#### Variables")
+    st.dataframe(pd.DataFrame(search_variables(catalog, text)))
@@ -3,21 +3,33 @@ import polars as pl
 from lib.types import alphanumeric_name, polars_dtype_to_postgres_dtype_mapping
 from lib.types import Variable, ResourceMetadata, AdditionalInformation
 from lib.types import GranularityLevel, Sectors, Frequency
-from lib.bipp.codebook.export import to_excel_codebook
+from lib.bipp.codebook.similar import open_similarity_index, similar_datasets
+from lib.frames import sample
+from lib.qa.views import choose_dataset, remember_frequency
 from pydantic import ValidationError
 import json
+import os
 
 st.set_page_config(page_title="Codebook Creator")
 st.title("Codebook Creator")
 
-file = st.file_uploader("Upload a dataset",
-                        type=["csv", "parquet"])
 
-if file is not None:
-    # TODO: lazy load data file.
-    df = pl.read_parquet(file) if file.name.endswith(
-        ".parquet") else pl.read_csv(file)
-    st.dataframe(df.to_pandas().sample(5))
+@st.cache_resource
+def similarity_index(path):
+    # opened once per process and shared by every session and rerun (sqlite serializes the threads)
+    return open_similarity_index(path, check_same_thread=False)
+
+
+dataset = choose_dataset("creator")
+
+if dataset is not None:
+    # read once per file, not on every rerun
+    if st.session_state.get("creator_dataset_key") != dataset.key:
+        st.session_state.creator_data, _ = dataset.read()
+        st.session_state.creator_dataset_key = dataset.key
+        remember_frequency(st.session_state.creator_data)
+    df = st.session_state.creator_data
+    st.dataframe(sample(df, 5))
     # create data dictionary
     data_dict = [
         Variable(
@@ -35,10 +47,10 @@ if file is not None:
     st.write("## Data Dictionary")
     st.write("For a start variable descriptions are same as variable names. Please edit varaible descriptions.")
     edited_data_dict = st.data_editor(
-        pl.from_records([var.model_dump() for var in data_dict]).to_pandas()
+        pl.from_records([var.model_dump() for var in data_dict])
     )
     if st.button("Validate Data Dictionary"):
-        for i, var in enumerate(edited_data_dict.to_dict("records")):
+        for i, var in enumerate(edited_data_dict.to_dicts()):
             try:
                 Variable.model_validate(var)
             except ValidationError as e:
@@ -58,9 +70,11 @@ if file is not None:
         "Data collection methodology used by the source.")
     data_extraction_page = st.text_input(
         "URL to the exact page from which the data is extracted?")
+    inferred = st.session_state.get("inferred_frequency")
     frequency = st.selectbox(
         "What is the frequency (temporal resolution) of the dataset?",
-        Frequency.__args__)
+        Frequency.__args__,
+        index=Frequency.__args__.index(inferred) if inferred in Frequency.__args__ else 0)
     granularity_level = st.selectbox(
         "What is the granularity (spatial resolution) of the dataset?", GranularityLevel.__args__)
     data_extraction_date = st.date_input(
@@ -76,11 +90,24 @@ if file is not None:
     package_description = st.text_area(
         "Provide a description for the package. It will show up as package description on the data portal.")
 
+    suggestions = []
+    catalog_path = os.environ.get("IDP_CATALOG_PATH", "catalog.db")
+    if os.path.exists(catalog_path):
+        draft = {
+            "variables": edited_data_dict.to_dicts(),
+            "metadata": {"resource": resource_name, "about": about},
+        }
+        suggestions = [
+            key for key, _ in similar_datasets(similarity_index(catalog_path), draft)]
+    similar = st.multiselect(
+        "Similar datasets: suggestions are based on the codebooks in the catalog.",
+        suggestions, default=suggestions)
+
     st.write("## Additional Information")
     st.write("#### Dataset Description")
-    st.dataframe(df.describe().to_pandas())
+    st.dataframe(df.describe(), hide_index=True)
     st.write("#### Number of unique values per-column")
-    st.dataframe(df.select(pl.all().n_unique()).to_pandas())
+    st.dataframe(df.select(pl.all().n_unique()), hide_index=True)
     years_covered = st.text_input("*Time period* covered by the dataset.")
     no_of_states = st.number_input(
         "Number of *states* covered by the dataset.", step=1)
@@ -114,7 +141,7 @@ if file is not None:
             data_insights=data_insights,
             resource=resource_name,
             tags=seo_tags.split(","),
-            similar_datasets=[],
+            similar_datasets=similar,
             package_description=package_description
         )
 
@@ -129,11 +156,13 @@ if file is not None:
             notes=notes,
         )
         cb = {
-            "variables": list(map(lambda v: Variable.model_validate(v).model_dump(), edited_data_dict.to_dict("records"))),
+            "variables": list(map(lambda v: Variable.model_validate(v).model_dump(), edited_data_dict.to_dicts())),
             "additional_information": additional_info.model_dump(),
             "metadata": metadata.model_dump(),
         }
         
+        # imported on use: the exporter pulls in pandas and pandera
+        from lib.bipp.codebook.export import to_excel_codebook
         excel = to_excel_codebook(cb=cb)
         st.download_button("Download Codebook", excel,
                            file_name=f"{resource_name.lower().replace(' ', '_')}_codebook.xlsx")
\ No newline at end of file
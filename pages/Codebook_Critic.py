@@ -1,26 +1,36 @@
 import streamlit as st
-import pandas as pd
-from lib.critic import critique_codebook, critique_sheets, critique_metadata, critique_additional_information
-from lib.critic import TestResultType, TestResult
 from functools import partial
 from json import loads, dumps
+from lib.instrument import Timings, show_timings
+from lib.resources import codebook_template
 
 # st.set_option('deprecation.showfileUploaderEncoding', False)
 
 st.set_page_config(page_title="Codebook Critic")
 st.title('Codebook Critic')
+timings = Timings()
 
 file = st.file_uploader("Choose an Excel file", type=["xlsx"])
 
-with open("./template/dataset_name_codebook.xlsx", "rb") as codebook_template:
-    st.download_button(
-        label="Download Codebook Template",
-        data=codebook_template.read(),
-        file_name="dataset_name_codebook.xlsx"
-    )
+st.download_button(
+    label="Download Codebook Template",
+    data=codebook_template(),
+    file_name="dataset_name_codebook.xlsx"
+)
+
 
+@st.cache_data(max_entries=8)
+def normalized_workbook(file_id: str, _file) -> bytes:
+    # rewritten once per upload, not on every rerun (the file itself isn't hashed, its id is)
+    from io import BytesIO
+    from lib.strict import normalize_workbook
+    normalized = BytesIO()
+    _file.seek(0)
+    normalize_workbook(_file, normalized)
+    return normalized.getvalue()
 
-def show_test_result(result: TestResult):
+
+def show_test_result(result):
     mapping = {
         TestResultType.ERROR: partial(st.error, icon="🤷‍♀️"),
         TestResultType.SUCCESS: partial(st.success, icon="👌"),
@@ -31,15 +41,30 @@ def show_test_result(result: TestResult):
 
 
 if file is not None:
-    wb = pd.ExcelFile(file)
-    with st.spinner("Running Tests ..."):
+    # pandas and the critic are only needed once a codebook is uploaded
+    import pandas as pd
+    from lib.critic import critique_codebook, critique_sheets, critique_metadata, critique_additional_information
+    from lib.critic import TestResultType
+
+    with timings.span("open workbook"):
+        wb = pd.ExcelFile(file)
+    with st.spinner("Running Tests ..."), timings.span("critique sheets"):
         results = critique_sheets(wb, test_results=list())
 
     st.write("## Structure")
     list(map(show_test_result, results))
 
+    with timings.span("normalize workbook"):
+        normalized = normalized_workbook(file.file_id, file)
+    st.download_button(
+        label="Download Normalized Codebook",
+        data=normalized,
+        file_name=file.name.replace(".xlsx", "_normalized.xlsx"),
+        help="Standard sheet and column titles, stripped values and inferred variable types"
+    )
+
     if TestResultType.ERROR not in map(lambda t: t.type, results):
-        with st.spinner("Checking 'codebook' sheet"):
+        with st.spinner("Checking 'codebook' sheet"), timings.span("critique codebook"):
             results, codebook = critique_codebook(
                 wb.parse("codebook", header=None), test_results=list())
         st.write("## Codebook Sheet")
@@ -47,8 +72,9 @@ if file is not None:
         codebook = st.experimental_data_editor(codebook, num_rows="dynamic")
 
         with st.spinner("Checking 'metadata information' sheet"):
-            results, metadata = critique_metadata(
-                wb.parse("metadata information", header=None), test_results=list())
+            with timings.span("critique metadata"):
+                results, metadata = critique_metadata(
+                    wb.parse("metadata information", header=None), test_results=list())
             st.write("## Metadata Information Sheet")
             list(map(show_test_result, results))
             metadata = st.experimental_data_editor(
@@ -57,9 +83,10 @@ if file is not None:
                 "Metadata values are not sanity checked. The critic is trusting your judgement.", icon="⚠")
 
         with st.spinner("Checking 'additional information' sheet"):
-            df = wb.parse("additional information", header=None)
-            results, extra_info = critique_additional_information(
-                df, test_results=list())
+            with timings.span("critique additional information"):
+                df = wb.parse("additional information", header=None)
+                results, extra_info = critique_additional_information(
+                    df, test_results=list())
             st.write("## Additional Information Sheet")
             list(map(show_test_result, results))
             extra_info = st.experimental_data_editor(
@@ -68,13 +95,16 @@ if file is not None:
                 "Additional Information values are not sanity checked. The critic is trusting your judgement.", icon="⚠")
 
         st.write("# Export Codebook")
-        json_codebook = dumps({
-            "additional information": loads(extra_info.to_json(orient="records")),
-            "metadata information": loads(metadata.to_json(orient="records")),
-            "codebook": loads(codebook.to_json(orient="records"))
-        })
+        with timings.span("export json"):
+            json_codebook = dumps({
+                "additional information": loads(extra_info.to_json(orient="records")),
+                "metadata information": loads(metadata.to_json(orient="records")),
+                "codebook": loads(codebook.to_json(orient="records"))
+            })
         st.download_button(label="Download as json", data=json_codebook,
                            file_name=file.name.replace(".xlsx", ".json"), mime="application/json")
 
         with pd.ExcelWriter(file.name) as writer:
             codebook.shift()
+
+    show_timings(timings)
@@ -1,48 +1,31 @@
+import os
 import streamlit as st
-import string
-import random
+from lib.registry import granularities, frequencies, manifest_columns
+from lib.registry import open_registry, allocate_dataset_id, allocate_manifest, id_exists
 
 st.header("Dataset ID Creator")
 
-granularities = {
-    "Country": "CN",
-    "India": "IN",
-    "State": "ST",
-    "District": "DT",
-    "Tehsil": "TH",
-    "Block": "BL",
-    "Sub-District": "SD",
-    "Gram Panchayat": "GP",
-    "City": "CT",
-    "Village": "VL",
-    "Local Body": "LB",
-    "Assembly Constituency": "AC",
-    "Parliamentary Constituency": "PC",
-    "Other Level": "OL",
-    "Point Level": "PL",
-}
+
+@st.cache_resource
+def registry_connection(path):
+    # opened once per process and shared by every session and rerun (sqlite serializes the threads)
+    return open_registry(path, check_same_thread=False)
+
+
+registry = registry_connection(os.environ.get("IDP_REGISTRY_PATH", "dataset_ids.db"))
+
 granularity = st.selectbox(
     "What's the granularity of the dataset (Spatial Resolution)?",
     granularities.keys()
 )
 
-frequencies = {
-    "Daily": "DL",
-    "Weekly": "WK",
-    "Fortnightly": "FN",
-    "Monthly": "MN",
-    "Quarterly": "QT",
-    "Seasonally": "SN",
-    "Biannually": "BN",
-    "Yearly": "YR",
-    "Quinquennial": "QQ",
-    "Decadal": "DC",
-    "Other / One Time": "OT",
-}
-
+# pre-filled with the frequency inferred from the dataset loaded in the QA or codebook pages
+inferred = st.session_state.get("inferred_frequency")
+inferred = {"Quinquennially": "Quinquennial"}.get(inferred, inferred)
 frequency = st.selectbox(
     "What's the frequency of the dataset (Temporal Resolution)?",
-    frequencies.keys()
+    list(frequencies.keys()),
+    index=list(frequencies.keys()).index(inferred) if inferred in frequencies else 0
 )
 
 dataset_name = st.text_input(
@@ -50,16 +33,32 @@ dataset_name = st.text_input(
 source_name = st.text_input(
     "What's the name of the source of the dataset? Don't use spaces or special characters.", max_chars=6)
 
+# the allocated id is kept with the inputs it was allocated for, and only shown while they're unchanged
+inputs = (dataset_name, source_name, granularity, frequency)
+if st.button("Get Dataset ID", disabled=not (dataset_name and source_name)):
+    st.session_state.dataset_id = inputs, allocate_dataset_id(
+        registry, dataset_name, source_name, granularity, frequency)
 
-def generate_dataset_id(name: str, source: str, granularity: str, frequency: str):
-    suffix = "".join(random.choices(string.ascii_lowercase, k=3))
-    id = "-".join((name, source, granularity, frequency, suffix))
-    return id.strip().replace(" ", "").lower()
+allocated = st.session_state.get("dataset_id")
+if allocated is not None and allocated[0] == inputs:
+    st.success(allocated[1])
 
+st.write("## Bulk Allocation")
+st.write(
+    f"Upload a csv manifest with the columns: {', '.join(manifest_columns)}.")
+manifest = st.file_uploader("Upload a manifest", type=["csv"])
+if manifest is not None and st.button("Allocate Dataset IDs"):
+    try:
+        result = allocate_manifest(registry, manifest.getvalue().decode("utf-8"))
+        st.download_button("Download Manifest with IDs", result,
+                           file_name=manifest.name.replace(".csv", "_ids.csv"), mime="text/csv")
+    except ValueError as e:
+        st.error(f"🤷‍♀️ {e}")
 
-st.success(generate_dataset_id(
-    dataset_name,
-    source_name,
-    granularities[granularity],
-    frequencies[frequency]
-))
+st.write("## Check Dataset ID")
+existing_id = st.text_input("Is this dataset id registered?")
+if existing_id:
+    if id_exists(registry, existing_id.strip().lower()):
+        st.success("Registered.")
+    else:
+        st.warning("Not registered.")